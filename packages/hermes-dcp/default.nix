@@ -1,5 +1,6 @@
 {
   lib,
+  callPackage,
   python3Packages,
 }:
 
@@ -23,6 +24,9 @@ let
       && !(lib.hasSuffix ".egg-info" path);
   };
 
+  # Shared tool-result error classifier (hermes_vcc.classify).
+  hermesVcc = callPackage ../hermes-vcc { };
+
   hermesDcp = python3Packages.buildPythonPackage {
     pname = "hermes-dcp";
     version = "0.1.0";
@@ -31,7 +35,10 @@ let
     inherit src;
 
     nativeBuildInputs = [ python3Packages.hatchling ];
-    propagatedBuildInputs = [ python3Packages.pyyaml ];
+    propagatedBuildInputs = [
+      python3Packages.pyyaml
+      hermesVcc
+    ];
 
     postInstall = ''
       mkdir -p $out/share/hermes-dcp/plugins/dcp
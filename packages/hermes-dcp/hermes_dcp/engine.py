@@ -10,9 +10,13 @@ from pathlib import Path
 from typing import Any, TYPE_CHECKING
 
 from hermes_dcp.config import DCPConfig, load_config
+from hermes_vcc.classify import head_contains
 
 logger = logging.getLogger(__name__)
 
+# A tool result is an error if flagged, or if its head mentions one of these.
+_ERROR_WORDS = ("error", "traceback", "exception", "failed")
+
 
 if TYPE_CHECKING:
     class _ContextEngineBase:
@@ -451,8 +455,7 @@ class DCPContextEngine(_ContextEngineBase):
     def _looks_error(self, msg: dict[str, Any]) -> bool:
         if bool(msg.get("is_error", False)):
             return True
-        text = str(msg.get("content") or "")[:500].lower()
-        return any(sig in text for sig in ["error", "traceback", "exception", "failed"])
+        return head_contains(msg.get("content"), _ERROR_WORDS, ignore_case=True)
 
     def _pruned_placeholder(self, messages: list[dict[str, Any]], idx: int, *, reason: str) -> str:
         call_id = str(messages[idx].get("tool_call_id") or "")
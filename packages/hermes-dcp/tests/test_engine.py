@@ -82,3 +82,38 @@ def test_dcp_prune_tool_can_apply_in_place():
 
     assert data["applied"] is True
     assert "DCP PRUNED OUTPUT" in msgs[3]["content"]
+
+
+def _error_session(result: dict) -> list[dict]:
+    call = {"id": "call_e", "type": "function", "function": {"name": "terminal", "arguments": '{"command":"make"}'}}
+    msgs = [
+        {"role": "system", "content": "You are helpful."},
+        {"role": "user", "content": "Build it."},
+        {"role": "assistant", "content": None, "tool_calls": [call]},
+        {"role": "tool", "tool_call_id": "call_e", **result},
+    ]
+    for i in range(5):
+        msgs += [{"role": "user", "content": f"next {i}"}, {"role": "assistant", "content": "ok"}]
+    return msgs
+
+
+def _purged(out: list[dict]) -> bool:
+    return "_dcp_purged" in out[2]["tool_calls"][0]["function"]["arguments"]
+
+
+def test_error_results_purged():
+    cases = [
+        ({"content": "Traceback (most recent call last):\n  boom"}, True),
+        ({"content": "make: *** Error: 2"}, True),
+        ({"content": "ERROR: disk full"}, True),
+        ({"content": "Failed to connect to host"}, True),
+        ({"content": "command failed with exit 1"}, True),
+        ({"content": "Exception raised in worker"}, True),
+        ({"content": "Build succeeded, 0 errors, 0 failed"}, True),
+        ({"content": "Traceback (most recent call last):", "is_error": False}, True),
+        ({"content": "done", "is_error": True}, True),
+        ({"content": "done"}, False),
+        ({"content": "x" * 500 + "Traceback"}, False),
+    ]
+    for result, expected in cases:
+        assert _purged(_engine().compress(_error_session(result))) is expected, result
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Benchmark adapter conversion on synthetic conversations.
+
+Usage:
+  python benchmarks/bench_adapter.py                               # 50k messages
+  python benchmarks/bench_adapter.py --sizes 10000 50000 --grow 500
+  python benchmarks/bench_adapter.py --adapter /tmp/old_adapter.py # compare another adapter.py
+
+Times a cold ``convert_conversation`` and a cycle-to-cycle ``Converter``:
+the first cycle converts every message, the next one sees the same
+conversation (as fresh message copies, like the archiver's snapshots)
+plus ``--grow`` new messages and only converts those.  ``speedup`` is
+cold over cycle 2.
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from hermes_vcc import adapter  # noqa: E402
+from synthetic import generate_conversation  # noqa: E402
+
+
+def _load_adapter(path: str | None):
+    if path is None:
+        return adapter
+    spec = importlib.util.spec_from_file_location("bench_adapter_mod", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _timed(fn, *args) -> float:
+    t0 = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - t0
+
+
+def bench(mod, n_messages: int, grow: int, seed: int) -> dict[str, float]:
+    messages = generate_conversation(n_messages + grow, seed=seed)
+    previous, current = messages[:n_messages], [dict(m) for m in messages]
+
+    result = {"cold": _timed(mod.convert_conversation, current)}
+    if hasattr(mod, "Converter"):
+        converter = mod.Converter()
+        result["first"] = _timed(converter.convert, previous)
+        result["next"] = _timed(converter.convert, current)
+    return result
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--sizes", type=int, nargs="+", default=[50_000])
+    p.add_argument("--grow", type=int, default=100, help="messages added per cycle")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--adapter", metavar="PATH", help="adapter.py to benchmark (default: package)")
+    a = p.parse_args()
+
+    mod = _load_adapter(a.adapter)
+    print(f"{'messages':>10} {'cold':>10} {'cycle 1':>10} {'cycle 2':>10} {'speedup':>8}")
+    for n in a.sizes:
+        r = bench(mod, n, a.grow, a.seed)
+        first = f"{r['first'] * 1000:>8.1f}ms" if "first" in r else f"{'-':>10}"
+        nxt = f"{r['next'] * 1000:>8.1f}ms" if "next" in r else f"{'-':>10}"
+        speedup = f"{r['cold'] / r['next']:>7.1f}x" if "next" in r else f"{'-':>8}"
+        print(f"{n:>10} {r['cold'] * 1000:>8.1f}ms {first} {nxt} {speedup}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Benchmark VCC ``lower_brief`` scaling on synthetic transcripts.
+
+Usage:
+  python benchmarks/bench_lower_brief.py                       # 10k/50k/100k messages
+  python benchmarks/bench_lower_brief.py --sizes 1000 5000
+  python benchmarks/bench_lower_brief.py --vcc /tmp/old_VCC.py # compare another VCC.py
+
+Only ``lower_brief`` is timed; parsing and line assignment happen first.
+A linear implementation keeps the per-1k-message cost roughly flat.
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from hermes_vcc.adapter import convert_conversation  # noqa: E402
+from hermes_vcc.utils import import_vcc  # noqa: E402
+from synthetic import generate_conversation  # noqa: E402
+
+
+def _load_vcc(path: str | None):
+    if path is None:
+        return import_vcc()
+    spec = importlib.util.spec_from_file_location("bench_vcc", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _parse(vcc, chain):
+    try:
+        return vcc.parse(chain, None)
+    except TypeError:  # VCC.py before content-addressed media
+        return vcc.parse(chain, None, "bench", [0])
+
+
+def bench(vcc, n_messages: int, seed: int) -> tuple[int, float]:
+    records = convert_conversation(generate_conversation(n_messages, seed=seed))
+    ir_nodes = 0
+    elapsed = 0.0
+    for chain in vcc.split_chains(vcc.merge_chunks(records)):
+        ir = _parse(vcc, chain)
+        vcc.assign_lines(ir)
+        ir_nodes += len(ir)
+        t0 = time.perf_counter()
+        vcc.lower_brief(ir, 128, "bench.txt", 256)
+        elapsed += time.perf_counter() - t0
+    return ir_nodes, elapsed
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--sizes", type=int, nargs="+", default=[10_000, 50_000, 100_000])
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--vcc", metavar="PATH", help="VCC.py to benchmark (default: vendored)")
+    a = p.parse_args()
+
+    vcc = _load_vcc(a.vcc)
+    print(f"{'messages':>10} {'ir_nodes':>10} {'lower_brief':>12} {'ms/1k msgs':>11}")
+    for n in a.sizes:
+        nodes, elapsed = bench(vcc, n, a.seed)
+        print(f"{n:>10} {nodes:>10} {elapsed * 1000:>10.1f}ms {elapsed * 1e6 / n:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""Benchmark the VCC pipeline stages and compare against a saved baseline.
+
+Usage:
+  python benchmarks/bench_pipeline.py                              # 1k/10k messages
+  python benchmarks/bench_pipeline.py --sizes 2000 --repeat 5
+  python benchmarks/bench_pipeline.py --mode save                  # record a baseline
+  python benchmarks/bench_pipeline.py --mode compare                # delta vs baseline
+  python benchmarks/bench_pipeline.py --mode check                  # exit 1 on regression
+  python benchmarks/bench_pipeline.py --vcc /tmp/old_VCC.py --mode compare
+
+Each stage runs on a seeded synthetic conversation with large tool outputs,
+``<think>`` blocks, compaction summaries and (for the VCC stages) base64
+screenshots:
+
+  compile_pass   VCC ``compile_pass`` of the conversation's JSONL (media extracted)
+  lower_brief    VCC ``lower_brief`` over every chain, after parse/assign_lines
+  archive        ``archive_before_compression``, first cycle
+  archive_next   the next cycle: the same conversation plus ``--grow`` messages
+  recall_search  a handful of keyword and regex queries on the archived session
+
+Setup (generating, writing input, earlier cycles) is not measured.  ``ms``
+is the best of ``--repeat`` runs; ``peak MB`` is the tracemalloc peak of a
+separate run.  Baselines are kept per host as ``<dir>/<host>.json`` (with
+``save`` also appending to ``<dir>/history/<host>.tsv``); a metric counts as
+a regression when it grows by more than 20% and more than 5 ms / 1 MB.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import importlib.util
+import json
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from hermes_vcc.adapter import convert_conversation  # noqa: E402
+from hermes_vcc.archive import archive_before_compression  # noqa: E402
+from hermes_vcc.recall import recall_search  # noqa: E402
+from hermes_vcc.utils import import_vcc  # noqa: E402
+from synthetic import add_screenshots, generate_conversation  # noqa: E402
+
+STAGES = ("compile_pass", "lower_brief", "archive", "archive_next", "recall_search")
+METRICS = ("ms", "peak_mb")
+
+# Regression / improvement: relative change, and an absolute floor per metric.
+THRESHOLD = 0.2
+FLOOR = {"ms": 5.0, "peak_mb": 1.0}
+
+QUERIES = ("config server", "deploy error", "refactor session cache", r"build.*deploy")
+
+DEFAULT_DIR = Path(__file__).resolve().parent / "baselines"
+
+
+def _load_vcc(path: str | None):
+    if path is None:
+        return import_vcc()
+    spec = importlib.util.spec_from_file_location("hermes_vcc._vendor_vcc", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    sys.modules["hermes_vcc._vendor_vcc"] = module  # so the archive compiles with it too
+    return module
+
+
+# ---------------------------------------------------------------------------
+# Stages: each returns (setup, run); run(setup()) is what gets measured
+# ---------------------------------------------------------------------------
+
+def _parse(vcc, chain):
+    try:
+        return vcc.parse(chain, None)
+    except TypeError:  # VCC.py before content-addressed media
+        return vcc.parse(chain, None, "bench", [0])
+
+
+def _stages(vcc, messages: list[dict], grow: int, tmp: Path, seed: int):
+    current = messages[: len(messages) - grow]
+    records = add_screenshots(convert_conversation(current), seed=seed)
+    jsonl = tmp / "bench.jsonl"
+    with jsonl.open("w", encoding="utf-8") as f:
+        for rec in records:
+            f.write(json.dumps(rec) + "\n")
+    counter = iter(range(1 << 30))
+
+    def fresh_dir() -> Path:
+        path = tmp / f"run_{next(counter)}"
+        path.mkdir()
+        return path
+
+    def lower_setup():
+        irs = []
+        for chain in vcc.split_chains(vcc.merge_chunks(records)):
+            ir = _parse(vcc, chain)
+            vcc.assign_lines(ir)
+            irs.append(ir)
+        return irs
+
+    def lower_run(irs):
+        for ir in irs:
+            vcc.lower_brief(ir, 128, "bench.txt", 256)
+
+    def archive_next_setup():
+        root = fresh_dir()
+        archive_before_compression(current, "bench", root, 1)
+        return root, [dict(m) for m in messages]
+
+    recall_root = fresh_dir()
+    archive_before_compression(current, "bench", recall_root, 1)
+
+    def recall_run(_):
+        for query in QUERIES:
+            recall_search(query, "bench", recall_root)
+
+    return {
+        "compile_pass": (fresh_dir, lambda out: vcc.compile_pass(str(jsonl), str(out), quiet=True)),
+        "lower_brief": (lower_setup, lower_run),
+        "archive": (fresh_dir, lambda root: archive_before_compression(current, "bench", root, 1)),
+        "archive_next": (
+            archive_next_setup,
+            lambda s: archive_before_compression(s[1], "bench", s[0], 2),
+        ),
+        "recall_search": (lambda: None, recall_run),
+    }
+
+
+def _measure(setup: Callable[[], Any], run: Callable[[Any], Any], repeat: int) -> dict[str, float]:
+    best = float("inf")
+    for _ in range(repeat):
+        state = setup()
+        gc.collect()
+        t0 = time.perf_counter()
+        run(state)
+        best = min(best, time.perf_counter() - t0)
+
+    state = setup()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run(state)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"ms": best * 1000, "peak_mb": peak / 2**20}
+
+
+def bench(vcc, n_messages: int, grow: int, seed: int, repeat: int) -> dict[str, dict[str, float]]:
+    messages = generate_conversation(
+        n_messages + grow, seed=seed, large_output_rate=0.02, compaction_every=500,
+    )
+    tmp = Path(tempfile.mkdtemp(prefix="bench_pipeline_"))
+    try:
+        stages = _stages(vcc, messages, grow, tmp, seed)
+        return {
+            f"{stage}@{n_messages}": _measure(*stages[stage], repeat)
+            for stage in STAGES
+        }
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+# ---------------------------------------------------------------------------
+# Reporting and baselines
+# ---------------------------------------------------------------------------
+
+def display(results: dict[str, dict[str, float]]) -> None:
+    print(f"{'stage':<24} {'ms':>10} {'peak MB':>10}")
+    for key, r in results.items():
+        print(f"{key:<24} {r['ms']:>10.1f} {r['peak_mb']:>10.1f}")
+
+
+def _status(now: float, base: float, metric: str) -> str:
+    limit = max(base * THRESHOLD, FLOOR[metric])
+    if now - base > limit:
+        return "regression"
+    if now - base < -limit:
+        return "improved"
+    return "~same"
+
+
+def compare(results: dict[str, dict[str, float]], baseline: dict[str, Any]) -> list[str]:
+    """Print deltas against *baseline*; return the regressed ``stage@n metric`` names."""
+    print(f"\nbaseline: {baseline.get('_git_rev', '?')} ({baseline.get('_timestamp', '?')})")
+    print(f"{'stage':<24} {'metric':>8} {'now':>10} {'base':>10} {'delta':>10}  status")
+    regressions = []
+    for key, r in results.items():
+        base = baseline.get(key)
+        if not base:
+            print(f"{key:<24} {'':>8} {'':>10} {'-':>10} {'':>10}  new")
+            continue
+        for metric in METRICS:
+            now, was = r[metric], base.get(metric, 0.0)
+            status = _status(now, was, metric)
+            if status == "regression":
+                regressions.append(f"{key} {metric}")
+            print(f"{key:<24} {metric:>8} {now:>10.1f} {was:>10.1f} {now - was:>+10.1f}  {status}")
+    return regressions
+
+
+def _baseline_path(bench_dir: Path, host: str) -> Path:
+    return bench_dir / f"{host}.json"
+
+
+def load_baseline(bench_dir: Path, host: str) -> dict[str, Any] | None:
+    path = _baseline_path(bench_dir, host)
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def save_baseline(results: dict[str, dict[str, float]], bench_dir: Path, host: str, git_rev: str) -> None:
+    """Write *results* as the host's baseline and append them to its history."""
+    bench_dir.mkdir(parents=True, exist_ok=True)
+    ts = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    path = _baseline_path(bench_dir, host)
+    baseline = {"_git_rev": git_rev, "_timestamp": ts, "_host": host, **results}
+    path.write_text(json.dumps(baseline, indent=2) + "\n", encoding="utf-8")
+    print(f"\nBaseline saved: {path}")
+
+    hist = bench_dir / "history" / f"{host}.tsv"
+    hist.parent.mkdir(parents=True, exist_ok=True)
+    header_needed = not hist.exists()
+    with hist.open("a", encoding="utf-8") as f:
+        if header_needed:
+            f.write("timestamp\tgit_rev\tstage\tms\tpeak_mb\n")
+        for key, r in results.items():
+            f.write(f"{ts}\t{git_rev}\t{key}\t{r['ms']:.3f}\t{r['peak_mb']:.3f}\n")
+    print(f"History appended: {hist}")
+
+
+def _git_rev() -> str:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, cwd=Path(__file__).resolve().parent,
+        )
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--mode", choices=["run", "save", "compare", "check"], default="run")
+    p.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000])
+    p.add_argument("--grow", type=int, default=100, help="messages added for archive_next")
+    p.add_argument("--repeat", type=int, default=3, help="timed runs per stage (best is kept)")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--vcc", metavar="PATH", help="VCC.py to benchmark (default: vendored)")
+    p.add_argument("--host", default=socket.gethostname(), help="baseline name (default: hostname)")
+    p.add_argument("--dir", type=Path, default=DEFAULT_DIR, help="baseline directory")
+    p.add_argument("--git-rev", default=None, help="revision recorded with --mode save")
+    a = p.parse_args()
+
+    vcc = _load_vcc(a.vcc)
+    results: dict[str, dict[str, float]] = {}
+    for n in a.sizes:
+        results.update(bench(vcc, n, a.grow, a.seed, a.repeat))
+    display(results)
+
+    if a.mode == "save":
+        save_baseline(results, a.dir, a.host, a.git_rev or _git_rev())
+    elif a.mode in ("compare", "check"):
+        baseline = load_baseline(a.dir, a.host)
+        if baseline is None:
+            print(f"\nNo baseline for {a.host} in {a.dir} (run with --mode save first)", file=sys.stderr)
+            sys.exit(2 if a.mode == "check" else 0)
+        regressions = compare(results, baseline)
+        if a.mode == "check" and regressions:
+            print(f"\nFAIL: {', '.join(regressions)}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
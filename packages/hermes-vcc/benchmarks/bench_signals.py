@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Benchmark compaction signal extraction on synthetic conversations.
+
+Usage:
+  python benchmarks/bench_signals.py                    # 20k messages
+  python benchmarks/bench_signals.py --sizes 5000 20000 --grow 500
+
+Times the separate passes the memory provider used to run (normalize,
+``filter_noise``, the three extractors, outstanding context and brief
+transcript), a cold ``extract_signals`` and a cycle-to-cycle
+``SignalExtractor``: the first cycle analyses every message, the next one
+sees the same conversation (as fresh message copies) plus ``--grow`` new
+messages and only analyses those.  ``speedup`` is separate passes over
+cycle 2.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from hermes_vcc.compaction import build_brief_transcript, build_outstanding_context  # noqa: E402
+from hermes_vcc.extract import extract_file_ops, extract_goals, extract_preferences  # noqa: E402
+from hermes_vcc.filter_noise import filter_noise  # noqa: E402
+from hermes_vcc.signals import SignalExtractor, extract_signals, to_normalized_blocks  # noqa: E402
+from synthetic import generate_conversation  # noqa: E402
+
+
+def separate_passes(messages: list[dict]) -> None:
+    blocks = filter_noise(to_normalized_blocks(messages))
+    extract_goals(blocks)
+    extract_preferences(blocks)
+    extract_file_ops(blocks)
+    build_outstanding_context(blocks)
+    build_brief_transcript(blocks)
+
+
+def _timed(fn, *args) -> float:
+    t0 = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - t0
+
+
+def bench(n_messages: int, grow: int, seed: int) -> dict[str, float]:
+    messages = generate_conversation(n_messages + grow, seed=seed)
+    previous, current = messages[:n_messages], [dict(m) for m in messages]
+
+    extractor = SignalExtractor()
+    return {
+        "separate": _timed(separate_passes, current),
+        "fused": _timed(extract_signals, current),
+        "first": _timed(extractor.extract, previous),
+        "next": _timed(extractor.extract, current),
+    }
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--sizes", type=int, nargs="+", default=[20_000])
+    p.add_argument("--grow", type=int, default=100, help="messages added per cycle")
+    p.add_argument("--seed", type=int, default=0)
+    a = p.parse_args()
+
+    print(f"{'messages':>10} {'separate':>10} {'fused':>10} {'cycle 1':>10} {'cycle 2':>10} {'speedup':>8}")
+    for n in a.sizes:
+        r = bench(n, a.grow, a.seed)
+        print(
+            f"{n:>10} {r['separate'] * 1000:>8.1f}ms {r['fused'] * 1000:>8.1f}ms "
+            f"{r['first'] * 1000:>8.1f}ms {r['next'] * 1000:>8.1f}ms "
+            f"{r['separate'] / r['next']:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""Seeded synthetic Hermes conversations for benchmarking.
+
+Produces OpenAI-format message lists (the shape Hermes hands to
+``archive_before_compression``) with a realistic mix of user turns,
+assistant text, ``<think>`` blocks, tool calls and tool results.
+The same ``(n_messages, seed)`` always yields the same conversation.
+
+Optionally some tool results are large (file dumps, long logs), and
+compaction summaries are inserted at intervals.  :func:`add_screenshots` adds
+base64 screenshots to the converted VCC records, the format VCC extracts
+images from (Hermes messages carry text only).
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+import random
+from typing import Any
+
+from hermes_vcc.adapter import SUMMARY_PREFIX
+
+_WORDS = (
+    "the config file server port update test module function error value "
+    "request response cache index build deploy refactor session archive "
+    "token summary compile parse lower brief view grep section block line"
+).split()
+
+_TOOLS = ("read_file", "write_file", "patch", "terminal", "search_files", "web_search")
+
+
+def _sentence(rng: random.Random, n_words: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(n_words)).capitalize() + "."
+
+
+def _paragraph(rng: random.Random, n_sentences: int) -> str:
+    return " ".join(_sentence(rng, rng.randint(4, 16)) for _ in range(n_sentences))
+
+
+def _tool_args(rng: random.Random, name: str) -> dict[str, Any]:
+    path = f"/src/{rng.choice(_WORDS)}/{rng.choice(_WORDS)}.py"
+    if name == "terminal":
+        return {"command": f"pytest -q tests/test_{rng.choice(_WORDS)}.py"}
+    if name in ("search_files", "web_search"):
+        return {"query": _sentence(rng, 3)}
+    if name == "write_file":
+        return {"path": path, "content": "\n".join(_sentence(rng, 8) for _ in range(6))}
+    if name == "patch":
+        return {"path": path, "old_string": _sentence(rng, 4), "new_string": _sentence(rng, 5)}
+    return {"path": path}
+
+
+def _tool_output(rng: random.Random) -> str:
+    lines = [_sentence(rng, rng.randint(3, 12)) for _ in range(rng.randint(1, 40))]
+    if rng.random() < 0.1:
+        lines.append("Traceback (most recent call last):")
+        lines.append("ValueError: invalid value")
+    return "\n".join(lines)
+
+
+def _large_output(rng: random.Random) -> str:
+    if rng.random() < 0.5:  # read_file-style dump with line numbers
+        return "\n".join(f"{i:>6}\t{_sentence(rng, rng.randint(2, 10))}"
+                         for i in range(1, rng.randint(500, 2000)))
+    return "\n".join(f"[{i:05d}] INFO {_sentence(rng, rng.randint(4, 14))}"
+                     for i in range(rng.randint(1000, 4000)))
+
+
+def _compaction_summary(rng: random.Random) -> str:
+    sections = ("Goal", "Progress", "Key Decisions", "Relevant Files")
+    body = "\n\n".join(
+        f"## {title}\n" + "\n".join(f"- {_sentence(rng, rng.randint(4, 12))}"
+                                     for _ in range(rng.randint(2, 6)))
+        for title in sections
+    )
+    return f"{SUMMARY_PREFIX} Earlier turns were compacted.\n\n{body}"
+
+
+def generate_conversation(
+    n_messages: int,
+    seed: int = 0,
+    *,
+    large_output_rate: float = 0.0,
+    compaction_every: int = 0,
+) -> list[dict[str, Any]]:
+    """Return a synthetic Hermes conversation of roughly *n_messages* messages.
+
+    *large_output_rate* is the share of tool results that are large (a
+    few hundred KB at most); with *compaction_every* a compaction summary
+    replaces the user turn after every that many messages.  Both default to
+    off, leaving the conversation for a given seed unchanged.
+    """
+    rng = random.Random(seed)
+    messages: list[dict[str, Any]] = [
+        {"role": "system", "content": "You are a coding assistant with file access."},
+    ]
+    call_idx = 0
+    next_compaction = compaction_every
+    while len(messages) < n_messages:
+        if compaction_every and len(messages) >= next_compaction:
+            next_compaction = len(messages) + compaction_every
+            messages.append({"role": "user", "content": _compaction_summary(rng)})
+        else:
+            messages.append({"role": "user", "content": _paragraph(rng, rng.randint(1, 3))})
+        for _ in range(rng.randint(1, 4)):
+            content = ""
+            if rng.random() < 0.3:
+                content = f"<think>{_paragraph(rng, 2)}</think>"
+            if rng.random() < 0.5:
+                content += _paragraph(rng, rng.randint(1, 2))
+            calls = []
+            for _ in range(rng.randint(0, 3)):
+                name = rng.choice(_TOOLS)
+                calls.append({
+                    "id": f"call_{call_idx:08d}",
+                    "type": "function",
+                    "function": {"name": name, "arguments": json.dumps(_tool_args(rng, name))},
+                })
+                call_idx += 1
+            msg: dict[str, Any] = {"role": "assistant", "content": content or None}
+            if calls:
+                msg["tool_calls"] = calls
+            messages.append(msg)
+            for call in calls:
+                messages.append({
+                    "role": "tool",
+                    "tool_call_id": call["id"],
+                    "content": (_large_output(rng)
+                                if large_output_rate and rng.random() < large_output_rate
+                                else _tool_output(rng)),
+                })
+        messages.append({"role": "assistant", "content": _paragraph(rng, rng.randint(1, 4))})
+    return messages[:n_messages]
+
+
+def add_screenshots(
+    records: list[dict[str, Any]],
+    every: int = 10,
+    distinct: int = 20,
+    size: int = 100_000,
+    seed: int = 0,
+) -> list[dict[str, Any]]:
+    """Attach a base64 PNG screenshot to every *every*-th tool result record.
+
+    Screenshots are drawn from *distinct* random payloads of *size* bytes,
+    so repeated pages repeat, as in browser-agent sessions.  Returns new
+    records; *records* is not modified.
+    """
+    rng = random.Random(seed)
+    shots = [base64.b64encode(rng.randbytes(size)).decode() for _ in range(distinct)]
+    out, n = [], 0
+    for rec in records:
+        blocks = rec.get("message", {}).get("content")
+        if rec.get("type") == "user" and isinstance(blocks, list) and blocks \
+                and blocks[0].get("type") == "tool_result":
+            n += 1
+            if n % every == 0:
+                result = blocks[0]
+                image = {"type": "image",
+                         "source": {"type": "base64", "media_type": "image/png",
+                                    "data": rng.choice(shots)}}
+                rec = {**rec, "message": {**rec["message"], "content": [
+                    {**result, "content": [{"type": "text", "text": result["content"]}, image]},
+                    *blocks[1:],
+                ]}}
+        out.append(rec)
+    return out
@@ -14,11 +14,13 @@ Hermes uses OpenAI chat format:
   {"role": "system", "content": "text"}
 """
 
+import hashlib
 import json
 import logging
 import re
-import uuid
-from typing import Any
+from typing import IO, Any, Iterable, Iterator
+
+from hermes_vcc.classify import is_error_result, looks_like_error
 
 logger = logging.getLogger(__name__)
 
@@ -32,14 +34,24 @@ _SCRATCHPAD_RE = re.compile(
     r"<REASONING_SCRATCHPAD>(.*?)</REASONING_SCRATCHPAD>", re.DOTALL
 )
 
-# Heuristic error indicators in tool results.
-_ERROR_INDICATORS = (
-    "Error:", "error:", "Traceback", "traceback", "Exception:",
-    "FAILED", "failed:", "command not found", "No such file",
-    "Permission denied", "ModuleNotFoundError", "ImportError",
-    "SyntaxError", "TypeError", "ValueError", "KeyError",
-    "FileNotFoundError", "ConnectionError", "TimeoutError",
-)
+def _take_blocks(pattern: re.Pattern, content: str, blocks: list[dict]) -> str:
+    """Move *pattern*'s matches out of *content* into *blocks* in one scan.
+
+    Equivalent to ``finditer`` followed by ``sub("")``: the text between
+    matches is collected as it goes.
+    """
+    pieces = []
+    pos = 0
+    for match in pattern.finditer(content):
+        text = match.group(1).strip()
+        if text:
+            blocks.append({"type": "thinking", "thinking": text})
+        pieces.append(content[pos:match.start()])
+        pos = match.end()
+    if not pieces:
+        return content
+    pieces.append(content[pos:])
+    return "".join(pieces)
 
 
 def _extract_thinking(content: str) -> tuple[list[dict], str]:
@@ -50,21 +62,15 @@ def _extract_thinking(content: str) -> tuple[list[dict], str]:
     if not content:
         return [], ""
 
-    thinking_blocks = []
+    thinking_blocks: list[dict] = []
 
     # Extract <REASONING_SCRATCHPAD> first (convert to think format)
-    for match in _SCRATCHPAD_RE.finditer(content):
-        text = match.group(1).strip()
-        if text:
-            thinking_blocks.append({"type": "thinking", "thinking": text})
-    content = _SCRATCHPAD_RE.sub("", content)
+    if "<REASONING_SCRATCHPAD>" in content:
+        content = _take_blocks(_SCRATCHPAD_RE, content, thinking_blocks)
 
     # Extract <think> blocks
-    for match in _THINK_RE.finditer(content):
-        text = match.group(1).strip()
-        if text:
-            thinking_blocks.append({"type": "thinking", "thinking": text})
-    content = _THINK_RE.sub("", content)
+    if "<think>" in content:
+        content = _take_blocks(_THINK_RE, content, thinking_blocks)
 
     return thinking_blocks, content.strip()
 
@@ -84,11 +90,7 @@ def _parse_arguments(arguments: str) -> dict:
 
 def _is_error_content(content: str) -> bool:
     """Heuristic check if tool result content indicates an error."""
-    if not content:
-        return False
-    # Check first 500 chars for error indicators
-    head = content[:500]
-    return any(indicator in head for indicator in _ERROR_INDICATORS)
+    return looks_like_error(content)
 
 
 def _is_compression_summary(content: str) -> bool:
@@ -98,9 +100,27 @@ def _is_compression_summary(content: str) -> bool:
     return content.startswith(SUMMARY_PREFIX) or content.startswith(LEGACY_SUMMARY_PREFIX)
 
 
-def _make_synthetic_id() -> str:
-    """Generate a synthetic message ID for VCC chunk merging."""
-    return f"msg_{uuid.uuid4().hex[:24]}"
+def _make_synthetic_id(*parts: str) -> str:
+    """Derive a stable synthetic ID (``msg_`` + 24 hex chars) from *parts*."""
+    digest = hashlib.blake2b("\x00".join(parts).encode("utf-8"), digest_size=12)
+    return f"msg_{digest.hexdigest()}"
+
+
+def _assistant_digest(content: Any, tool_calls: list[dict[str, Any]]) -> str:
+    """Content hash of an assistant message: its text and tool calls."""
+    payload = json.dumps(
+        [
+            content,
+            [
+                [tc.get("id"), fn.get("name"), fn.get("arguments")]
+                for tc in tool_calls
+                for fn in (tc.get("function", {}),)
+            ],
+        ],
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=12).hexdigest()
 
 
 def convert_message(
@@ -108,17 +128,37 @@ def convert_message(
     tool_name_map: dict[str, str],
     *,
     timestamp: str | None = None,
+    id_counts: dict[str, int] | None = None,
 ) -> list[dict[str, Any]]:
     """Convert a single Hermes OpenAI message to VCC JSONL record(s).
 
+    Assistant records get a synthetic ``message.id`` derived from the
+    message's content hash and its occurrence among identical assistant
+    messages, so the same conversation always converts to the same records.
+
     Args:
         msg: Hermes message dict with role, content, optional tool_calls/tool_call_id.
         tool_name_map: Mapping of tool_call_id -> tool_name, built across the conversation.
         timestamp: Optional ISO timestamp to attach to records.
+        id_counts: Occurrences so far of each assistant content hash in the
+            conversation (updated in place), so repeated identical messages
+            get distinct ids.  Without it the message counts as the first.
 
     Returns:
         List of VCC-compatible records (usually 1, but tool results may split).
     """
+    return _convert_message(msg, tool_name_map, timestamp, id_counts)[0]
+
+
+def _convert_message(
+    msg: dict[str, Any],
+    tool_name_map: dict[str, str],
+    timestamp: str | None,
+    id_counts: dict[str, int] | None,
+) -> tuple[list[dict[str, Any]], tuple[str, int] | None]:
+    """:func:`convert_message`, also returning the ``(digest, occurrence)``
+    the assistant message id was derived from (None for other records)."""
+    id_seed: tuple[str, int] | None = None
     role = msg.get("role", "")
     content = msg.get("content") or ""
     records: list[dict[str, Any]] = []
@@ -164,10 +204,19 @@ def convert_message(
             if remaining:
                 content_blocks.append({"type": "text", "text": remaining})
 
+        digest = _assistant_digest(content, tool_calls)
+        occurrence = 0
+        if id_counts is not None:
+            occurrence = id_counts.get(digest, 0)
+            id_counts[digest] = occurrence + 1
+        id_seed = (digest, occurrence)
+
         # Convert tool_calls to tool_use blocks
-        for tc in tool_calls:
+        for i, tc in enumerate(tool_calls):
             fn = tc.get("function", {})
-            tc_id = tc.get("id", _make_synthetic_id())
+            tc_id = tc.get("id")
+            if tc_id is None:
+                tc_id = _make_synthetic_id(digest, str(occurrence), f"tool_call_{i}")
             name = fn.get("name", "unknown")
             arguments = fn.get("arguments", "")
 
@@ -186,7 +235,7 @@ def convert_message(
                 "type": "assistant",
                 "message": {
                     "content": content_blocks,
-                    "id": _make_synthetic_id(),
+                    "id": _make_synthetic_id(digest, str(occurrence)),
                 },
             }
             if timestamp:
@@ -197,7 +246,7 @@ def convert_message(
         # Tool result -> VCC expects this inside a "user" record
         # with content as a list containing a tool_result block
         tool_call_id = msg.get("tool_call_id", "")
-        is_error = msg.get("is_error", _is_error_content(content))
+        is_error = is_error_result(msg)
 
         tool_result_block: dict[str, Any] = {
             "type": "tool_result",
@@ -218,7 +267,27 @@ def convert_message(
     else:
         logger.warning("Unknown message role %r, skipping", role)
 
-    return records
+    return records, id_seed
+
+
+def iter_records(
+    messages: list[dict[str, Any]],
+    *,
+    timestamps: list[str | None] | None = None,
+) -> Iterator[dict[str, Any]]:
+    """Yield the VCC records for *messages* one message at a time.
+
+    Streaming form of :func:`convert_conversation`: the records of a message
+    are produced only when the consumer asks for them, so a writer can
+    serialize each record and let it go.
+    """
+    # Single pass: tool names are registered as their assistant message is
+    # converted.  Tool results follow their call and do not carry the name.
+    tool_name_map: dict[str, str] = {}
+    id_counts: dict[str, int] = {}
+    for i, msg in enumerate(messages):
+        ts = timestamps[i] if timestamps and i < len(timestamps) else None
+        yield from convert_message(msg, tool_name_map, timestamp=ts, id_counts=id_counts)
 
 
 def convert_conversation(
@@ -239,25 +308,130 @@ def convert_conversation(
     Returns:
         List of VCC-compatible JSONL records ready for VCC's lex() -> parse().
     """
-    tool_name_map: dict[str, str] = {}
-    records: list[dict[str, Any]] = []
+    return list(iter_records(messages, timestamps=timestamps))
 
-    # First pass: build tool_name_map from all assistant tool_calls
-    for msg in messages:
-        if msg.get("role") == "assistant":
-            for tc in msg.get("tool_calls") or []:
-                fn = tc.get("function", {})
-                tc_id = tc.get("id", "")
-                if tc_id:
-                    tool_name_map[tc_id] = fn.get("name", "unknown")
 
-    # Second pass: convert all messages
-    for i, msg in enumerate(messages):
-        ts = timestamps[i] if timestamps and i < len(timestamps) else None
-        converted = convert_message(msg, tool_name_map, timestamp=ts)
-        records.extend(converted)
+_NO_VALUE = object()
+
+# Records of one message plus the seed of its assistant id (see _convert_message).
+_Converted = tuple[list[dict[str, Any]], "tuple[str, int] | None"]
 
-    return records
+
+def _message_key(msg: dict[str, Any], timestamp: str | None) -> tuple | None:
+    """Everything :func:`convert_message` reads from *msg*, as a dict key.
+
+    Returns None for messages whose fields cannot be read this way; the
+    key may still turn out unhashable (e.g. list content), which callers
+    treat the same.
+    """
+    calls = msg.get("tool_calls")
+    if calls:
+        try:
+            calls = tuple(
+                (tc.get("id", _NO_VALUE), fn.get("name"), fn.get("arguments"))
+                for tc in calls
+                for fn in (tc.get("function", {}),)
+            )
+        except (TypeError, AttributeError):
+            return None
+    return (
+        msg.get("role", ""),
+        msg.get("content"),
+        calls or None,
+        msg.get("tool_call_id", ""),
+        msg.get("is_error", _NO_VALUE),
+        timestamp,
+    )
+
+
+class Converter:
+    """Convert a growing conversation, reusing the records of seen messages.
+
+    Every compression cycle hands over the whole conversation again, mostly
+    unchanged.  A converter remembers the records each message produced,
+    keyed by the message's content, so cycle N only converts the messages
+    that are new (or changed) since cycle N-1.  The output is identical to
+    :func:`convert_conversation`: a remembered assistant record is reused
+    only while its message is still the same occurrence of its content, so
+    its synthetic id is the one a fresh conversion would derive.
+
+    The memo holds the messages of the last completed conversion only:
+    messages that drop out of the conversation (e.g. compressed away) are
+    forgotten.
+
+    Returned records are shared between calls and must not be mutated.
+    """
+
+    def __init__(self) -> None:
+        self._memo: dict[tuple, _Converted] = {}
+        self._repeats: dict[tuple, list[_Converted]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def iter_records(
+        self,
+        messages: list[dict[str, Any]],
+        *,
+        timestamps: list[str | None] | None = None,
+    ) -> Iterator[dict[str, Any]]:
+        """Like :func:`iter_records`, reusing memoized records."""
+        memo, memo_repeats = self._memo, self._repeats
+        # key -> conversion of its first occurrence; later occurrences of the
+        # same key (rare) are kept in order in *repeats*.
+        seen: dict[tuple, _Converted] = {}
+        repeats: dict[tuple, list[_Converted]] = {}
+        tool_name_map: dict[str, str] = {}
+        id_counts: dict[str, int] = {}
+
+        def reuse(done: _Converted | None) -> bool:
+            if done is None:
+                return False
+            id_seed = done[1]
+            if id_seed is not None:
+                digest, occurrence = id_seed
+                if id_counts.get(digest, 0) != occurrence:
+                    return False
+                id_counts[digest] = occurrence + 1
+            return True
+
+        for i, msg in enumerate(messages):
+            ts = timestamps[i] if timestamps and i < len(timestamps) else None
+            key = _message_key(msg, ts)
+            try:
+                first = seen.get(key) if key is not None else None
+            except TypeError:  # unhashable field
+                key = first = None
+            if key is None:
+                self.misses += 1
+                yield from _convert_message(msg, tool_name_map, ts, id_counts)[0]
+                continue
+            if first is None:
+                done = memo.get(key)
+                slot = None
+            else:
+                slot = repeats.setdefault(key, [])
+                before = memo_repeats.get(key, ())
+                done = before[len(slot)] if len(slot) < len(before) else None
+            if reuse(done):
+                self.hits += 1
+            else:
+                done = _convert_message(msg, tool_name_map, ts, id_counts)
+                self.misses += 1
+            if slot is None:
+                seen[key] = done
+            else:
+                slot.append(done)
+            yield from done[0]
+        self._memo, self._repeats = seen, repeats
+
+    def convert(
+        self,
+        messages: list[dict[str, Any]],
+        *,
+        timestamps: list[str | None] | None = None,
+    ) -> list[dict[str, Any]]:
+        """Like :func:`convert_conversation`, reusing memoized records."""
+        return list(self.iter_records(messages, timestamps=timestamps))
 
 
 def records_to_jsonl(records: list[dict[str, Any]]) -> str:
@@ -266,3 +440,30 @@ def records_to_jsonl(records: list[dict[str, Any]]) -> str:
     for rec in records:
         lines.append(json.dumps(rec, ensure_ascii=False))
     return "\n".join(lines) + "\n" if lines else ""
+
+
+def write_jsonl(
+    records: Iterable[dict[str, Any]],
+    fh: IO[bytes],
+    stats: dict[str, int] | None = None,
+) -> int:
+    """Stream *records* to the binary file *fh* as JSONL, one line at a time.
+
+    Produces exactly the bytes of ``records_to_jsonl(records)`` without
+    building the whole text.  If *stats* is given, ``chars`` and ``bytes``
+    of the written text are added to it.
+
+    Returns:
+        Number of bytes written.
+    """
+    chars = written = 0
+    for rec in records:
+        line = json.dumps(rec, ensure_ascii=False)
+        data = line.encode("utf-8") + b"\n"
+        fh.write(data)
+        chars += len(line) + 1
+        written += len(data)
+    if stats is not None:
+        stats["chars"] = stats.get("chars", 0) + chars
+        stats["bytes"] = stats.get("bytes", 0) + written
+    return written
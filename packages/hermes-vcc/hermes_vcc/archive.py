@@ -1,7 +1,8 @@
 """Pre-compression archive system for Hermes conversations.
 
-Before each compression cycle, the full conversation is archived as JSONL and
-compiled via VCC.  This gives a lossless record of every message that existed
+Before each compression cycle, the full conversation is archived as JSONL
+records (deduplicated across cycles by :mod:`hermes_vcc.store`) and compiled
+via VCC.  This gives a lossless record of every message that existed
 before the compressor threw information away.
 
 The archive MUST NEVER raise exceptions that propagate to the caller.  All
@@ -13,45 +14,100 @@ from __future__ import annotations
 
 import json
 import logging
+import time
+from collections import OrderedDict
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator
 
-from hermes_vcc.utils import ensure_dir, estimate_tokens, import_vcc
+from hermes_vcc.utils import ensure_dir, import_vcc
 
 logger = logging.getLogger(__name__)
 
 _MANIFEST_NAME = "manifest.json"
+_COMPACTION_NAME = "compaction.json"
+
+# Incremental VCC compile state per session directory (see
+# ``VCC.compile_records(cache=...)``).  Kept in-process; a restart simply
+# recompiles the first cycle it sees in full.
+_COMPILE_CACHE: OrderedDict[Path, dict[str, Any]] = OrderedDict()
+_COMPILE_CACHE_MAX = 8
+
+# Per-session adapter converters (see ``adapter.Converter``), so a cycle only
+# converts the messages added since the previous one.  Same lifetime rules.
+_CONVERTERS: OrderedDict[Path, Any] = OrderedDict()
+
+
+def _session_lru(cache: OrderedDict[Path, Any], session_dir: Path, factory: Any) -> Any:
+    """Return *cache*'s entry for *session_dir*, creating it with *factory*.
+
+    The cache keeps the ``_COMPILE_CACHE_MAX`` most recently used sessions.
+    """
+    entry = cache.pop(session_dir, None)
+    if entry is None:
+        entry = factory()
+    cache[session_dir] = entry
+    while len(cache) > _COMPILE_CACHE_MAX:
+        cache.popitem(last=False)
+    return entry
+
+
+def _compile_cache(session_dir: Path) -> dict[str, Any]:
+    """Return the (LRU-bounded) incremental compile cache for *session_dir*."""
+    return _session_lru(_COMPILE_CACHE, session_dir, dict)
+
+
+def _converter(session_dir: Path) -> Any:
+    """Return the (LRU-bounded) memoizing adapter converter for *session_dir*."""
+    from hermes_vcc.adapter import Converter
+
+    return _session_lru(_CONVERTERS, session_dir, Converter)
 
 
 # ---------------------------------------------------------------------------
 # Internal helpers
 # ---------------------------------------------------------------------------
 
-def _read_manifest(session_dir: Path) -> dict[str, Any]:
-    """Load manifest.json from *session_dir*, returning empty dict on failure."""
-    manifest_path = session_dir / _MANIFEST_NAME
-    if not manifest_path.exists():
+def _lap(timings: dict[str, float] | None, stage: str, start: float) -> float:
+    """Record the seconds since *start* under *stage*; return the new start."""
+    now = time.perf_counter()
+    if timings is not None:
+        timings[stage] = now - start
+    return now
+
+
+def _read_json(path: Path, what: str) -> dict[str, Any]:
+    """Load the JSON object at *path*, returning empty dict on failure."""
+    if not path.exists():
         return {}
     try:
-        return json.loads(manifest_path.read_text(encoding="utf-8"))
+        return json.loads(path.read_text(encoding="utf-8"))
     except (json.JSONDecodeError, OSError) as exc:
-        logger.warning("Failed to read manifest at %s: %s", manifest_path, exc)
+        logger.warning("Failed to read %s at %s: %s", what, path, exc)
         return {}
 
 
-def _write_manifest(session_dir: Path, manifest: dict[str, Any]) -> None:
-    """Atomically-ish write *manifest* to manifest.json."""
-    manifest_path = session_dir / _MANIFEST_NAME
+def _write_json(path: Path, data: dict[str, Any], what: str) -> None:
+    """Atomically-ish write *data* to *path*."""
     try:
-        tmp = manifest_path.with_suffix(".tmp")
+        tmp = path.with_suffix(".tmp")
         tmp.write_text(
-            json.dumps(manifest, indent=2, ensure_ascii=False) + "\n",
+            json.dumps(data, indent=2, ensure_ascii=False) + "\n",
             encoding="utf-8",
         )
-        tmp.replace(manifest_path)
+        tmp.replace(path)
     except OSError as exc:
-        logger.warning("Failed to write manifest at %s: %s", manifest_path, exc)
+        logger.warning("Failed to write %s at %s: %s", what, path, exc)
+
+
+def _read_manifest(session_dir: Path) -> dict[str, Any]:
+    """Load manifest.json from *session_dir*, returning empty dict on failure."""
+    return _read_json(session_dir / _MANIFEST_NAME, "manifest")
+
+
+def _write_manifest(session_dir: Path, manifest: dict[str, Any]) -> None:
+    """Atomically-ish write *manifest* to manifest.json."""
+    _write_json(session_dir / _MANIFEST_NAME, manifest, "manifest")
 
 
 # ---------------------------------------------------------------------------
@@ -63,58 +119,128 @@ def archive_before_compression(
     session_id: str,
     archive_dir: Path,
     compression_cycle: int,
+    *,
+    incremental: bool = True,
+    dedup: bool = True,
+    timings: dict[str, float] | None = None,
 ) -> Path:
     """Archive the current conversation state before compression.
 
     Steps:
-        1. Convert *messages* to VCC JSONL records via the adapter.
-        2. Write ``cycle_{compression_cycle}.jsonl`` into a per-session directory.
-        3. Run VCC ``compile_pass`` to produce ``.txt`` / ``.min.txt`` views.
-        4. Append cycle metadata to ``manifest.json``.
+        1. Convert *messages* to VCC JSONL records via the adapter, streamed
+           straight into step 2.
+        2. Store the records for ``cycle_{compression_cycle}`` in the session's
+           record store (only records not seen in earlier cycles are written),
+           and index their text for session and archive-wide recall, or write a full
+           ``cycle_{compression_cycle}.jsonl`` when *dedup* is off.  The JSONL
+           size is counted as it is written.
+        3. Run VCC ``compile_records`` on the same records to produce
+           ``.txt`` / ``.min.txt`` views.
+        4. Append cycle metadata (message count, token estimate, JSONL bytes)
+           to ``manifest.json``.
 
     Args:
         messages: Hermes OpenAI-format message list (the full conversation).
         session_id: Unique session identifier used as subdirectory name.
         archive_dir: Root directory for all session archives.
         compression_cycle: Monotonically increasing cycle counter.
+        incremental: Reuse the converted records of messages seen in earlier
+            cycles, and the compiled state of the previous cycle when this
+            cycle's records extend it, so only new messages are converted and
+            compiled.
+        dedup: Write to the content-addressed record store instead of a full
+            JSONL file per cycle.
+        timings: If given, filled with the seconds spent in each stage
+            (``convert``, ``store``, ``index``, ``compile``, ``manifest``,
+            ``qmd``); conversion and storing are interleaved, so ``convert``
+            is the time spent producing records and ``store`` the rest.
 
     Returns:
         Path to the session subdirectory (always returned, even on partial
         failure, so the caller can reference it).
     """
     session_dir = ensure_dir(archive_dir / session_id)
+    t = time.perf_counter()
 
     try:
-        # --- 1. Convert to VCC records ---
-        from hermes_vcc.adapter import convert_conversation, records_to_jsonl
-
-        records = convert_conversation(messages)
-        jsonl_text = records_to_jsonl(records)
-
-        # --- 2. Write JSONL ---
-        jsonl_path = session_dir / f"cycle_{compression_cycle}.jsonl"
-        jsonl_path.write_text(jsonl_text, encoding="utf-8")
-
-        # --- 3. Run VCC compile ---
+        # --- 1+2. Convert and write JSONL (deduplicated), streamed ---
+        from hermes_vcc.adapter import iter_records
+
+        # The compiler needs the whole record list; it is collected from the
+        # same stream the writer serializes, so records are converted and
+        # encoded once and the JSONL text is never held in memory.
+        records: list[dict[str, Any]] = []
+        size: dict[str, int] = {}
+        convert_time = 0.0
+
+        def stream() -> Iterator[dict[str, Any]]:
+            nonlocal convert_time
+            if incremental:
+                it = _converter(session_dir).iter_records(messages)
+            else:
+                it = iter_records(messages)
+            while True:
+                start = time.perf_counter()
+                rec = next(it, None)
+                convert_time += time.perf_counter() - start
+                if rec is None:
+                    return
+                records.append(rec)
+                yield rec
+
+        def lap_write(t: float) -> float:
+            now = _lap(timings, "store", t + convert_time)
+            if timings is not None:
+                timings["convert"] = convert_time
+            return now
+
+        if dedup:
+            from hermes_vcc.store import write_cycle
+
+            write_cycle(session_dir, compression_cycle, stream(), stats=size)
+            t = lap_write(t)
+            try:
+                from hermes_vcc.recall_global import update_session
+                from hermes_vcc.recall_index import update_index
+
+                update_index(session_dir)
+                update_session(archive_dir, session_dir)
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("Recall index update failed for %s: %s", session_dir, exc)
+            t = _lap(timings, "index", t)
+        else:
+            from hermes_vcc.adapter import write_jsonl
+
+            jsonl_path = session_dir / f"cycle_{compression_cycle}.jsonl"
+            with jsonl_path.open("wb") as fh:
+                write_jsonl(stream(), fh, stats=size)
+            t = lap_write(t)
+
+        # --- 3. Run VCC compile (in memory, from the same records) ---
         try:
             vcc = import_vcc()
-            vcc.compile_pass(
-                str(jsonl_path),
+            compiled = vcc.compile_records(
+                records,
+                f"cycle_{compression_cycle}",
                 str(session_dir),
                 truncate=128,
                 truncate_user=256,
-                quiet=True,
+                cache=_compile_cache(session_dir) if incremental else None,
             )
+            for stem, full_text, brief_text in compiled:
+                (session_dir / f"{stem}.txt").write_text(full_text, encoding="utf-8")
+                (session_dir / f"{stem}.min.txt").write_text(brief_text, encoding="utf-8")
         except Exception as exc:  # noqa: BLE001
             logger.warning(
-                "VCC compile_pass failed for cycle %d of session %s: %s",
+                "VCC compile failed for cycle %d of session %s: %s",
                 compression_cycle,
                 session_id,
                 exc,
             )
+        t = _lap(timings, "compile", t)
 
         # --- 4. Update manifest ---
-        token_est = estimate_tokens(jsonl_text)
+        token_est = size.get("chars", 0) // 4  # utils.estimate_tokens of the JSONL
         manifest = _read_manifest(session_dir)
         cycles: list[dict[str, Any]] = manifest.get("cycles", [])
         cycles.append({
@@ -122,11 +248,13 @@ def archive_before_compression(
             "timestamp": datetime.now(timezone.utc).isoformat(),
             "message_count": len(messages),
             "tokens_estimate": token_est,
+            "bytes": size.get("bytes", 0),
         })
         manifest["cycles"] = cycles
         manifest["session_id"] = session_id
         manifest["last_updated"] = datetime.now(timezone.utc).isoformat()
         _write_manifest(session_dir, manifest)
+        t = _lap(timings, "manifest", t)
 
         # --- 5. Register with qmd for hybrid recall ---
         try:
@@ -136,6 +264,7 @@ def archive_before_compression(
                 qmd.ensure_collection(session_dir, session_id)
         except Exception as exc:  # noqa: BLE001
             logger.debug("qmd collection registration skipped: %s", exc)
+        _lap(timings, "qmd", t)
 
     except Exception as exc:  # noqa: BLE001
         logger.warning(
@@ -151,8 +280,9 @@ def archive_before_compression(
 def prune_archives(session_dir: Path, retain: int = 10) -> None:
     """Remove oldest archive cycles beyond *retain* count.
 
-    Deletes both the ``.jsonl`` source and VCC-produced ``.txt`` / ``.min.txt``
-    files for pruned cycles, then updates ``manifest.json``.
+    Deletes the ``.refs.json`` (or legacy ``.jsonl``) source and VCC-produced
+    ``.txt`` / ``.min.txt`` files for pruned cycles, updates ``manifest.json``
+    and drops records no remaining cycle references from the record store.
 
     Args:
         session_dir: Per-session archive directory containing manifest.json.
@@ -173,7 +303,7 @@ def prune_archives(session_dir: Path, retain: int = 10) -> None:
         for cycle in to_remove:
             cycle_id = cycle.get("id", "unknown")
             prefix = f"cycle_{cycle_id}"
-            # Remove all files matching cycle_<id>.* (jsonl, txt, min.txt)
+            # Remove all files matching cycle_<id>.* (refs.json, jsonl, txt, min.txt)
             for path in session_dir.glob(f"{prefix}.*"):
                 try:
                     path.unlink()
@@ -185,6 +315,10 @@ def prune_archives(session_dir: Path, retain: int = 10) -> None:
         manifest["last_updated"] = datetime.now(timezone.utc).isoformat()
         _write_manifest(session_dir, manifest)
 
+        from hermes_vcc.store import gc_store
+
+        gc_store(session_dir)
+
         logger.info(
             "Pruned %d archive cycles from %s, retained %d",
             len(to_remove),
@@ -207,3 +341,31 @@ def get_archive_manifest(session_dir: Path) -> dict[str, Any]:
         or cannot be read.
     """
     return _read_manifest(session_dir)
+
+
+def read_compaction_state(session_dir: Path) -> dict[str, Any]:
+    """Read the memory provider's saved compaction state for a session.
+
+    Args:
+        session_dir: Per-session archive directory.
+
+    Returns:
+        The dict last passed to :func:`write_compaction_state`, or empty
+        dict if there is none or it cannot be read.
+    """
+    return _read_json(session_dir / _COMPACTION_NAME, "compaction state")
+
+
+def write_compaction_state(session_dir: Path, state: dict[str, Any]) -> None:
+    """Save compaction state as ``compaction.json`` next to the manifest.
+
+    Never raises; failures are logged.
+
+    Args:
+        session_dir: Per-session archive directory (created if missing).
+        state: JSON-serializable state, e.g. ``Compaction.to_dict()``.
+    """
+    try:
+        _write_json(ensure_dir(session_dir) / _COMPACTION_NAME, state, "compaction state")
+    except OSError as exc:
+        logger.warning("Failed to save compaction state for %s: %s", session_dir, exc)
@@ -0,0 +1,362 @@
+"""Background archiving so compression never waits on VCC.
+
+:func:`hermes_vcc.archive.archive_before_compression` converts, stores and
+compiles the whole conversation and may run qmd subprocesses — far too slow
+to sit on the compression path.  :class:`BackgroundArchiver` takes a cheap
+snapshot of the message list, queues it and lets a single worker thread do
+the archiving, in submission order (which keeps incremental compiles warm).
+
+Crash safety: the worker journals each snapshot to
+``<session>/journal/cycle_{n}.<pid>.json`` as it takes it off the queue and
+removes the entry only once the cycle is archived, so the cycle being
+archived survives the process dying.  Serialising the conversation is left
+to the worker so :meth:`BackgroundArchiver.submit` stays a shallow copy;
+cycles still waiting in the queue are not journaled.  Journals left behind
+by a dead process are replayed by :meth:`BackgroundArchiver.recover`
+(called by :func:`get_archiver`).
+
+Like the archive itself, nothing here raises into the caller.
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from hermes_vcc.config import VCCConfig
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_DIR = "journal"
+_JOURNAL_RE = re.compile(r"cycle_(\d+)\.(\d+)\.json")
+
+_ARCHIVERS: dict[Path, "BackgroundArchiver"] = {}
+_ARCHIVERS_LOCK = threading.Lock()
+
+# How long interpreter exit (and session end) waits for queued cycles; a
+# cycle cut off mid-archive stays journaled and is replayed by the next
+# process.
+EXIT_FLUSH_TIMEOUT = 30.0
+
+
+@dataclass
+class _Job:
+    session_id: str
+    cycle: int
+    messages: list[dict[str, Any]]
+    retain: int = 0
+    journal: Path | None = None
+    replayed: bool = False
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+
+class BackgroundArchiver:
+    """Single-worker, bounded-queue archiver for one archive directory.
+
+    Args:
+        archive_dir: Root directory for all session archives.
+        config: Archive options (incremental compile, dedup store).
+        max_queue: Snapshots that may wait behind the running one; when the
+            queue is full :meth:`submit` blocks rather than dropping a cycle.
+    """
+
+    def __init__(
+        self,
+        archive_dir: Path,
+        config: VCCConfig | None = None,
+        *,
+        max_queue: int = 4,
+    ) -> None:
+        self.archive_dir = archive_dir
+        self.config = config or VCCConfig(archive_dir=archive_dir)
+        self._queue: queue.Queue[_Job | None] = queue.Queue(maxsize=max(1, max_queue))
+        self._lock = threading.Lock()
+        self._worker: threading.Thread | None = None
+        self._pending = 0
+        self._counts = {"submitted": 0, "completed": 0, "failed": 0, "recovered": 0}
+        # stage -> [count, total_s, max_s, last_s]
+        self._stages: dict[str, list[float]] = {}
+
+    # ------------------------------------------------------------------
+    # Producer side
+    # ------------------------------------------------------------------
+
+    def submit(
+        self,
+        messages: list[dict[str, Any]],
+        session_id: str,
+        cycle: int,
+        *,
+        retain: int = 0,
+    ) -> bool:
+        """Snapshot *messages* and queue them as cycle *cycle* of *session_id*.
+
+        Only the message list and the top-level message dicts are copied;
+        nested values are shared with the caller, which replaces rather than
+        mutates them during compression.  If *retain* is positive the session
+        is pruned to that many cycles after archiving.
+
+        Returns:
+            True if the cycle was queued.
+        """
+        try:
+            start = time.perf_counter()
+            job = _Job(session_id, cycle, [dict(m) for m in messages], retain)
+            self._record("snapshot", time.perf_counter() - start)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Failed to queue archive of cycle %d: %s", cycle, exc)
+            return False
+
+        try:
+            self._enqueue(job)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Failed to queue archive of cycle %d: %s", cycle, exc)
+            return False
+        return True
+
+    def _enqueue(self, job: _Job) -> None:
+        self._ensure_worker()
+        with self._lock:
+            self._pending += 1
+            self._counts["submitted"] += 1
+        self._queue.put(job)
+
+    def _ensure_worker(self) -> None:
+        with self._lock:
+            if self._worker is not None and self._worker.is_alive():
+                return
+            self._worker = threading.Thread(
+                target=self._run, name="hermes-vcc-archiver", daemon=True,
+            )
+            self._worker.start()
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Wait until every queued cycle is archived.
+
+        Returns:
+            True if the queue drained within *timeout* seconds.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def close(self, timeout: float | None = None) -> bool:
+        """Flush, then stop the worker thread."""
+        drained = self.flush(timeout)
+        worker = self._worker
+        if worker is not None and worker.is_alive():
+            self._queue.put(None)
+            worker.join(timeout)
+        return drained
+
+    def recover(self) -> int:
+        """Queue journaled cycles left behind by processes that died.
+
+        Returns:
+            Number of cycles queued for replay.
+        """
+        found: list[tuple[str, int, Path]] = []
+        try:
+            for path in self.archive_dir.glob(f"*/{JOURNAL_DIR}/cycle_*.json"):
+                m = _JOURNAL_RE.fullmatch(path.name)
+                if m and not _pid_alive(int(m.group(2))):
+                    found.append((path.parent.parent.name, int(m.group(1)), path))
+        except OSError:
+            return 0
+
+        replayed = 0
+        for _, _, path in sorted(found):
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+                job = _Job(
+                    data["session_id"], int(data["cycle"]), data["messages"],
+                    int(data.get("retain", 0)), path, replayed=True,
+                )
+            except (OSError, ValueError, KeyError, TypeError) as exc:
+                logger.warning("Discarding unreadable archive journal %s: %s", path, exc)
+                path.unlink(missing_ok=True)
+                continue
+            self._enqueue(job)
+            with self._lock:
+                self._counts["recovered"] += 1
+            replayed += 1
+        if replayed:
+            logger.info("Replaying %d journaled archive cycle(s) in %s", replayed, self.archive_dir)
+        return replayed
+
+    # ------------------------------------------------------------------
+    # Worker side
+    # ------------------------------------------------------------------
+
+    def _run(self) -> None:
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                self._journal(job)
+                self._archive(job)
+            finally:
+                self._queue.task_done()
+
+    def _archive(self, job: _Job) -> None:
+        from hermes_vcc.archive import (
+            archive_before_compression,
+            get_archive_manifest,
+            prune_archives,
+        )
+
+        session_dir = self.archive_dir / job.session_id
+        ok = False
+        try:
+            if job.replayed and any(
+                c.get("id") == job.cycle
+                for c in get_archive_manifest(session_dir).get("cycles", [])
+            ):
+                # Archived before the crash; only the journal cleanup was lost.
+                job.journal.unlink(missing_ok=True)
+                ok = True
+                return
+
+            timings: dict[str, float] = {}
+            archive_before_compression(
+                job.messages,
+                job.session_id,
+                self.archive_dir,
+                job.cycle,
+                incremental=self.config.incremental_compile,
+                dedup=self.config.dedup_store,
+                timings=timings,
+            )
+            if job.retain > 0:
+                start = time.perf_counter()
+                prune_archives(session_dir, retain=job.retain)
+                timings["prune"] = time.perf_counter() - start
+            for stage, seconds in timings.items():
+                self._record(stage, seconds)
+            if job.journal is not None:
+                job.journal.unlink(missing_ok=True)
+            ok = True
+        except Exception as exc:  # noqa: BLE001
+            logger.warning(
+                "Background archive failed for session %s cycle %d: %s",
+                job.session_id,
+                job.cycle,
+                exc,
+            )
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self._counts["completed" if ok else "failed"] += 1
+
+    def _journal(self, job: _Job) -> None:
+        """Journal a fresh job before archiving it; failure only costs the replay."""
+        if job.journal is not None:
+            return
+        try:
+            start = time.perf_counter()
+            job.journal = self._write_journal(self.archive_dir / job.session_id, job)
+            self._record("journal", time.perf_counter() - start)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning(
+                "Failed to journal archive of session %s cycle %d (archiving anyway): %s",
+                job.session_id,
+                job.cycle,
+                exc,
+            )
+
+    @staticmethod
+    def _write_journal(session_dir: Path, job: _Job) -> Path:
+        journal_dir = session_dir / JOURNAL_DIR
+        journal_dir.mkdir(parents=True, exist_ok=True)
+        path = journal_dir / f"cycle_{job.cycle}.{os.getpid()}.json"
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(
+            json.dumps(
+                {
+                    "session_id": job.session_id,
+                    "cycle": job.cycle,
+                    "retain": job.retain,
+                    "messages": job.messages,
+                },
+                ensure_ascii=False,
+                default=str,
+            ),
+            encoding="utf-8",
+        )
+        tmp.replace(path)
+        return path
+
+    # ------------------------------------------------------------------
+    # Status
+    # ------------------------------------------------------------------
+
+    def _record(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            s = self._stages.setdefault(stage, [0, 0.0, 0.0, 0.0])
+            s[0] += 1
+            s[1] += seconds
+            s[2] = max(s[2], seconds)
+            s[3] = seconds
+
+    def stats(self) -> dict[str, Any]:
+        """Queue depth, job counters and per-stage latency (milliseconds)."""
+        with self._lock:
+            return {
+                "queue_depth": self._pending,
+                **self._counts,
+                "stages": {
+                    stage: {
+                        "count": int(count),
+                        "last_ms": round(last * 1000, 3),
+                        "avg_ms": round(total / count * 1000, 3),
+                        "max_ms": round(peak * 1000, 3),
+                    }
+                    for stage, (count, total, peak, last) in self._stages.items()
+                },
+            }
+
+
+def get_archiver(archive_dir: Path, config: VCCConfig | None = None) -> BackgroundArchiver:
+    """Return the process-wide archiver for *archive_dir*, creating it once.
+
+    A new archiver replays journals left by crashed processes and is flushed
+    at interpreter exit for at most :data:`EXIT_FLUSH_TIMEOUT` seconds.
+    Replay happens outside the registry lock: queueing it may block on the
+    bounded queue, which must not hold up callers for other directories.
+    """
+    key = archive_dir.expanduser().resolve()
+    with _ARCHIVERS_LOCK:
+        archiver = _ARCHIVERS.get(key)
+        if archiver is not None:
+            return archiver
+        archiver = BackgroundArchiver(key, config)
+        _ARCHIVERS[key] = archiver
+        atexit.register(archiver.flush, EXIT_FLUSH_TIMEOUT)
+    archiver.recover()
+    return archiver
@@ -0,0 +1,86 @@
+"""Tool-result error matching for the adapter and hermes-dcp.
+
+:func:`is_error_result` is the archive's rule, used when records are
+converted (``hermes_vcc.adapter``):
+
+1. An explicit ``is_error`` field wins (``True`` or ``False``).
+2. Otherwise the first :data:`HEAD_CHARS` characters of the content are
+   searched for one of :data:`ERROR_INDICATORS` (case-sensitive).
+
+DCP keeps its own rule for which errored tool calls to purge
+(``hermes_dcp.engine``) and shares only the matcher, :func:`head_contains`.
+Both callers see every tool message again on every cycle, so matches are
+cached per content head.
+"""
+
+from __future__ import annotations
+
+import functools
+from typing import Any
+
+# Heuristic error indicators in tool results (substring match).
+ERROR_INDICATORS = (
+    "Error:", "error:", "Traceback", "traceback", "Exception:",
+    "FAILED", "failed:", "command not found", "No such file",
+    "Permission denied", "ModuleNotFoundError", "ImportError",
+    "SyntaxError", "TypeError", "ValueError", "KeyError",
+    "FileNotFoundError", "ConnectionError", "TimeoutError",
+)
+
+# Only the start of a tool result is inspected.
+HEAD_CHARS = 500
+
+# Every indicator contains one of these, so a head without any of them is
+# not an error.  Eight C-level substring scans settle the common (clean)
+# case; a combined regex alternation measured slower than the plain scans.
+_CORES = (
+    "rror", "raceback", "xception:", "FAILED", "failed:",
+    "not found", "No such file", "Permission denied",
+)
+
+
+@functools.lru_cache(maxsize=4096)
+def _classify_head(head: str) -> bool:
+    for core in _CORES:
+        if core in head:
+            return any(indicator in head for indicator in ERROR_INDICATORS)
+    return False
+
+
+@functools.lru_cache(maxsize=4096)
+def _head_contains(head: str, needles: tuple[str, ...], ignore_case: bool) -> bool:
+    if ignore_case:
+        head = head.lower()
+    return any(needle in head for needle in needles)
+
+
+def _head(content: Any) -> str:
+    if not isinstance(content, str):
+        content = str(content)
+    return content[:HEAD_CHARS]
+
+
+def head_contains(content: Any, needles: tuple[str, ...], *, ignore_case: bool = False) -> bool:
+    """Whether the first :data:`HEAD_CHARS` characters of *content* contain one of *needles*.
+
+    With *ignore_case* the head is lower-cased first (*needles* should be
+    lower case).  Cached per head.
+    """
+    if not content:
+        return False
+    return _head_contains(_head(content), needles, ignore_case)
+
+
+def looks_like_error(content: Any) -> bool:
+    """Whether *content* (a tool result body) looks like an error."""
+    if not content:
+        return False
+    return _classify_head(_head(content))
+
+
+def is_error_result(msg: dict[str, Any]) -> bool:
+    """Whether the tool result message *msg* reports an error."""
+    flag = msg.get("is_error")
+    if flag is not None:
+        return bool(flag)
+    return looks_like_error(msg.get("content"))
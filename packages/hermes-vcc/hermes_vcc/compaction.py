@@ -6,6 +6,11 @@ Ported from pi-vcc format.ts, render-entries.ts, build-sections.ts, summarize.ts
 
 import re
 import json
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Iterable
+
+from hermes_vcc.tokens import Tokenizer, get_tokenizer
 
 # ---------------------------------------------------------------------------
 # Constants
@@ -22,6 +27,8 @@ CONTEXT_PATTERNS = [
 ]
 
 HEADER_NAMES = ["Session Goal", "Files And Changes", "Outstanding Context", "User Preferences"]
+# Order in which a token budget is spent (the brief transcript comes last).
+BUDGET_PRIORITY = ["Session Goal", "User Preferences", "Outstanding Context", "Files And Changes"]
 SEPARATOR = "\n\n---\n\n"
 
 # ---------------------------------------------------------------------------
@@ -93,43 +100,46 @@ def build_outstanding_context(blocks: list[dict]) -> list[str]:
     return list(dict.fromkeys(items))[:8]
 
 
+def _render_brief(kept: list[str], omitted: int) -> str:
+    """Render the kept brief tail, noting *omitted* earlier lines."""
+    if not omitted:
+        return "\n".join(kept)
+    first_header = next((i for i, l in enumerate(kept) if re.match(r"^\[.+\]", l)), -1)
+    clean = kept[first_header:] if first_header > 0 else kept
+    return f"...({omitted} earlier lines omitted)\n\n{chr(10).join(clean)}"
+
+
 def cap_brief(text: str, max_lines: int = BRIEF_MAX_LINES) -> str:
     """Cap brief transcript to max_lines, keeping the tail."""
     lines = text.split("\n")
     if len(lines) <= max_lines:
         return text
-    omitted = len(lines) - max_lines
-    kept = lines[-max_lines:]
-    first_header = next((i for i, l in enumerate(kept) if re.match(r"^\[.+\]", l)), -1)
-    clean = kept[first_header:] if first_header > 0 else kept
-    return f"...({omitted} earlier lines omitted)\n\n{chr(10).join(clean)}"
+    return _render_brief(lines[-max_lines:], len(lines) - max_lines)
 
 
-def format_compaction(
-    goals: list[str],
-    file_ops: dict,
-    outstanding: list[str],
-    prefs: list[str],
-    brief: str,
-) -> str:
-    """
-    Format a full compaction summary string.
-
-    file_ops: dict with keys read_files, modified_files, created_files.
-    """
-    files_and_changes: list[str] = []
+def _file_items(file_ops: dict) -> list[str]:
+    items: list[str] = []
     for path in file_ops.get("modified_files", []):
-        files_and_changes.append(f"{path} (modified)")
+        items.append(f"{path} (modified)")
     for path in file_ops.get("created_files", []):
-        files_and_changes.append(f"{path} (created)")
+        items.append(f"{path} (created)")
     for path in file_ops.get("read_files", []):
-        files_and_changes.append(f"{path} (read)")
+        items.append(f"{path} (read)")
+    return items
 
+
+def _join(
+    goals: Iterable[str],
+    files: Iterable[str],
+    outstanding: Iterable[str],
+    prefs: Iterable[str],
+    brief: str,
+) -> str:
     header_parts = [
-        _section("Session Goal", goals),
-        _section("Files And Changes", files_and_changes),
-        _section("Outstanding Context", outstanding),
-        _section("User Preferences", prefs),
+        _section("Session Goal", list(goals)),
+        _section("Files And Changes", list(files)),
+        _section("Outstanding Context", list(outstanding)),
+        _section("User Preferences", list(prefs)),
     ]
     header_parts = [p for p in header_parts if p]
 
@@ -137,10 +147,75 @@ def format_compaction(
     if header_parts:
         parts.append("\n\n".join(header_parts))
     if brief:
-        parts.append(cap_brief(brief))
+        parts.append(brief)
     return SEPARATOR.join(parts)
 
 
+def _fit(
+    sections: dict[str, list[str]],
+    brief: list[str],
+    omitted: int,
+    max_tokens: int,
+    count: Tokenizer,
+) -> str:
+    """Render *sections* and the *brief* tail in at most *max_tokens* tokens.
+
+    Sections are filled item by item in ``BUDGET_PRIORITY`` order, then the
+    brief transcript from its newest line backwards.  Piece counts only
+    approximate the count of the joined text, so the result is re-counted
+    and trimmed (oldest brief lines, then lowest-priority items) until it
+    fits.
+    """
+    kept: dict[str, list[str]] = {title: [] for title in HEADER_NAMES}
+    used = 0
+    for title in BUDGET_PRIORITY:
+        header = count(f"[{title}]\n\n")
+        for item in sections[title]:
+            cost = count(f"- {item}\n") + (0 if kept[title] else header)
+            if used + cost > max_tokens:
+                break
+            kept[title].append(item)
+            used += cost
+
+    tail: list[str] = []
+    used += count(SEPARATOR) + count(f"...({omitted + len(brief)} earlier lines omitted)\n\n")
+    for line in reversed(brief):
+        used += count(f"{line}\n")
+        if used > max_tokens:
+            break
+        tail.append(line)
+    tail.reverse()
+
+    def render() -> str:
+        brief_text = _render_brief(tail, omitted + len(brief) - len(tail)) if tail else ""
+        return _join(*(kept[title] for title in HEADER_NAMES), brief_text)
+
+    text = render()
+    while text and count(text) > max_tokens:
+        if tail:
+            tail.pop(0)
+        else:
+            title = next(t for t in reversed(BUDGET_PRIORITY) if kept[t])
+            kept[title].pop()
+        text = render()
+    return text
+
+
+def format_compaction(
+    goals: list[str],
+    file_ops: dict,
+    outstanding: list[str],
+    prefs: list[str],
+    brief: str,
+) -> str:
+    """
+    Format a full compaction summary string.
+
+    file_ops: dict with keys read_files, modified_files, created_files.
+    """
+    return _join(goals, _file_items(file_ops), outstanding, prefs, cap_brief(brief) if brief else "")
+
+
 def _parse_header_section(text: str, header: str) -> str | None:
     """Extract the body of a named section from a compaction string."""
     pattern = re.compile(
@@ -205,3 +280,86 @@ def merge_compactions(prev: str, fresh: str) -> str:
     if capped_brief:
         parts.append(capped_brief)
     return SEPARATOR.join(parts)
+
+
+@dataclass
+class Compaction:
+    """A compaction summary kept as structured sections across cycles.
+
+    The incremental form of :func:`merge_compactions`: each :meth:`update`
+    folds in one cycle's signals instead of re-parsing the previous summary
+    text.  Goals, files and preferences are ordered sets (dicts), so the
+    deduplicated union keeps first-seen order; outstanding context is
+    replaced by the latest cycle's; the brief transcript keeps its last
+    ``BRIEF_MAX_LINES`` lines and counts the ones that fell off.  Text is
+    only produced by :meth:`render`.
+    """
+
+    goals: dict[str, None] = field(default_factory=dict)
+    files: dict[str, None] = field(default_factory=dict)
+    outstanding: list[str] = field(default_factory=list)
+    preferences: dict[str, None] = field(default_factory=dict)
+    brief: deque[str] = field(default_factory=lambda: deque(maxlen=BRIEF_MAX_LINES))
+    omitted: int = 0
+
+    def update(
+        self,
+        goals: list[str],
+        file_ops: dict,
+        outstanding: list[str],
+        prefs: list[str],
+        brief: str,
+    ) -> None:
+        """Merge one cycle's signals (``format_compaction``'s arguments)."""
+        self.goals.update(dict.fromkeys(goals))
+        self.files.update(dict.fromkeys(_file_items(file_ops)))
+        self.outstanding = list(outstanding)
+        self.preferences.update(dict.fromkeys(prefs))
+        if brief:
+            lines = brief.split("\n")
+            self.omitted += max(0, len(self.brief) + len(lines) - BRIEF_MAX_LINES)
+            self.brief.extend(lines)
+
+    def render(self, max_tokens: int | None = None, tokenizer: str = "auto") -> str:
+        """The summary text, laid out like :func:`format_compaction`.
+
+        With *max_tokens*, the text is kept within that many tokens as
+        counted by *tokenizer* (see :mod:`hermes_vcc.tokens`): sections are
+        filled in ``BUDGET_PRIORITY`` order, then as much of the brief
+        transcript's tail as still fits.
+        """
+        if max_tokens is None:
+            return _join(
+                self.goals, self.files, self.outstanding, self.preferences,
+                _render_brief(list(self.brief), self.omitted),
+            )
+        sections = {
+            "Session Goal": list(self.goals),
+            "Files And Changes": list(self.files),
+            "Outstanding Context": self.outstanding,
+            "User Preferences": list(self.preferences),
+        }
+        return _fit(sections, list(self.brief), self.omitted, max_tokens, get_tokenizer(tokenizer))
+
+    def to_dict(self) -> dict[str, Any]:
+        """JSON-serializable state, the inverse of :meth:`from_dict`."""
+        return {
+            "goals": list(self.goals),
+            "files": list(self.files),
+            "outstanding": self.outstanding,
+            "preferences": list(self.preferences),
+            "brief": list(self.brief),
+            "omitted": self.omitted,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "Compaction":
+        """Rebuild a compaction saved with :meth:`to_dict`."""
+        return cls(
+            goals=dict.fromkeys(data.get("goals", [])),
+            files=dict.fromkeys(data.get("files", [])),
+            outstanding=list(data.get("outstanding", [])),
+            preferences=dict.fromkeys(data.get("preferences", [])),
+            brief=deque(data.get("brief", []), maxlen=BRIEF_MAX_LINES),
+            omitted=int(data.get("omitted", 0)),
+        )
@@ -24,6 +24,11 @@ class VCCConfig:
         default_factory=lambda: Path.home() / ".hermes" / "vcc_archives"
     )
     retain_archives: int = 10
+    incremental_compile: bool = True
+    dedup_store: bool = True
+    async_archive: bool = True
+    summary_max_tokens: int = 0
+    tokenizer: str = "auto"
 
     def __post_init__(self) -> None:
         if isinstance(self.archive_dir, str):
@@ -63,10 +68,23 @@ def load_config(config_path: Path | None = None) -> VCCConfig:
         kwargs["enabled"] = bool(vcc_section["enabled"])
     if "archive_dir" in vcc_section:
         kwargs["archive_dir"] = Path(str(vcc_section["archive_dir"]))
+    if "incremental_compile" in vcc_section:
+        kwargs["incremental_compile"] = bool(vcc_section["incremental_compile"])
+    if "dedup_store" in vcc_section:
+        kwargs["dedup_store"] = bool(vcc_section["dedup_store"])
+    if "async_archive" in vcc_section:
+        kwargs["async_archive"] = bool(vcc_section["async_archive"])
     if "retain_archives" in vcc_section:
         try:
             kwargs["retain_archives"] = int(vcc_section["retain_archives"])
         except (TypeError, ValueError):
             pass
+    if "summary_max_tokens" in vcc_section:
+        try:
+            kwargs["summary_max_tokens"] = max(0, int(vcc_section["summary_max_tokens"]))
+        except (TypeError, ValueError):
+            pass
+    if "tokenizer" in vcc_section:
+        kwargs["tokenizer"] = str(vcc_section["tokenizer"])
 
     return VCCConfig(**kwargs)
@@ -9,8 +9,6 @@ function that takes Hermes messages and returns the .min.txt content.
 from __future__ import annotations
 
 import logging
-import tempfile
-from pathlib import Path
 from typing import Any
 
 logger = logging.getLogger(__name__)
@@ -19,8 +17,9 @@ logger = logging.getLogger(__name__)
 def compile_to_brief(messages: list[dict[str, Any]]) -> str | None:
     """Compile messages to VCC .min.txt — the structural summary.
 
-    Converts Hermes OpenAI-format messages to VCC JSONL, runs VCC's
-    compiler pipeline, and returns the .min.txt content directly.
+    Converts Hermes OpenAI-format messages to VCC records and runs VCC's
+    compiler pipeline in memory via ``compile_records`` — no temp files,
+    no JSONL round-trip.
 
     This is deterministic, instant, and free (no LLM call).
 
@@ -28,34 +27,28 @@ def compile_to_brief(messages: list[dict[str, Any]]) -> str | None:
         messages: Hermes OpenAI-format message list.
 
     Returns:
-        The .min.txt content, or None on failure.
+        The .min.txt content, or None on failure.  Conversations that span
+        a compaction boundary compile to several chains and, as with the
+        on-disk ``input.min.txt``, have no single brief.
     """
     if not messages:
         return None
 
     try:
-        from hermes_vcc.adapter import convert_conversation, records_to_jsonl
+        from hermes_vcc.adapter import convert_conversation
         from hermes_vcc.utils import import_vcc
 
         vcc = import_vcc()
         records = convert_conversation(messages)
-        jsonl_text = records_to_jsonl(records)
-
-        with tempfile.TemporaryDirectory(prefix="hermes_vcc_") as tmpdir:
-            work_dir = Path(tmpdir)
-            jsonl_path = work_dir / "input.jsonl"
-            jsonl_path.write_text(jsonl_text, encoding="utf-8")
-
-            vcc.compile_pass(
-                str(jsonl_path), str(work_dir),
-                truncate=128, truncate_user=256, quiet=True,
-            )
-
-            min_path = work_dir / "input.min.txt"
-            if min_path.is_file():
-                content = min_path.read_text(encoding="utf-8").strip()
-                if content:
-                    return content
+
+        chains = vcc.compile_records(
+            records, "input",
+            truncate=128, truncate_user=256, want_full=False,
+        )
+        if len(chains) == 1:
+            content = (chains[0][2] or "").strip()
+            if content:
+                return content
 
     except Exception as exc:
         logger.warning("compile_to_brief failed: %s", exc)
@@ -1,7 +1,8 @@
 """Install VCC into a running Hermes agent.
 
 One hook: archive the full conversation as VCC views (.txt, .min.txt)
-before each compression cycle. The LLM summary is left untouched —
+before each compression cycle (on a background thread unless
+``async_archive`` is off, see :mod:`hermes_vcc.archiver`). The LLM summary is left untouched —
 VCC is a projection tool for trace analysis and recovery, not a
 replacement for semantic compression summaries.
 
@@ -63,9 +64,11 @@ def _install_archive(agent: Any, config: VCCConfig) -> bool:
             return True  # already installed
 
         from hermes_vcc.archive import archive_before_compression, prune_archives
+        from hermes_vcc.archiver import get_archiver
         from hermes_vcc.utils import ensure_dir
 
         archive_dir = ensure_dir(config.archive_dir)
+        archiver = get_archiver(archive_dir, config) if config.async_archive else None
 
         @functools.wraps(original)
         def wrapper(messages, system_message, *args, **kwargs):
@@ -73,9 +76,16 @@ def _install_archive(agent: Any, config: VCCConfig) -> bool:
             cycle = getattr(agent, _CYCLE_ATTR, 0) + 1
             setattr(agent, _CYCLE_ATTR, cycle)
 
+            if archiver is not None:
+                # Only the snapshot happens here; the worker thread archives.
+                archiver.submit(messages, session_id, cycle, retain=config.retain_archives)
+                return original(messages, system_message, *args, **kwargs)
+
             try:
                 session_dir = archive_before_compression(
                     messages, session_id, archive_dir, cycle,
+                    incremental=config.incremental_compile,
+                    dedup=config.dedup_store,
                 )
                 if config.retain_archives > 0:
                     prune_archives(session_dir, retain=config.retain_archives)
@@ -85,6 +95,7 @@ def _install_archive(agent: Any, config: VCCConfig) -> bool:
             return original(messages, system_message, *args, **kwargs)
 
         wrapper._vcc_wrapped = True  # type: ignore[attr-defined]
+        wrapper._vcc_archiver = archiver  # type: ignore[attr-defined]
         agent._compress_context = wrapper
         return True
 
@@ -1,24 +1,51 @@
 """qmd integration for hermes-vcc recall.
 
-Wraps the qmd CLI to manage VCC archive collections and run hybrid search
+Wraps qmd to manage VCC archive collections and run hybrid search
 (BM25 + vector + reranking) over archived conversation transcripts.
 
+Searches and document reads use the qmd CLI.  Setting ``HERMES_VCC_QMD_MCP=1``
+routes them through one long-lived ``qmd mcp`` worker (line-delimited
+JSON-RPC over stdio) per process instead, so they do not pay a process
+start and model load each time.  The worker is opt-in because its tool
+arguments are inferred from the advertised ``inputSchema`` and have not
+been checked against a real qmd server.  Anything the worker cannot do —
+it failed to start, lacks a tool, or errors — falls back to the CLI.
+Collection updates are scoped to the archived session's collection.
+
 qmd is optional — all functions degrade gracefully if the binary is absent.
 """
 
 from __future__ import annotations
 
+import atexit
 import json
 import logging
+import os
+import queue
 import shutil
 import subprocess
+import threading
 from pathlib import Path
+from typing import Any
 
 logger = logging.getLogger(__name__)
 
 _COLLECTION_PREFIX = "vcc-"
 _QMD_BIN: str | None = None
 
+_WORKER: "_QmdWorker | None" = None
+_WORKER_LOCK = threading.Lock()
+_WORKER_FAILURES = 0
+_MAX_WORKER_FAILURES = 3
+_WORKER_ENV = "HERMES_VCC_QMD_MCP"
+_KNOWN_COLLECTIONS: set[str] = set()
+# None until tried: whether ``qmd update`` accepts ``-c <collection>``.
+_SCOPED_UPDATE: bool | None = None
+
+# index.yml path -> ((mtime_ns, size), parsed config)
+_REGISTRY_CACHE: dict[Path, tuple[tuple[int, int], dict[str, Any]]] = {}
+_REGISTRY_LOCK = threading.Lock()
+
 
 def _qmd_bin() -> str | None:
     """Find qmd binary, caching the result."""
@@ -46,6 +73,207 @@ def _run(args: list[str], timeout: int = 30) -> subprocess.CompletedProcess[str]
     )
 
 
+# ---------------------------------------------------------------------------
+# Persistent worker
+# ---------------------------------------------------------------------------
+
+class WorkerError(RuntimeError):
+    """The qmd worker failed a request; callers fall back to the CLI."""
+
+
+class _QmdWorker:
+    """Client for a ``qmd mcp`` server process speaking JSON-RPC over stdio.
+
+    One request is in flight at a time; a reader thread hands responses
+    back by id so a timed-out request cannot be mistaken for the next one.
+    """
+
+    def __init__(self, binary: str, timeout: float = 30) -> None:
+        self._proc = subprocess.Popen(
+            [binary, "mcp"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            encoding="utf-8",
+            bufsize=1,
+        )
+        self._responses: queue.Queue[dict[str, Any] | None] = queue.Queue()
+        self._lock = threading.Lock()
+        self._next_id = 0
+        threading.Thread(target=self._read, name="hermes-vcc-qmd", daemon=True).start()
+        try:
+            self.request(
+                "initialize",
+                {
+                    "protocolVersion": "2024-11-05",
+                    "capabilities": {},
+                    "clientInfo": {"name": "hermes-vcc", "version": "1"},
+                },
+                timeout,
+            )
+            self._notify("notifications/initialized")
+            listed = self.request("tools/list", {}, timeout)
+        except WorkerError:
+            self.close()
+            raise
+        self.tools: dict[str, dict[str, Any]] = {
+            t["name"]: t.get("inputSchema", {}).get("properties", {})
+            for t in listed.get("tools", [])
+            if isinstance(t, dict) and "name" in t
+        }
+
+    def _read(self) -> None:
+        assert self._proc.stdout is not None
+        for line in self._proc.stdout:
+            try:
+                msg = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(msg, dict) and "id" in msg:
+                self._responses.put(msg)
+        self._responses.put(None)  # EOF: the server exited
+
+    def _send(self, msg: dict[str, Any]) -> None:
+        assert self._proc.stdin is not None
+        try:
+            self._proc.stdin.write(json.dumps(msg) + "\n")
+            self._proc.stdin.flush()
+        except (OSError, ValueError) as exc:
+            raise WorkerError(f"qmd worker write failed: {exc}") from exc
+
+    def _notify(self, method: str) -> None:
+        self._send({"jsonrpc": "2.0", "method": method})
+
+    def alive(self) -> bool:
+        return self._proc.poll() is None
+
+    def request(self, method: str, params: dict[str, Any], timeout: float) -> dict[str, Any]:
+        """Send one request and wait for its result."""
+        with self._lock:
+            self._next_id += 1
+            req_id = self._next_id
+            self._send({"jsonrpc": "2.0", "id": req_id, "method": method, "params": params})
+            while True:
+                try:
+                    msg = self._responses.get(timeout=timeout)
+                except queue.Empty:
+                    self._proc.kill()  # wedged; the next request starts a new worker
+                    raise WorkerError(f"qmd worker timed out on {method}") from None
+                if msg is None:
+                    raise WorkerError("qmd worker exited")
+                if msg.get("id") != req_id:
+                    continue  # late reply to an abandoned request
+                if "error" in msg:
+                    raise WorkerError(f"qmd worker {method} failed: {msg['error']}")
+                return msg.get("result") or {}
+
+    def call_tool(self, name: str, arguments: dict[str, Any], timeout: float) -> dict[str, Any]:
+        result = self.request("tools/call", {"name": name, "arguments": arguments}, timeout)
+        if result.get("isError"):
+            raise WorkerError(f"qmd tool {name} failed: {_tool_text(result)[:200]}")
+        return result
+
+    def close(self) -> None:
+        try:
+            if self._proc.stdin is not None:
+                self._proc.stdin.close()
+            self._proc.wait(timeout=2)
+        except Exception:  # noqa: BLE001
+            self._proc.kill()
+
+
+def _tool_text(result: dict[str, Any]) -> str:
+    return "".join(
+        c.get("text", "")
+        for c in result.get("content", [])
+        if isinstance(c, dict) and c.get("type") == "text"
+    )
+
+
+def _worker() -> _QmdWorker | None:
+    """Return the process-wide qmd worker, starting it if needed.
+
+    None (CLI only) unless ``HERMES_VCC_QMD_MCP=1``, and after repeated
+    start failures.
+    """
+    global _WORKER, _WORKER_FAILURES  # noqa: PLW0603
+    if os.environ.get(_WORKER_ENV) != "1":
+        return None
+    with _WORKER_LOCK:
+        if _WORKER is not None and _WORKER.alive():
+            return _WORKER
+        _WORKER = None
+        binary = _qmd_bin()
+        if binary is None or _WORKER_FAILURES >= _MAX_WORKER_FAILURES:
+            return None
+        try:
+            _WORKER = _QmdWorker(binary)
+        except (OSError, WorkerError) as exc:
+            _WORKER_FAILURES += 1
+            logger.debug("qmd worker unavailable, using CLI: %s", exc)
+            return None
+        return _WORKER
+
+
+def close_worker() -> None:
+    """Stop the qmd worker (the next request starts a fresh one)."""
+    global _WORKER  # noqa: PLW0603
+    with _WORKER_LOCK:
+        if _WORKER is not None:
+            _WORKER.close()
+            _WORKER = None
+
+
+atexit.register(close_worker)
+
+
+def _search_via_worker(
+    query: str,
+    collection: str,
+    max_results: int,
+    use_hybrid: bool,
+) -> list[dict] | None:
+    """Search one collection through the worker; None to fall back to the CLI."""
+    worker = _worker()
+    if worker is None:
+        return None
+    tool = "query" if use_hybrid else "search"
+    props = worker.tools.get(tool)
+    if props is None:
+        return None
+
+    args: dict[str, Any] = {"limit": max_results}
+    if "query" in props:
+        args["query"] = query
+    elif "searches" in props:
+        kinds = ("lex", "vec") if use_hybrid else ("lex",)
+        args["searches"] = [{"type": k, "query": query} for k in kinds]
+    else:
+        return None
+    if "collection" in props:
+        args["collection"] = collection
+    elif "collections" in props:
+        args["collections"] = [collection]
+    else:
+        return None
+
+    try:
+        result = worker.call_tool(tool, args, timeout=60)
+    except WorkerError as exc:
+        logger.debug("qmd worker search failed, using CLI: %s", exc)
+        return None
+    raw = (result.get("structuredContent") or {}).get("results")
+    if raw is None:
+        try:
+            raw = json.loads(_tool_text(result))
+        except json.JSONDecodeError:
+            return None
+        if isinstance(raw, dict):
+            raw = raw.get("results")
+    return raw if isinstance(raw, list) else None
+
+
 def collection_name(session_id: str) -> str:
     """Derive a qmd collection name from a session ID."""
     safe = session_id.replace("/", "-").replace(" ", "-")[:60]
@@ -57,6 +285,8 @@ def ensure_collection(session_dir: Path, session_id: str) -> bool:
 
     Points qmd at the session directory with a ``**/*.txt`` glob so it
     indexes both ``.txt`` (full views) and ``.min.txt`` (brief views).
+    Collections already known to this process skip the existence check,
+    and only this collection is re-indexed.
 
     Returns True if the collection was successfully created/updated.
     """
@@ -66,13 +296,20 @@ def ensure_collection(session_dir: Path, session_id: str) -> bool:
     name = collection_name(session_id)
     abs_dir = str(session_dir.resolve())
 
+    if name not in _KNOWN_COLLECTIONS:
+        registry = _load_registry(_config_path()) or {}
+        if (registry.get("collections") or {}).get(name) == _collection_entry(abs_dir):
+            _KNOWN_COLLECTIONS.add(name)
+    if name in _KNOWN_COLLECTIONS:
+        return _update_collection(name)
+
     try:
         # Check if collection already exists
         result = _run(["collection", "show", name])
         if result.returncode == 0:
-            # Already exists — just update index
-            _run(["update"], timeout=60)
-            return True
+            # Already exists — just update its index
+            _KNOWN_COLLECTIONS.add(name)
+            return _update_collection(name)
     except Exception:
         pass
 
@@ -86,47 +323,138 @@ def ensure_collection(session_dir: Path, session_id: str) -> bool:
         # The CLI defaults to **/*.md — we need to fix the pattern via config.
         # For now, update the config file directly.
         _patch_collection_pattern(name, abs_dir)
+        _KNOWN_COLLECTIONS.add(name)
+        # The worker read the collection list at startup.
+        close_worker()
 
         # Re-index with the correct pattern
-        _run(["update"], timeout=60)
-        return True
+        return _update_collection(name)
 
     except Exception as exc:
         logger.warning("qmd ensure_collection failed: %s", exc)
         return False
 
 
+def _update_collection(name: str) -> bool:
+    """Re-index collection *name* only, if this qmd supports scoping.
+
+    ``qmd update -c <name>`` is tried once; if qmd rejects it, every later
+    update in this process runs the plain (all collections) ``qmd update``.
+    """
+    global _SCOPED_UPDATE  # noqa: PLW0603
+    try:
+        if _SCOPED_UPDATE is not False:
+            result = _run(["update", "-c", name], timeout=60)
+            if result.returncode == 0:
+                _SCOPED_UPDATE = True
+                return True
+            if _SCOPED_UPDATE is True:
+                logger.warning("qmd update of %s failed: %s", name, result.stderr)
+                return False
+            _SCOPED_UPDATE = False
+        result = _run(["update"], timeout=60)
+        return result.returncode == 0
+    except Exception as exc:
+        logger.warning("qmd update of %s failed: %s", name, exc)
+        return False
+
+
+# ---------------------------------------------------------------------------
+# Collection registry (~/.config/qmd/index.yml)
+# ---------------------------------------------------------------------------
+
+def _config_path() -> Path:
+    return Path.home() / ".config" / "qmd" / "index.yml"
+
+
+def _yaml_loader(yaml: Any) -> Any:
+    return getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def _load_registry(config_path: Path) -> dict[str, Any] | None:
+    """Parsed index.yml, cached in-process until its mtime or size changes.
+
+    Returns None if the file is missing, unparseable or PyYAML is absent.
+    Callers must not mutate the returned dict.
+    """
+    try:
+        import yaml
+    except ImportError:
+        return None
+    try:
+        st = config_path.stat()
+    except OSError:
+        return None
+    key = (st.st_mtime_ns, st.st_size)
+    with _REGISTRY_LOCK:
+        cached = _REGISTRY_CACHE.get(config_path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+    try:
+        data = yaml.load(config_path.read_text(encoding="utf-8"), Loader=_yaml_loader(yaml))
+    except Exception as exc:  # noqa: BLE001
+        logger.debug("Failed to parse qmd config %s: %s", config_path, exc)
+        return None
+    if not isinstance(data, dict):
+        return None
+    with _REGISTRY_LOCK:
+        _REGISTRY_CACHE[config_path] = (key, data)
+    return data
+
+
+def _collection_entry(path: str) -> dict[str, Any]:
+    return {
+        "path": path,
+        "pattern": "**/*.txt",
+        "context": {
+            "": "VCC conversation archive — lossless agent session transcripts and brief views",
+        },
+        "includeByDefault": False,
+    }
+
+
 def _patch_collection_pattern(name: str, path: str) -> None:
-    """Patch the qmd index.yml to set pattern to **/*.txt for a collection."""
+    """Patch the qmd index.yml to set pattern to **/*.txt for a collection.
+
+    One read-modify-write under a file lock (``index.yml.lock``), written to
+    a temp file and renamed into place; skipped if the entry is already
+    right.  Each archived cycle registers at most one collection and must
+    re-index right after, so there is nothing to batch.
+    """
     try:
         import yaml
     except ImportError:
         logger.debug("pyyaml not available, skipping qmd config patch")
         return
 
-    config_path = Path.home() / ".config" / "qmd" / "index.yml"
+    config_path = _config_path()
     if not config_path.exists():
         return
 
-    try:
-        data = yaml.safe_load(config_path.read_text(encoding="utf-8"))
-        if not isinstance(data, dict):
-            return
-
-        collections = data.setdefault("collections", {})
-        collections[name] = {
-            "path": path,
-            "pattern": "**/*.txt",
-            "context": {
-                "": "VCC conversation archive — lossless agent session transcripts and brief views",
-            },
-            "includeByDefault": False,
-        }
+    from hermes_vcc.utils import file_lock
 
-        config_path.write_text(
-            yaml.dump(data, default_flow_style=False, sort_keys=False),
-            encoding="utf-8",
-        )
+    try:
+        with file_lock(config_path.with_name(config_path.name + ".lock")):
+            data = _load_registry(config_path)
+            if data is None:
+                return
+            collections = data.get("collections") or {}
+            entry = _collection_entry(path)
+            if collections.get(name) == entry:
+                return
+
+            data = {**data, "collections": {**collections, name: entry}}
+            dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+            tmp = config_path.with_name(f"{config_path.name}.{os.getpid()}.tmp")
+            tmp.write_text(
+                yaml.dump(data, Dumper=dumper, default_flow_style=False,
+                          sort_keys=False, allow_unicode=True),
+                encoding="utf-8",
+            )
+            tmp.replace(config_path)
+            st = config_path.stat()
+            with _REGISTRY_LOCK:
+                _REGISTRY_CACHE[config_path] = ((st.st_mtime_ns, st.st_size), data)
     except Exception as exc:
         logger.warning("Failed to patch qmd config: %s", exc)
 
@@ -137,6 +465,7 @@ def remove_collection(session_id: str) -> bool:
         return False
 
     name = collection_name(session_id)
+    _KNOWN_COLLECTIONS.discard(name)
     try:
         result = _run(["collection", "remove", name])
         return result.returncode == 0
@@ -170,6 +499,9 @@ def search(
     args = [cmd, query, "--json", "-n", str(max_results)]
 
     if session_id:
+        raw = _search_via_worker(query, collection_name(session_id), max_results, use_hybrid)
+        if raw is not None:
+            return _normalize_results(raw, max_results)
         args.extend(["-c", collection_name(session_id)])
     else:
         # Search all VCC collections — collect their names
@@ -192,17 +524,7 @@ def search(
         if not isinstance(raw, list):
             return []
 
-        return [
-            {
-                "file": r.get("file", ""),
-                "title": r.get("title", ""),
-                "score": r.get("score", 0),
-                "snippet": r.get("snippet", ""),
-                "docid": r.get("docid", ""),
-                "context": r.get("context", ""),
-            }
-            for r in raw[:max_results]
-        ]
+        return _normalize_results(raw, max_results)
 
     except json.JSONDecodeError:
         logger.warning("qmd returned invalid JSON")
@@ -212,31 +534,34 @@ def search(
         return []
 
 
+def _normalize_results(raw: list[Any], max_results: int) -> list[dict]:
+    return [
+        {
+            "file": r.get("file", ""),
+            "title": r.get("title", ""),
+            "score": r.get("score", 0),
+            "snippet": r.get("snippet", ""),
+            "docid": r.get("docid", ""),
+            "context": r.get("context", ""),
+        }
+        for r in raw[:max_results]
+        if isinstance(r, dict)
+    ]
+
+
 def list_vcc_collections() -> list[str]:
     """Return names of all VCC-managed qmd collections."""
     if not is_available():
         return []
 
-    try:
-        import yaml
-    except ImportError:
-        return []
-
-    config_path = Path.home() / ".config" / "qmd" / "index.yml"
-    if not config_path.exists():
-        return []
-
-    try:
-        data = yaml.safe_load(config_path.read_text(encoding="utf-8"))
-        if not isinstance(data, dict):
-            return []
-        collections = data.get("collections", {})
-        return [
-            name for name in collections
-            if name.startswith(_COLLECTION_PREFIX)
-        ]
-    except Exception:
+    data = _load_registry(_config_path())
+    if data is None:
         return []
+    collections = data.get("collections") or {}
+    return [
+        name for name in collections
+        if name.startswith(_COLLECTION_PREFIX)
+    ]
 
 
 def get_document(file_ref: str) -> str | None:
@@ -251,6 +576,14 @@ def get_document(file_ref: str) -> str | None:
     if not is_available():
         return None
 
+    worker = _worker()
+    if worker is not None and "get" in worker.tools:
+        try:
+            result = worker.call_tool("get", {"file": file_ref, "lineNumbers": True}, timeout=30)
+            return _tool_text(result)
+        except WorkerError as exc:
+            logger.debug("qmd worker get failed, using CLI: %s", exc)
+
     try:
         result = _run(["get", file_ref, "--line-numbers"])
         if result.returncode != 0:
@@ -1,28 +1,38 @@
 """vcc_recall: search conversation history across compaction boundaries.
 
-Uses qmd hybrid search (BM25 + vector + reranking) when available,
-falling back to regex matching over raw JSONL archives.
+Uses qmd hybrid search (BM25 + vector + reranking) when available.
+Without qmd, keyword queries are ranked with BM25F over a persistent index
+of the archived records (:mod:`hermes_vcc.recall_index`); regex queries,
+and queries BM25 finds nothing for, fall back to regex matching over the
+records, shortlisted by the same index.
 """
 
 from __future__ import annotations
 
+import itertools
 import json
 import re
 from pathlib import Path
+from typing import Any
 
 
 def recall_search(
     query: str,
-    session_id: str,
+    session_id: str | None,
     archive_dir: Path,
     max_results: int = 20,
 ) -> list[dict]:
     """Search archived conversation history.
 
-    Tries qmd hybrid search first for ranked, semantic results.
-    Falls back to regex scanning of JSONL archives if qmd is unavailable.
+    Tries qmd hybrid search first for ranked, semantic results.  Without
+    qmd, ranks keyword queries with the built-in BM25F index, then falls
+    back to regex scanning of the archived records.
+
+    A *session_id* of None searches every session under *archive_dir*
+    (see :mod:`hermes_vcc.recall_global`).
 
-    Returns a list of dicts with keys: cycle, line, role, preview, score.
+    Returns a list of dicts with keys: cycle, line, role, preview, score
+    (plus session_id when searching all sessions).
     """
     from hermes_vcc import qmd
 
@@ -31,6 +41,15 @@ def recall_search(
         if results:
             return results
 
+    if session_id is None:
+        from hermes_vcc.recall_global import search_all
+
+        return search_all(query, archive_dir, max_results)
+
+    results = _recall_via_bm25(query, session_id, archive_dir, max_results)
+    if results:
+        return results
+
     return _recall_via_regex(query, session_id, archive_dir, max_results)
 
 
@@ -50,7 +69,7 @@ def recall_expand(
 
 def _recall_via_qmd(
     query: str,
-    session_id: str,
+    session_id: str | None,
     max_results: int,
 ) -> list[dict]:
     """Search via qmd hybrid search, normalizing results to recall format."""
@@ -82,60 +101,208 @@ def _cycle_from_path(file_path: str) -> int:
     return int(m.group(1)) if m else 0
 
 
+# Regex syntax that keyword ranking would silently ignore.
+_REGEX_HINT = re.compile(r"[\\\[\](){}^$|*]|\.[*+?]")
+
+
+def _recall_via_bm25(
+    query: str,
+    session_id: str,
+    archive_dir: Path,
+    max_results: int,
+    *,
+    stats: Any = None,
+) -> list[dict]:
+    """Rank records for a keyword query with BM25F over the recall index.
+
+    Each record is reported once, at its latest occurrence (records repeat
+    across cycles).  Returns ``[]`` — leaving the query to the regex
+    fallback — for regex-looking queries, sessions with legacy
+    ``cycle_N.jsonl`` cycles, and queries no indexed token matches.
+    *stats* (:class:`~hermes_vcc.recall_index.CorpusStats`) overrides the
+    session's own BM25 statistics.
+    """
+    from hermes_vcc import recall_index
+    from hermes_vcc.store import cycle_refs, list_cycles
+
+    terms = recall_index.query_terms(query)
+    if not terms or _REGEX_HINT.search(query):
+        return []
+    session_path = archive_dir / session_id
+    cycles = list_cycles(session_path)
+    refs = [(c, cycle_refs(session_path, c)) for c in reversed(cycles)]
+    if not refs or any(r is None for _, r in refs):
+        return []
+
+    for _attempt in range(2):
+        ranked = recall_index.rank(session_path, terms, stats)
+        if ranked is None:
+            return []
+        try:
+            return _take_ranked(session_path, ranked, refs, max_results)
+        except recall_index.StaleIndexError:
+            continue  # index dropped; the next rank() rebuilds it
+    return []
+
+
+def _take_ranked(
+    session_path: Path,
+    ranked: Any,
+    refs: list[tuple[int, list[str] | None]],
+    max_results: int,
+) -> list[dict]:
+    """Pop ranked records until *max_results* have a place in some cycle."""
+    from hermes_vcc import recall_index
+
+    results: list[dict] = []
+    while len(results) < max_results:
+        batch = {
+            doc[0]: (score, doc)
+            for score, doc in itertools.islice(ranked, max_results - len(results))
+        }
+        if not batch:
+            break
+        # Latest occurrence of each record; refs run newest cycle first.
+        where: dict[str, tuple[int, int]] = {}
+        for cycle, hashes in refs:
+            for line_idx, h in enumerate(hashes or ()):
+                if h in batch and h not in where:
+                    where[h] = (cycle, line_idx + 1)
+            if len(where) == len(batch):
+                break
+        docs = [doc for h, (_, doc) in batch.items() if h in where]
+        for h, record in recall_index.read_records(session_path, docs):
+            text, role, tools = recall_index.record_fields(record)
+            cycle, line = where[h]
+            results.append({
+                "cycle": cycle,
+                "line": line,
+                "role": role,
+                "preview": (text or "tool_use: " + ", ".join(tools))[:200],
+                "score": round(batch[h][0], 4),
+            })
+    results.sort(key=lambda x: (-x["score"], -x["cycle"], x["line"]))
+    return results
+
+
 def _recall_via_regex(
     query: str,
     session_id: str,
     archive_dir: Path,
     max_results: int,
 ) -> list[dict]:
-    """Fallback: regex search over raw JSONL archives."""
+    """Fallback: regex search over the archived JSONL records of each cycle.
+
+    Cycles in the record store are searched through the persistent token
+    index (:mod:`hermes_vcc.recall_index`): only shortlisted records are read
+    and regex-verified.  Legacy ``cycle_N.jsonl`` cycles are scanned.
+    """
+    from hermes_vcc import recall_index
+    from hermes_vcc.store import cycle_refs, list_cycles, read_cycle_lines
+
     session_path = archive_dir / session_id
-    try:
-        files = sorted(f for f in session_path.iterdir() if f.name.endswith(".jsonl"))
-    except (FileNotFoundError, NotADirectoryError):
+    cycles = list_cycles(session_path)
+    if not cycles:
         return []
 
     words = query.strip().split()
     try:
         patterns = [re.compile(query, re.IGNORECASE)]
+        requirement = recall_index.query_requirement(query)
     except re.error:
         patterns = [
             re.compile(re.escape(w), re.IGNORECASE) for w in words
         ]
+        requirement = recall_index.words_requirement(words)
+
+    hits: list[tuple[int, int, tuple[str, str, int]]] = []
+
+    refs = {c: cycle_refs(session_path, c) for c in cycles}
+    stored = [c for c in cycles if refs[c] is not None]
+    scan = [c for c in cycles if refs[c] is None]
+    if stored:
+        scored = _score_indexed(session_path, requirement, patterns)
+        if scored is None:
+            scan = cycles
+        elif scored:
+            for cycle in stored:
+                for line_idx, h in enumerate(refs[cycle] or ()):
+                    if h in scored:
+                        hits.append((cycle, line_idx, scored[h]))
 
-    matches: list[dict] = []
-    for file in files:
-        m = re.match(r"cycle_(\d+)\.jsonl", file.name)
-        cycle = int(m.group(1)) if m else 0
-        lines = file.read_text(encoding="utf-8").splitlines()
-        for line_idx, raw_line in enumerate(lines):
-            if not raw_line.strip():
-                continue
-            try:
-                record = json.loads(raw_line)
-            except json.JSONDecodeError:
-                continue
-            role = record.get("type") or record.get("role") or "unknown"
-            text = _extract_text(record)
-            if not text:
-                continue
-            match_count = sum(1 for p in patterns if p.search(text))
-            if match_count == 0:
-                continue
-            matches.append(
-                {
-                    "cycle": cycle,
-                    "line": line_idx + 1,
-                    "role": role,
-                    "preview": text[:200],
-                    "score": match_count / len(patterns),
-                }
-            )
-
-    matches.sort(key=lambda x: (-x["score"], -x["cycle"]))
+    # Cycles mostly repeat earlier records; score each distinct line once.
+    seen: dict[str, tuple[str, str, int] | None] = {}
+    for cycle in scan:
+        for line_idx, raw_line in enumerate(read_cycle_lines(session_path, cycle) or ()):
+            if raw_line not in seen:
+                seen[raw_line] = _score_line(raw_line, patterns)
+            hit = seen[raw_line]
+            if hit is not None:
+                hits.append((cycle, line_idx, hit))
+
+    matches = [
+        {
+            "cycle": cycle,
+            "line": line_idx + 1,
+            "role": role,
+            "preview": text[:200],
+            "score": match_count / len(patterns),
+        }
+        for cycle, line_idx, (role, text, match_count) in hits
+    ]
+    matches.sort(key=lambda x: (-x["score"], -x["cycle"], x["line"]))
     return matches[:max_results]
 
 
+def _score_indexed(
+    session_path: Path,
+    requirement: Any,
+    patterns: list[re.Pattern],
+) -> dict[str, tuple[str, str, int]] | None:
+    """Score index-shortlisted records by hash; None if the index is unusable."""
+    from hermes_vcc import recall_index
+
+    for _attempt in range(2):
+        docs = recall_index.shortlist(session_path, requirement)
+        if docs is None:
+            return None
+        scored: dict[str, tuple[str, str, int]] = {}
+        try:
+            for h, record in recall_index.read_records(session_path, docs):
+                hit = _score_record(record, patterns)
+                if hit is not None:
+                    scored[h] = hit
+        except recall_index.StaleIndexError:
+            continue  # index dropped; the next shortlist() rebuilds it
+        return scored
+    return None
+
+
+def _score_line(raw_line: str, patterns: list[re.Pattern]) -> tuple[str, str, int] | None:
+    """Return ``(role, text, match_count)`` for a JSONL line, or None."""
+    if not raw_line.strip():
+        return None
+    try:
+        record = json.loads(raw_line)
+    except json.JSONDecodeError:
+        return None
+    return _score_record(record, patterns)
+
+
+def _score_record(record: Any, patterns: list[re.Pattern]) -> tuple[str, str, int] | None:
+    """Return ``(role, text, match_count)`` for a record, or None."""
+    if not isinstance(record, dict):
+        return None
+    role = record.get("type") or record.get("role") or "unknown"
+    text = _extract_text(record)
+    if not text:
+        return None
+    match_count = sum(1 for p in patterns if p.search(text))
+    if match_count == 0:
+        return None
+    return role, text, match_count
+
+
 def _extract_text(record: dict) -> str:
     content = record.get("content")
     if isinstance(content, str):
@@ -0,0 +1,290 @@
+"""Cross-session recall over every session in an archive directory.
+
+Each session keeps its own recall index (:mod:`hermes_vcc.recall_index`).
+This module adds a small archive-wide index next to the sessions::
+
+    ~/.hermes/vcc_archives/
+        recall_global.json    # per-session doc counts + term -> {session: df}
+        recall_global.lock
+        session_abc123/
+        session_def456/
+
+It is updated after every archived cycle (:func:`update_session`) with the
+document frequencies of the records that cycle added, and gives a query
+two things: which sessions can match at all, and archive-wide BM25
+statistics so scores from different sessions are comparable and can be
+merged.
+
+:func:`search_all` reads that index as it stands (the archiver keeps it
+current), searches the candidate sessions and merges their ranked results
+into one top-k as they arrive.  Regex queries (and keyword queries BM25
+finds nothing for) are scanned per session the same way.  Only a large
+search with ``jobs`` > 1 is fanned out over a process pool, created for
+the call and shut down when it returns.
+"""
+
+from __future__ import annotations
+
+import concurrent.futures
+import functools
+import heapq
+import json
+import logging
+import multiprocessing
+import os
+from pathlib import Path
+from typing import Any
+
+from hermes_vcc import recall_index
+from hermes_vcc.utils import file_lock
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_INDEX = "recall_global.json"
+_LOCK_NAME = "recall_global.lock"
+_VERSION = 1
+
+# Below this many sessions a worker pool costs more than it saves: spawning
+# even two workers takes about a second, searching one session ~5-15 ms.
+_MIN_PARALLEL = 128
+
+
+# ---------------------------------------------------------------------------
+# Global index
+# ---------------------------------------------------------------------------
+
+def _read_global(archive_dir: Path) -> dict[str, Any]:
+    try:
+        data = json.loads((archive_dir / GLOBAL_INDEX).read_text(encoding="utf-8"))
+    except (FileNotFoundError, json.JSONDecodeError, OSError):
+        data = None
+    if not isinstance(data, dict) or data.get("version") != _VERSION:
+        data = {"version": _VERSION, "sessions": {}, "terms": {}}
+    return data
+
+
+def _write_global(archive_dir: Path, data: dict[str, Any]) -> None:
+    path = archive_dir / GLOBAL_INDEX
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_text(
+        json.dumps(data, ensure_ascii=False, separators=(",", ":")) + "\n",
+        encoding="utf-8",
+    )
+    tmp.replace(path)
+
+
+def _drop_session(data: dict[str, Any], session_id: str) -> None:
+    data["sessions"].pop(session_id, None)
+    for tok in [t for t, by_session in data["terms"].items() if session_id in by_session]:
+        del data["terms"][tok][session_id]
+        if not data["terms"][tok]:
+            del data["terms"][tok]
+
+
+def _absorb(data: dict[str, Any], session_dir: Path) -> bool:
+    """Bring *session_dir*'s entry up to date; True if *data* changed."""
+    session_id = session_dir.name
+    state = recall_index.index_state(session_dir)
+    entry = data["sessions"].get(session_id)
+    if not state or not state.get("n_docs"):
+        if entry is None:
+            return False
+        _drop_session(data, session_id)
+        return True
+
+    since = 0
+    if entry is not None:
+        if entry.get("gen") == state["gen"] and entry["n_docs"] <= state["n_docs"]:
+            if entry["n_docs"] == state["n_docs"]:
+                return False
+            since = entry["n_docs"]
+        else:
+            _drop_session(data, session_id)
+
+    terms = data["terms"]
+    for tok, df in recall_index.document_frequencies(session_dir, since).items():
+        by_session = terms.setdefault(tok, {})
+        by_session[session_id] = by_session.get(session_id, 0) + df
+    data["sessions"][session_id] = state
+    return True
+
+
+def update_session(archive_dir: Path, session_dir: Path) -> None:
+    """Fold the records *session_dir*'s index gained into the global index.
+
+    Called after each archived cycle, once the session index is updated.
+    A rebuilt session index replaces the session's global entry.
+    """
+    with file_lock(archive_dir / _LOCK_NAME):
+        data = _read_global(archive_dir)
+        if _absorb(data, session_dir):
+            _write_global(archive_dir, data)
+
+
+def refresh(archive_dir: Path) -> dict[str, Any]:
+    """Bring the global index up to date with every session and return it.
+
+    Picks up sessions archived before the global index existed, records
+    appended since the last update and sessions that were deleted.  Updates
+    every session index, so it is run when the global index is missing, not
+    per query.
+    """
+    with file_lock(archive_dir / _LOCK_NAME):
+        data = _read_global(archive_dir)
+        changed = False
+        present = set()
+        for session_dir in _session_dirs(archive_dir):
+            present.add(session_dir.name)
+            recall_index.update_index(session_dir)
+            changed |= _absorb(data, session_dir)
+        for session_id in set(data["sessions"]) - present:
+            _drop_session(data, session_id)
+            changed = True
+        if changed:
+            _write_global(archive_dir, data)
+    return data
+
+
+def _session_dirs(archive_dir: Path) -> list[Path]:
+    try:
+        return sorted(p for p in archive_dir.iterdir() if p.is_dir())
+    except OSError:
+        return []
+
+
+def corpus_stats(data: dict[str, Any], terms: list[str]) -> recall_index.CorpusStats:
+    """Archive-wide BM25 statistics for *terms*."""
+    sessions = data["sessions"].values()
+    n_docs = sum(s["n_docs"] for s in sessions)
+    total_len = sum(s.get("total_len") or 0 for s in sessions)
+    df = {t: sum(data["terms"].get(t, {}).values()) for t in terms}
+    return recall_index.CorpusStats(n_docs, total_len / n_docs if n_docs else 1.0, df)
+
+
+# ---------------------------------------------------------------------------
+# Search
+# ---------------------------------------------------------------------------
+
+def _search_session(
+    query: str,
+    archive_dir: Path,
+    session_id: str,
+    max_results: int,
+    stats: recall_index.CorpusStats | None,
+) -> list[dict]:
+    """Recall in one session (runs in a worker process)."""
+    from hermes_vcc.recall import _recall_via_bm25, _recall_via_regex
+
+    try:
+        if stats is not None:
+            results = _recall_via_bm25(query, session_id, archive_dir, max_results, stats=stats)
+        else:
+            results = _recall_via_regex(query, session_id, archive_dir, max_results)
+    except Exception as exc:  # noqa: BLE001 — one bad session must not sink the search
+        logger.warning("Recall failed for session %s: %s", session_id, exc)
+        return []
+    for r in results:
+        r["session_id"] = session_id
+    return results
+
+
+def _pool(workers: int) -> concurrent.futures.ProcessPoolExecutor:
+    """A worker pool for one search (spawned: the archiver thread makes fork unsafe).
+
+    Not kept between searches, so no idle interpreters outlive the query.
+    """
+    return concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+    )
+
+
+def _fan_out(
+    query: str,
+    archive_dir: Path,
+    session_ids: list[str],
+    max_results: int,
+    stats: recall_index.CorpusStats | None,
+    jobs: int,
+) -> list[dict]:
+    """Search *session_ids* and merge their results into one top-k.
+
+    Results are folded into a bounded heap as each session finishes, so
+    memory stays O(k) however many sessions match.
+    """
+    top: list[tuple[tuple, int, dict]] = []
+    seq = 0
+
+    def fold(results: list[dict]) -> None:
+        nonlocal seq
+        for r in results:
+            key = (r["score"], r["cycle"], -r["line"])
+            seq += 1
+            item = (key, -seq, r)
+            if len(top) < max_results:
+                heapq.heappush(top, item)
+            elif item > top[0]:
+                heapq.heapreplace(top, item)
+
+    search = functools.partial(_search_session, query, archive_dir, max_results=max_results, stats=stats)
+    if jobs <= 1 or len(session_ids) < _MIN_PARALLEL:
+        for session_id in session_ids:
+            fold(search(session_id))
+    else:
+        try:
+            with _pool(min(jobs, len(session_ids))) as pool:
+                futures = [pool.submit(search, sid) for sid in session_ids]
+                for future in concurrent.futures.as_completed(futures):
+                    fold(future.result())
+        except (OSError, RuntimeError, concurrent.futures.process.BrokenProcessPool) as exc:
+            logger.warning("Recall worker pool failed (%s); searching serially", exc)
+            top.clear()
+            for session_id in session_ids:
+                fold(search(session_id))
+
+    ranked = [r for _, _, r in sorted(top, reverse=True)]
+    ranked.sort(key=lambda x: (-x["score"], x["session_id"], -x["cycle"], x["line"]))
+    return ranked
+
+
+def search_all(
+    query: str,
+    archive_dir: Path,
+    max_results: int = 20,
+    jobs: int = 1,
+) -> list[dict]:
+    """Recall across every session under *archive_dir*.
+
+    Keyword queries are BM25F-ranked against archive-wide statistics in the
+    sessions that contain a query term; otherwise (or if that finds nothing)
+    every session is regex-scanned.  Results carry a ``session_id`` key.
+
+    Args:
+        jobs: Worker processes (default 1: serial).  Used only when at
+            least ``_MIN_PARALLEL`` sessions are searched.
+    """
+    from hermes_vcc.recall import _REGEX_HINT
+
+    if not archive_dir.is_dir():
+        return []
+
+    terms = recall_index.query_terms(query)
+    if terms and not _REGEX_HINT.search(query):
+        if (archive_dir / GLOBAL_INDEX).exists():
+            data = _read_global(archive_dir)
+        else:
+            data = refresh(archive_dir)
+        candidates = sorted(
+            session_id
+            for session_id in {sid for t in terms for sid in data["terms"].get(t, {})}
+            if (archive_dir / session_id).is_dir()
+        )
+        if candidates:
+            results = _fan_out(
+                query, archive_dir, candidates, max_results,
+                corpus_stats(data, terms), jobs,
+            )
+            if results:
+                return results
+
+    session_ids = [p.name for p in _session_dirs(archive_dir)]
+    return _fan_out(query, archive_dir, session_ids, max_results, None, jobs)
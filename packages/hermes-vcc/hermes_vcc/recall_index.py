@@ -0,0 +1,679 @@
+"""Persistent token index over a session's stored records.
+
+The fallbacks of :func:`hermes_vcc.recall.recall_search` used to parse and
+scan every archived record on every query.  This module keeps an inverted
+index of every record in the session's record store
+(:mod:`hermes_vcc.store`), used two ways: BM25F ranking of keyword queries
+(:func:`rank`) and shortlisting records for regex recall (:func:`shortlist`)::
+
+    session_abc123/
+        manifest.json
+        recall_index/
+            meta.json         # segments, doc count, indexed pack bytes
+            seg_1.bin         # one segment per archive write (merged later)
+            index.lock        # held by update_index()
+
+A segment holds the records appended to ``store/records.jsonl`` since the
+previous one: a token dictionary per field, a doc table (record hash, pack
+offset, length), body lengths and uint32 postings with term frequencies.
+Tokens are casefolded ``\\w+`` runs.  Fields are ``body`` (the text recall
+searches, see :func:`hermes_vcc.recall._extract_text`), ``role`` and
+``tool`` (names of the tools a record calls).
+
+Shortlists are exact supersets: literals are pulled out of the query regex
+and each of their word runs must occur as a substring of some body token of
+the record.  Anything the index cannot reason about (non-ASCII literals,
+classes, lookarounds, over-long tokens) just widens the shortlist.
+
+The index is derived data: it is rebuilt from the pack whenever the pack no
+longer matches what was indexed (e.g. after :func:`hermes_vcc.store.gc_store`)
+or was written by an older version.
+
+:func:`update_index` runs from the archiver, from queries and from search
+worker processes; it holds ``index.lock`` for the whole update, so
+concurrent callers never write the same segment or index a record twice.
+"""
+
+from __future__ import annotations
+
+import bisect
+import heapq
+import json
+import logging
+import math
+import os
+import re
+import struct
+import sys
+import threading
+from array import array
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+from hermes_vcc.store import STORE_DIR
+from hermes_vcc.utils import ensure_dir, file_lock
+
+logger = logging.getLogger(__name__)
+
+INDEX_DIR = "recall_index"
+_META_NAME = "meta.json"
+_LOCK_NAME = "index.lock"
+_VERSION = 2
+_MAGIC = b"VRI2"
+_HEADER = struct.Struct("<4sIII")  # magic, n_docs, base, dict_len
+_DOC = struct.Struct("<16sQI")  # hash digest, pack offset, length
+_HASH_LEN = 32
+_MAX_TOKEN = 64
+_LONG = "\x00long"  # postings of records with tokens longer than _MAX_TOKEN
+_MAX_SEGMENTS = 16
+_POST_CODE = "I" if array("I").itemsize == 4 else "L"
+
+_TOKEN_RE = re.compile(r"\w+")
+
+FIELDS = ("body", "role", "tool")
+
+# BM25F parameters.  Only the body is length-normalised: role and tool
+# names are a token or two per record.
+_K1 = 1.2
+_B = 0.75
+_WEIGHTS = {"body": 1.0, "role": 0.5, "tool": 2.0}
+
+# Requirement tree for a query: ("lit", str) | ("and", [...]) | ("or", [...]);
+# None means "no constraint".
+_Req = tuple[str, Any] | None
+
+
+# ---------------------------------------------------------------------------
+# Tokenizing and query analysis
+# ---------------------------------------------------------------------------
+
+def record_text(record: Any) -> str:
+    """The text of a record that recall searches."""
+    from hermes_vcc.recall import _extract_text
+
+    return _extract_text(record) if isinstance(record, dict) else ""
+
+
+def record_fields(record: Any) -> tuple[str, str, list[str]]:
+    """``(text, role, tool names)`` of a record, as indexed."""
+    if not isinstance(record, dict):
+        return "", "", []
+    role = record.get("type") or record.get("role") or "unknown"
+    msg = record.get("message")
+    content = msg.get("content") if isinstance(msg, dict) else record.get("content")
+    tools = []
+    if isinstance(content, list):
+        tools = [
+            str(c.get("name", ""))
+            for c in content
+            if isinstance(c, dict) and c.get("type") == "tool_use"
+        ]
+    return record_text(record), str(role), tools
+
+
+def token_counts(text: str) -> dict[str, int]:
+    """Casefolded word token frequencies of *text* (long ones folded to a marker)."""
+    counts: dict[str, int] = {}
+    for tok in _TOKEN_RE.findall(text.casefold()):
+        if len(tok) > _MAX_TOKEN:
+            tok = _LONG
+        counts[tok] = counts.get(tok, 0) + 1
+    return counts
+
+
+def tokenize(text: str) -> set[str]:
+    """Distinct casefolded word tokens of *text* (long ones folded to a marker)."""
+    return set(token_counts(text))
+
+
+def query_terms(query: str) -> list[str]:
+    """Distinct BM25 terms of a keyword query, in order of appearance."""
+    terms = [t for t in _TOKEN_RE.findall(query.casefold()) if len(t) <= _MAX_TOKEN]
+    return list(dict.fromkeys(terms))
+
+
+def _literal_req(lit: str) -> _Req:
+    if not lit.isascii():
+        return None
+    runs = _TOKEN_RE.findall(lit.casefold())
+    if not runs:
+        return None
+    return ("and", [("lit", r) for r in runs]) if len(runs) > 1 else ("lit", runs[0])
+
+
+def _seq_req(items: Iterable[tuple[Any, Any]]) -> _Req:
+    reqs: list[_Req] = []
+    run: list[str] = []
+
+    def flush() -> None:
+        if run:
+            reqs.append(_literal_req("".join(run)))
+            run.clear()
+
+    for op, av in items:
+        name = getattr(op, "name", str(op))
+        if name == "LITERAL":
+            run.append(chr(av))
+            continue
+        flush()
+        if name == "SUBPATTERN":
+            reqs.append(_seq_req(av[-1]))
+        elif name == "ATOMIC_GROUP":
+            reqs.append(_seq_req(av))
+        elif name in ("MAX_REPEAT", "MIN_REPEAT", "POSSESSIVE_REPEAT") and av[0] >= 1:
+            reqs.append(_seq_req(av[2]))
+        elif name == "BRANCH":
+            alts = [_seq_req(alt) for alt in av[1]]
+            reqs.append(None if any(a is None for a in alts) else ("or", alts))
+    flush()
+    reqs = [r for r in reqs if r is not None]
+    if not reqs:
+        return None
+    return reqs[0] if len(reqs) == 1 else ("and", reqs)
+
+
+def words_requirement(words: Iterable[str]) -> _Req:
+    """Requirement for matching any one of the literal *words*."""
+    alts = [_literal_req(w) for w in words]
+    if not alts or any(a is None for a in alts):
+        return None
+    return ("or", alts)
+
+
+def query_requirement(pattern: str) -> _Req:
+    """Literal requirement any match of regex *pattern* must satisfy."""
+    try:
+        from re import _parser  # type: ignore[attr-defined]
+
+        return _seq_req(_parser.parse(pattern))
+    except Exception:  # noqa: BLE001 — unparseable: no shortlist
+        return None
+
+
+# ---------------------------------------------------------------------------
+# Segments
+# ---------------------------------------------------------------------------
+
+@dataclass
+class _Segment:
+    path: Path
+    n_docs: int
+    base: int
+    fields: dict[str, dict[str, list[int]]]  # field -> token -> [offset, count]
+    docs_off: int
+    lens_off: int
+    post_off: int
+    _lengths: array | None = None
+    _vocab: str = ""
+    _starts: list[int] = field(default_factory=list)
+    _names: list[str] = field(default_factory=list)
+
+    @property
+    def tokens(self) -> dict[str, list[int]]:
+        return self.fields.get("body", {})
+
+    def doc(self, fh: Any, doc_id: int) -> tuple[str, int, int]:
+        fh.seek(self.docs_off + (doc_id - self.base) * _DOC.size)
+        digest, off, length = _DOC.unpack(fh.read(_DOC.size))
+        return digest.hex(), off, length
+
+    def lengths(self, fh: Any) -> array:
+        """Body token count of every doc in the segment."""
+        if self._lengths is None:
+            fh.seek(self.lens_off)
+            self._lengths = _read_u32(fh, self.n_docs)
+        return self._lengths
+
+    def postings(self, fh: Any, token: str, fld: str = "body") -> array:
+        loc = self.fields.get(fld, {}).get(token)
+        if not loc:
+            return array(_POST_CODE)
+        fh.seek(self.post_off + loc[0] * 4)
+        return _read_u32(fh, loc[1])
+
+    def frequencies(self, fh: Any, token: str, fld: str) -> tuple[array, array]:
+        """Doc ids containing *token* in *fld* and the term frequency in each."""
+        loc = self.fields.get(fld, {}).get(token)
+        if not loc:
+            return array(_POST_CODE), array(_POST_CODE)
+        fh.seek(self.post_off + loc[0] * 4)
+        both = _read_u32(fh, 2 * loc[1])
+        return both[:loc[1]], both[loc[1]:]
+
+    def tokens_containing(self, run: str) -> list[str]:
+        if not self._vocab and self.tokens:
+            self._names = list(self.tokens)
+            self._vocab = "\n" + "\n".join(self._names) + "\n"
+            self._starts, pos = [], 1
+            for name in self._names:
+                self._starts.append(pos)
+                pos += len(name) + 1
+        found: dict[int, None] = {}
+        for m in re.finditer(re.escape(run), self._vocab):
+            i = bisect.bisect_right(self._starts, m.start()) - 1
+            if i >= 0 and m.end() <= self._starts[i] + len(self._names[i]):
+                found[i] = None
+        return [self._names[i] for i in found]
+
+    def evaluate(self, fh: Any, req: _Req) -> set[int] | None:
+        """Doc ids satisfying *req* (None = every doc in the segment)."""
+        if req is None:
+            return None
+        kind, arg = req
+        if kind == "lit":
+            ids: set[int] = set()
+            for tok in self.tokens_containing(arg):
+                ids.update(self.postings(fh, tok))
+            return ids
+        parts = [self.evaluate(fh, r) for r in arg]
+        if kind == "or":
+            if any(p is None for p in parts):
+                return None
+            return set().union(*parts)
+        known = [p for p in parts if p is not None]
+        if not known:
+            return None
+        result = known[0]
+        for p in known[1:]:
+            result = result & p
+        return result
+
+
+def _read_u32(fh: Any, count: int) -> array:
+    out = array(_POST_CODE)
+    out.frombytes(fh.read(count * 4))
+    if sys.byteorder == "big":
+        out.byteswap()
+    return out
+
+
+_SEGMENT_CACHE: dict[Path, tuple[tuple[int, int], _Segment]] = {}
+
+
+def _load_segment(path: Path) -> _Segment:
+    st = path.stat()
+    key = (st.st_mtime_ns, st.st_size)
+    cached = _SEGMENT_CACHE.get(path)
+    if cached and cached[0] == key:
+        return cached[1]
+    with path.open("rb") as fh:
+        magic, n_docs, base, dict_len = _HEADER.unpack(fh.read(_HEADER.size))
+        if magic != _MAGIC:
+            raise ValueError(f"not a recall index segment: {path}")
+        fields = json.loads(fh.read(dict_len).decode("utf-8"))
+    docs_off = _HEADER.size + dict_len
+    lens_off = docs_off + n_docs * _DOC.size
+    seg = _Segment(path, n_docs, base, fields, docs_off, lens_off, lens_off + n_docs * 4)
+    _SEGMENT_CACHE[path] = (key, seg)
+    return seg
+
+
+# field -> token -> ([doc ids], [term frequencies])
+_Postings = dict[str, dict[str, tuple[list[int], list[int]]]]
+
+
+def _tmp_path(path: Path) -> Path:
+    """A temporary name for *path* no other writer uses."""
+    return path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+def _write_segment(
+    path: Path,
+    base: int,
+    docs: list[tuple[str, int, int]],
+    lengths: list[int],
+    postings: _Postings,
+) -> None:
+    fields: dict[str, dict[str, list[int]]] = {}
+    post = array(_POST_CODE)
+    for fld, by_token in postings.items():
+        locs = fields[fld] = {}
+        for tok, (ids, tfs) in by_token.items():
+            locs[tok] = [len(post), len(ids)]
+            post.extend(ids)
+            post.extend(tfs)
+    dict_bytes = json.dumps(fields, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    lens = array(_POST_CODE, lengths)
+    if sys.byteorder == "big":
+        lens.byteswap()
+        post.byteswap()
+    tmp = _tmp_path(path)
+    with tmp.open("wb") as fh:
+        fh.write(_HEADER.pack(_MAGIC, len(docs), base, len(dict_bytes)))
+        fh.write(dict_bytes)
+        for h, off, length in docs:
+            fh.write(_DOC.pack(bytes.fromhex(h), off, length))
+        fh.write(lens.tobytes())
+        fh.write(post.tobytes())
+    tmp.replace(path)
+
+
+# ---------------------------------------------------------------------------
+# Index maintenance
+# ---------------------------------------------------------------------------
+
+def _index_dir(session_dir: Path) -> Path:
+    return session_dir / INDEX_DIR
+
+
+def _pack_path(session_dir: Path) -> Path:
+    return session_dir / STORE_DIR / "records.jsonl"
+
+
+def _read_meta(session_dir: Path) -> dict[str, Any]:
+    try:
+        meta = json.loads((_index_dir(session_dir) / _META_NAME).read_text(encoding="utf-8"))
+    except (FileNotFoundError, json.JSONDecodeError, OSError):
+        return {}
+    return meta if isinstance(meta, dict) and meta.get("version") == _VERSION else {}
+
+
+def _write_meta(session_dir: Path, meta: dict[str, Any]) -> None:
+    path = _index_dir(session_dir) / _META_NAME
+    tmp = _tmp_path(path)
+    tmp.write_text(json.dumps(meta, separators=(",", ":")) + "\n", encoding="utf-8")
+    tmp.replace(path)
+
+
+def _meta_valid(meta: dict[str, Any], fh: Any, pack_size: int) -> bool:
+    indexed = meta.get("indexed_bytes", 0)
+    if indexed > pack_size:
+        return False
+    last = meta.get("last")
+    if not last:
+        return indexed == 0
+    h, off = last
+    fh.seek(off - _HASH_LEN - 1)
+    return fh.read(_HASH_LEN).decode("ascii", "replace") == h
+
+
+def update_index(session_dir: Path) -> int:
+    """Index records appended to the session's store since the last update.
+
+    Rebuilds from scratch if the pack no longer matches the index.  Holds
+    the session's index lock throughout.
+
+    Returns:
+        Number of records added to the index.
+    """
+    if not _pack_path(session_dir).exists():
+        return 0
+    with file_lock(_index_dir(session_dir) / _LOCK_NAME):
+        return _update_index(session_dir)
+
+
+def _update_index(session_dir: Path) -> int:
+    pack_path = _pack_path(session_dir)
+    try:
+        pack_size = pack_path.stat().st_size
+    except FileNotFoundError:
+        return 0
+
+    meta = _read_meta(session_dir)
+    with pack_path.open("rb") as fh:
+        if meta and not _meta_valid(meta, fh, pack_size):
+            logger.info("Rebuilding recall index for %s", session_dir)
+            meta = {}
+        if not meta:
+            for old in _index_dir(session_dir).glob("seg_*.bin"):
+                _SEGMENT_CACHE.pop(old, None)
+                old.unlink()
+            meta = {"version": _VERSION, "gen": os.urandom(4).hex(), "segments": [],
+                    "n_docs": 0, "total_len": 0, "indexed_bytes": 0, "last": None,
+                    "next_seg": 1}
+        start = meta["indexed_bytes"]
+        if start >= pack_size:
+            return 0
+        fh.seek(start)
+        data = fh.read(pack_size - start)
+
+    docs: list[tuple[str, int, int]] = []
+    lengths: list[int] = []
+    postings: _Postings = {fld: {} for fld in FIELDS}
+    base = meta["n_docs"]
+    pos = 0
+    while True:
+        nl = data.find(b"\n", pos)
+        if nl < 0:
+            break  # torn or in-progress final line
+        line = data[pos:nl]
+        line_start = start + pos
+        pos = nl + 1
+        if len(line) <= _HASH_LEN + 1 or line[_HASH_LEN:_HASH_LEN + 1] != b" ":
+            continue
+        try:
+            h = line[:_HASH_LEN].decode("ascii")
+            record = json.loads(line[_HASH_LEN + 1:])
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            continue
+        offset = line_start + _HASH_LEN + 1
+        meta["last"] = [h, offset]
+        text, role, tools = record_fields(record)
+        if not text and not tools:
+            continue
+        doc_id = base + len(docs)
+        docs.append((h, offset, len(line) - _HASH_LEN - 1))
+        body = token_counts(text)
+        lengths.append(sum(body.values()))
+        for fld, counts in (
+            ("body", body),
+            ("role", token_counts(role)),
+            ("tool", token_counts(" ".join(tools))),
+        ):
+            for tok, tf in counts.items():
+                ids, tfs = postings[fld].setdefault(tok, ([], []))
+                ids.append(doc_id)
+                tfs.append(tf)
+
+    meta["indexed_bytes"] = start + pos
+    if docs:
+        index_dir = ensure_dir(_index_dir(session_dir))
+        name = f"seg_{meta['next_seg']}.bin"
+        meta["next_seg"] += 1
+        _write_segment(index_dir / name, base, docs, lengths, postings)
+        meta["segments"].append(name)
+        meta["n_docs"] = base + len(docs)
+        meta["total_len"] = meta.get("total_len", 0) + sum(lengths)
+        if len(meta["segments"]) > _MAX_SEGMENTS:
+            _merge_segments(session_dir, meta)
+    ensure_dir(_index_dir(session_dir))
+    _write_meta(session_dir, meta)
+    return len(docs)
+
+
+def _merge_segments(session_dir: Path, meta: dict[str, Any]) -> None:
+    """Collapse all segments into one (keeps per-query segment count bounded)."""
+    index_dir = _index_dir(session_dir)
+    docs: list[tuple[str, int, int]] = []
+    lengths: list[int] = []
+    postings: _Postings = {fld: {} for fld in FIELDS}
+    for name in meta["segments"]:
+        seg = _load_segment(index_dir / name)
+        with seg.path.open("rb") as fh:
+            for doc_id in range(seg.base, seg.base + seg.n_docs):
+                docs.append(seg.doc(fh, doc_id))
+            lengths.extend(seg.lengths(fh))
+            for fld, by_token in seg.fields.items():
+                for tok in by_token:
+                    ids, tfs = postings[fld].setdefault(tok, ([], []))
+                    seg_ids, seg_tfs = seg.frequencies(fh, tok, fld)
+                    ids.extend(seg_ids)
+                    tfs.extend(seg_tfs)
+    name = f"seg_{meta['next_seg']}.bin"
+    meta["next_seg"] += 1
+    _write_segment(index_dir / name, 0, docs, lengths, postings)
+    old, meta["segments"] = meta["segments"], [name]
+    _write_meta(session_dir, meta)
+    for stale in old:
+        (index_dir / stale).unlink(missing_ok=True)
+        _SEGMENT_CACHE.pop(index_dir / stale, None)
+
+
+def index_state(session_dir: Path) -> dict[str, Any]:
+    """``n_docs``, ``total_len`` and ``gen`` of the session's index.
+
+    ``gen`` changes whenever the index is rebuilt, so doc ids below a
+    previously seen ``n_docs`` are only stable while it stays the same.
+    Empty when the session has no index.
+    """
+    meta = _read_meta(session_dir)
+    if not meta:
+        return {}
+    return {k: meta.get(k) for k in ("n_docs", "total_len", "gen")}
+
+
+def document_frequencies(session_dir: Path, since: int = 0) -> dict[str, int]:
+    """Per token, how many docs with id >= *since* contain it in any field."""
+    meta = _read_meta(session_dir)
+    df: dict[str, int] = {}
+    for name in meta.get("segments", []):
+        seg = _load_segment(_index_dir(session_dir) / name)
+        if seg.base + seg.n_docs <= since:
+            continue
+        with seg.path.open("rb") as fh:
+            per_token: dict[str, set[int]] = {}
+            for fld, by_token in seg.fields.items():
+                for tok in by_token:
+                    if tok == _LONG:
+                        continue
+                    ids = seg.postings(fh, tok, fld)
+                    per_token.setdefault(tok, set()).update(
+                        ids[bisect.bisect_left(ids, since):]
+                    )
+        for tok, ids in per_token.items():
+            if ids:
+                df[tok] = df.get(tok, 0) + len(ids)
+    return df
+
+
+# ---------------------------------------------------------------------------
+# Query
+# ---------------------------------------------------------------------------
+
+def shortlist(session_dir: Path, req: _Req) -> list[tuple[str, int, int]] | None:
+    """Records that may satisfy *req*, as ``(hash, pack offset, length)``.
+
+    Brings the index up to date first.  Returns None when the session has
+    no record store (legacy archives).
+    """
+    if not _pack_path(session_dir).exists():
+        return None
+    update_index(session_dir)
+    meta = _read_meta(session_dir)
+    out: list[tuple[str, int, int]] = []
+    for name in meta.get("segments", []):
+        seg = _load_segment(_index_dir(session_dir) / name)
+        with seg.path.open("rb") as fh:
+            ids = seg.evaluate(fh, req)
+            if ids is None:
+                ids_iter: Iterable[int] = range(seg.base, seg.base + seg.n_docs)
+            else:
+                ids.update(seg.postings(fh, _LONG))
+                ids_iter = sorted(ids)
+            out.extend(seg.doc(fh, i) for i in ids_iter)
+    return out
+
+
+@dataclass(frozen=True)
+class CorpusStats:
+    """Collection statistics BM25 scores are computed against.
+
+    :func:`rank` defaults to the session's own; cross-session recall passes
+    archive-wide ones so scores from different sessions are comparable.
+    """
+
+    n_docs: int
+    avg_len: float
+    df: dict[str, int]
+
+
+def rank(
+    session_dir: Path,
+    terms: list[str],
+    stats: CorpusStats | None = None,
+) -> Iterator[tuple[float, tuple[str, int, int]]] | None:
+    """BM25F-rank the session's records for keyword *terms*.
+
+    Every record containing at least one term is scored, but only a heap is
+    built: the returned iterator pops ``(score, (hash, pack offset,
+    length))`` best first, so taking the top *k* costs O(n + k log n)
+    rather than a full sort.  Returns None when the session has no record
+    store (legacy archives).
+    """
+    if not _pack_path(session_dir).exists():
+        return None
+    update_index(session_dir)
+    meta = _read_meta(session_dir)
+    if stats is None:
+        n_docs = meta.get("n_docs", 0)
+        avg_len = meta.get("total_len", 0) / n_docs if n_docs else 1.0
+    else:
+        n_docs, avg_len = stats.n_docs, stats.avg_len
+    segments = [_load_segment(_index_dir(session_dir) / name) for name in meta.get("segments", [])]
+
+    scores: dict[int, float] = {}
+    for term in terms:
+        weighted: dict[int, float] = {}
+        for seg in segments:
+            with seg.path.open("rb") as fh:
+                for fld, weight in _WEIGHTS.items():
+                    ids, tfs = seg.frequencies(fh, term, fld)
+                    if not ids:
+                        continue
+                    lengths = seg.lengths(fh) if fld == "body" else None
+                    for doc_id, tf in zip(ids, tfs):
+                        if lengths is not None:
+                            norm = 1 - _B + _B * lengths[doc_id - seg.base] / (avg_len or 1.0)
+                            tf = tf / norm
+                        weighted[doc_id] = weighted.get(doc_id, 0.0) + weight * tf
+        if not weighted:
+            continue
+        df = len(weighted) if stats is None else max(stats.df.get(term, 0), len(weighted))
+        n_docs = max(n_docs, df)
+        idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+        for doc_id, tf in weighted.items():
+            scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (_K1 + 1) / (tf + _K1)
+
+    heap = [(-score, doc_id) for doc_id, score in scores.items()]
+    heapq.heapify(heap)
+    return _pop_ranked(heap, segments)
+
+
+def _pop_ranked(
+    heap: list[tuple[float, int]],
+    segments: list[_Segment],
+) -> Iterator[tuple[float, tuple[str, int, int]]]:
+    bases = [seg.base for seg in segments]
+    while heap:
+        neg_score, doc_id = heapq.heappop(heap)
+        seg = segments[bisect.bisect_right(bases, doc_id) - 1]
+        with seg.path.open("rb") as fh:
+            yield -neg_score, seg.doc(fh, doc_id)
+
+
+class StaleIndexError(Exception):
+    """A shortlisted offset no longer points at the indexed record."""
+
+
+def read_records(
+    session_dir: Path,
+    docs: Iterable[tuple[str, int, int]],
+) -> Iterable[tuple[str, dict[str, Any]]]:
+    """Yield ``(hash, record)`` for shortlisted docs, reading by pack offset.
+
+    Raises:
+        StaleIndexError: The pack changed under the index.  The index is
+            dropped so the next :func:`shortlist` rebuilds it.
+    """
+    with _pack_path(session_dir).open("rb") as fh:
+        for h, off, length in docs:
+            fh.seek(off - _HASH_LEN - 1)
+            raw = fh.read(length + _HASH_LEN + 1)
+            if raw[:_HASH_LEN].decode("ascii", "replace") != h:
+                (_index_dir(session_dir) / _META_NAME).unlink(missing_ok=True)
+                raise StaleIndexError(f"stale recall index in {session_dir}")
+            try:
+                yield h, json.loads(raw[_HASH_LEN + 1:])
+            except json.JSONDecodeError:
+                continue
@@ -0,0 +1,338 @@
+"""signals.py - Fused, incremental signal extraction for structured compaction.
+
+:class:`SignalExtractor` turns Hermes OpenAI-format messages into everything
+:func:`~hermes_vcc.compaction.format_compaction` needs: goals, preferences,
+file ops, outstanding context and the brief transcript.  The result is the
+same as running :func:`to_normalized_blocks`,
+:func:`~hermes_vcc.filter_noise.filter_noise` and the individual extractors
+in ``extract.py`` / ``compaction.py`` one after another, but:
+
+- each message is normalized, filtered and analysed in a single traversal;
+  its text is split into lines once and every line category (preferences,
+  outstanding context) is matched with one combined regex;
+- the per-message analysis is memoized by message content, so a compaction
+  cycle only analyses the messages added since the previous cycle and
+  assembles the rest from cached fragments.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Iterable
+
+from hermes_vcc.compaction import (
+    CONTEXT_PATTERNS,
+    TEXT_TRUNCATE,
+    TOOL_TRUNCATE,
+    format_compaction,
+)
+from hermes_vcc.extract import (
+    _CREATE_TOOLS,
+    _PREF_PATTERNS,
+    _READ_TOOLS,
+    _SCOPE_CHANGE_RE,
+    _TASK_RE,
+    _WRITE_TOOLS,
+    _clip,
+    _is_substantive_goal,
+    _non_empty_lines,
+    _path_from_args,
+)
+from hermes_vcc.filter_noise import NOISE_STRINGS, NOISE_TOOLS, XML_WRAPPER_RE
+
+
+def _combine(patterns: Iterable[re.Pattern[str]]) -> re.Pattern[str]:
+    """One alternation matching wherever any of *patterns* would."""
+    return re.compile("|".join(f"(?:{p.pattern})" for p in patterns), re.IGNORECASE)
+
+
+_PREF_RE = _combine(_PREF_PATTERNS)
+_CONTEXT_RE = _combine(CONTEXT_PATTERNS)
+
+_MAX_GOALS = 8
+_MAX_PREFS = 10
+_MAX_OUTSTANDING = 8
+
+# Brief line kinds: plain text, or a tool call/result that gets " (#idx)".
+_TEXT, _CALL, _RESULT = 0, 1, 2
+
+
+# ---------------------------------------------------------------------------
+# Normalization
+# ---------------------------------------------------------------------------
+
+def _tool_call_block(tc: dict) -> dict:
+    fn = tc.get("function", {})
+    try:
+        args = json.loads(fn.get("arguments") or "{}")
+        if not isinstance(args, dict):
+            args = {}
+    except Exception:  # noqa: BLE001
+        args = {}
+    return {
+        "kind": "tool_call",
+        "name": fn.get("name", "unknown"),
+        "id": tc.get("id", ""),
+        "args": args,
+    }
+
+
+def to_normalized_blocks(messages: list[dict]) -> list[dict]:
+    """Convert Hermes OpenAI-format messages to NormalizedBlock dicts.
+
+    NormalizedBlock keys used by filter_noise / extract:
+        kind:  user | assistant | tool_call | tool_result | thinking
+        text:  str   (user / assistant)
+        name:  str   (tool_call / tool_result)
+        args:  dict  (tool_call)
+        isError: bool (tool_result)
+    """
+    blocks: list[dict] = []
+    for msg in messages:
+        role = msg.get("role", "")
+        content = msg.get("content") or ""
+
+        if role == "user":
+            blocks.append({"kind": "user", "text": content})
+
+        elif role == "assistant":
+            if content:
+                blocks.append({"kind": "assistant", "text": content})
+            for tc in msg.get("tool_calls") or []:
+                blocks.append(_tool_call_block(tc))
+
+        elif role == "tool":
+            blocks.append({
+                "kind": "tool_result",
+                "name": "",  # name not available in OpenAI tool role
+                "tool_call_id": msg.get("tool_call_id", ""),
+                "text": content,
+                "isError": bool(msg.get("is_error", False)),
+            })
+
+        # system messages are not processed by filter_noise/extract
+
+    return blocks
+
+
+# ---------------------------------------------------------------------------
+# Per-message analysis
+# ---------------------------------------------------------------------------
+
+class _Fragment:
+    """The signals one message contributes, independent of its position."""
+
+    __slots__ = ("goal_lines", "scope_lines", "prefs", "context", "files", "brief")
+
+    def __init__(self) -> None:
+        self.goal_lines: list[str] = []  # first substantive user lines
+        self.scope_lines: list[str] | None = None  # goals if this is a scope change
+        self.prefs: list[str] = []
+        self.context: list[str] = []
+        self.files: list[tuple[str, str]] = []  # (file_ops key, path)
+        self.brief: list[tuple[int, str]] = []
+
+
+def _preview(text: str, limit: int) -> str:
+    suffix = "..." if len(text) > limit else ""
+    return f"{text[:limit]}{suffix}"
+
+
+def _scan_context(lines: list[str], frag: _Fragment) -> None:
+    for line in lines:
+        if 10 < len(line) < 300 and _CONTEXT_RE.search(line):
+            frag.context.append(_clip(line.strip(), 200))
+
+
+def _analyse_user(text: str, frag: _Fragment) -> None:
+    if any(s in text for s in NOISE_STRINGS):
+        return
+    text = XML_WRAPPER_RE.sub("", text).strip()
+    if not text:
+        return
+    lines = _non_empty_lines(text)
+
+    goal_lines = [line for line in lines if _is_substantive_goal(line)]
+    if goal_lines:
+        frag.goal_lines = goal_lines[:3]
+        if _SCOPE_CHANGE_RE.search(text):
+            frag.scope_lines = [_clip(line) for line in goal_lines[:3]]
+        elif _TASK_RE.search(text) and len(goal_lines[0]) > 15:
+            frag.scope_lines = [_clip(line) for line in goal_lines[:2]]
+
+    for line in lines:
+        trimmed = line.strip()
+        if len(trimmed) >= 5 and _PREF_RE.search(trimmed):
+            frag.prefs.append(_clip(trimmed))
+
+    _scan_context(lines, frag)
+    frag.brief.append((_TEXT, "U: " + _preview(text, TEXT_TRUNCATE)))
+
+
+def _analyse_tool_call(tc: dict, frag: _Fragment) -> None:
+    b = _tool_call_block(tc)
+    name = b["name"]
+    if name in NOISE_TOOLS:
+        return
+    args = b["args"]
+    path = _path_from_args(args)
+    if path:
+        if name in _READ_TOOLS:
+            frag.files.append(("read_files", path))
+        elif name in _WRITE_TOOLS:
+            frag.files.append(("modified_files", path))
+        elif name in _CREATE_TOOLS:
+            frag.files.append(("created_files", path))
+    arg_str = ", ".join(f"{k}={json.dumps(v)[:40]}" for k, v in args.items())
+    frag.brief.append((_CALL, f"{name}({arg_str})"))
+
+
+def _analyse(msg: dict) -> _Fragment:
+    """Normalize, noise-filter and extract the signals of one message."""
+    frag = _Fragment()
+    role = msg.get("role", "")
+    content = msg.get("content") or ""
+
+    if role == "user":
+        _analyse_user(content, frag)
+
+    elif role == "assistant":
+        if content:
+            _scan_context(_non_empty_lines(content), frag)
+            frag.brief.append((_TEXT, "A: " + _preview(content, TEXT_TRUNCATE)))
+        for tc in msg.get("tool_calls") or []:
+            _analyse_tool_call(tc, frag)
+
+    elif role == "tool":
+        prefix = "ERR" if msg.get("is_error", False) else "OK"
+        frag.brief.append((_RESULT, f"  -> {prefix}: {_preview(content, TOOL_TRUNCATE)}"))
+
+    return frag
+
+
+def _message_key(msg: dict) -> tuple | None:
+    """Everything :func:`_analyse` reads from *msg*, as a dict key."""
+    calls = msg.get("tool_calls")
+    if calls:
+        try:
+            calls = tuple(
+                (fn.get("name", "unknown"), fn.get("arguments"))
+                for tc in calls
+                for fn in (tc.get("function", {}),)
+            )
+        except (TypeError, AttributeError):
+            return None
+    return (
+        msg.get("role", ""),
+        msg.get("content"),
+        calls or None,
+        bool(msg.get("is_error", False)),
+    )
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+@dataclass
+class Signals:
+    """Compaction signals extracted from a conversation."""
+
+    goals: list[str] = field(default_factory=list)
+    preferences: list[str] = field(default_factory=list)
+    file_ops: dict[str, list[str]] = field(default_factory=dict)
+    outstanding: list[str] = field(default_factory=list)
+    brief: str = ""
+
+    def format(self) -> str:
+        """Render as a compaction summary (see ``format_compaction``)."""
+        return format_compaction(
+            self.goals, self.file_ops, self.outstanding, self.preferences, self.brief
+        )
+
+
+def _assemble(fragments: Iterable[_Fragment]) -> Signals:
+    goals: list[str] = []
+    latest_scope_change: list[str] | None = None
+    prefs: dict[str, None] = {}
+    outstanding: dict[str, None] = {}
+    file_ops: dict[str, dict[str, None]] = {
+        "read_files": {}, "modified_files": {}, "created_files": {},
+    }
+    lines: list[str] = []
+    idx = 0
+
+    for frag in fragments:
+        if frag.goal_lines:
+            if not goals:
+                goals.extend(frag.goal_lines)
+            elif frag.scope_lines is not None:
+                latest_scope_change = frag.scope_lines
+        for pref in frag.prefs:
+            if len(prefs) < _MAX_PREFS:
+                prefs[pref] = None
+        for item in frag.context:
+            if len(outstanding) < _MAX_OUTSTANDING:
+                outstanding[item] = None
+        for key, path in frag.files:
+            file_ops[key][path] = None
+        for kind, line in frag.brief:
+            if kind == _CALL:
+                idx += 1
+            lines.append(line if kind == _TEXT else f"{line} (#{idx})")
+
+    if latest_scope_change:
+        goals.append("[Scope change]")
+        goals.extend(latest_scope_change)
+
+    return Signals(
+        goals=goals[:_MAX_GOALS],
+        preferences=list(prefs),
+        file_ops={key: list(paths) for key, paths in file_ops.items()},
+        outstanding=list(outstanding),
+        brief="\n".join(lines),
+    )
+
+
+def extract_signals(messages: list[dict]) -> Signals:
+    """Extract the compaction signals of *messages* in one pass."""
+    return _assemble(_analyse(msg) for msg in messages)
+
+
+class SignalExtractor:
+    """Memoizing :func:`extract_signals` for successive compaction cycles.
+
+    Each call analyses only messages whose content was not seen in the
+    previous call; the fragments of the others are reused, then dropped
+    once a message leaves the conversation.  ``hits`` / ``misses`` count
+    reused and analysed messages.
+    """
+
+    def __init__(self) -> None:
+        self._memo: dict[tuple, _Fragment] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def extract(self, messages: list[dict]) -> Signals:
+        """Return ``extract_signals(messages)``, reusing earlier analyses."""
+        memo = self._memo
+        seen: dict[tuple, _Fragment] = {}
+        fragments: list[_Fragment] = []
+        for msg in messages:
+            key = _message_key(msg)
+            try:
+                frag = seen.get(key) or memo.get(key) if key is not None else None
+            except TypeError:  # unhashable field, e.g. list content
+                key = frag = None
+            if frag is None:
+                frag = _analyse(msg)
+                self.misses += 1
+            else:
+                self.hits += 1
+            if key is not None:
+                seen[key] = frag
+            fragments.append(frag)
+        self._memo = seen
+        return _assemble(fragments)
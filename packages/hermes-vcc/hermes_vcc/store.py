@@ -0,0 +1,552 @@
+"""Content-addressed record store for archive cycles.
+
+Every compression cycle archives the *whole* conversation, so writing a full
+``cycle_{n}.jsonl`` per cycle stores the early messages once per cycle.  This
+module stores each distinct JSONL record line once per session and keeps a
+small per-cycle reference list instead::
+
+    session_abc123/
+        store/
+            records.jsonl     # "<hash> <json>" lines, append-only
+            records.idx       # "<hash> <offset> <length>" lines, rebuildable
+        cycle_1.refs.json     # ordered record references for cycle 1
+        cycle_2.refs.json
+
+A reference is the record hash, or ``[hash, message_id]`` for records whose
+``message.id`` was split out before hashing.  Adapter ids are derived from
+content, but a repeated message gets an occurrence-specific id, and older
+archives used random ids.  Splitting keeps such records deduplicated.
+
+``cycle_{n}.jsonl`` is reconstructed byte-for-byte on demand
+(:func:`read_cycle_jsonl`, :func:`materialize_cycle`).  Legacy sessions that
+still hold full ``.jsonl`` files are read transparently and can be converted
+with ``python -m hermes_vcc.store migrate <archive_dir>``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, BinaryIO, Iterable, Iterator
+
+from hermes_vcc.utils import ensure_dir
+
+logger = logging.getLogger(__name__)
+
+STORE_DIR = "store"
+_PACK_NAME = "records.jsonl"
+_INDEX_NAME = "records.idx"
+_REFS_SUFFIX = ".refs.json"
+_REFS_VERSION = 1
+_HASH_LEN = 32
+
+_CYCLE_RE = re.compile(r"cycle_(\d+)(?:\.refs\.json|\.jsonl)$")
+
+_REFS_CACHE: OrderedDict[Path, tuple[tuple[int, int], list[str]]] = OrderedDict()
+_REFS_CACHE_MAX = 64
+
+
+# ---------------------------------------------------------------------------
+# Internal helpers
+# ---------------------------------------------------------------------------
+
+def _hash(line: str) -> str:
+    return hashlib.blake2b(line.encode("utf-8"), digest_size=_HASH_LEN // 2).hexdigest()
+
+
+def _dumps(record: Any) -> str:
+    return json.dumps(record, ensure_ascii=False)
+
+
+def _split_id(record: Any) -> tuple[str, str | None]:
+    """Return ``(canonical_line, message_id)`` for *record*.
+
+    The message id is blanked in place (key order preserved) so two records
+    that differ only by id share one stored line.
+    """
+    msg = record.get("message") if isinstance(record, dict) else None
+    if isinstance(msg, dict) and isinstance(msg.get("id"), str) and msg["id"]:
+        return _dumps({**record, "message": {**msg, "id": ""}}), msg["id"]
+    return _dumps(record), None
+
+
+def _join_id(line: str, msg_id: str) -> str:
+    record = json.loads(line)
+    record["message"]["id"] = msg_id
+    return _dumps(record)
+
+
+def _refs_path(session_dir: Path, cycle: int) -> Path:
+    return session_dir / f"cycle_{cycle}{_REFS_SUFFIX}"
+
+
+def _store_paths(session_dir: Path) -> tuple[Path, Path]:
+    store = session_dir / STORE_DIR
+    return store / _PACK_NAME, store / _INDEX_NAME
+
+
+def _scan_pack(fh: BinaryIO) -> dict[str, tuple[int, int]]:
+    """Rebuild the hash -> (offset, length) index by scanning the pack line by line."""
+    index: dict[str, tuple[int, int]] = {}
+    fh.seek(0)
+    pos = 0
+    for line in fh:
+        if not line.endswith(b"\n"):
+            break  # torn final line
+        if len(line) >= _HASH_LEN + 2 and line[_HASH_LEN:_HASH_LEN + 1] == b" ":
+            h = line[:_HASH_LEN].decode("ascii", "replace")
+            index.setdefault(h, (pos + _HASH_LEN + 1, len(line) - _HASH_LEN - 2))
+        pos += len(line)
+    return index
+
+
+def _load_index(session_dir: Path) -> dict[str, tuple[int, int]]:
+    """Read ``records.idx`` (tolerating a torn last line).
+
+    A missing index next to an existing pack is rebuilt by scanning the pack.
+    """
+    pack_path, idx_path = _store_paths(session_dir)
+    index: dict[str, tuple[int, int]] = {}
+    try:
+        text = idx_path.read_text(encoding="ascii")
+    except FileNotFoundError:
+        try:
+            with pack_path.open("rb") as fh:
+                index = _scan_pack(fh)
+        except FileNotFoundError:
+            return index
+        _write_index(session_dir, index)
+        return index
+    except UnicodeDecodeError:
+        return index
+    for line in text.splitlines():
+        parts = line.split(" ")
+        if len(parts) != 3 or len(parts[0]) != _HASH_LEN:
+            continue
+        try:
+            index[parts[0]] = (int(parts[1]), int(parts[2]))
+        except ValueError:
+            continue
+    return index
+
+
+def _write_index(session_dir: Path, index: dict[str, tuple[int, int]]) -> None:
+    _, idx_path = _store_paths(session_dir)
+    tmp = idx_path.with_suffix(".tmp")
+    tmp.write_text(
+        "".join(f"{h} {off} {length}\n" for h, (off, length) in index.items()),
+        encoding="ascii",
+    )
+    tmp.replace(idx_path)
+
+
+class _Reader:
+    """Random access to stored lines, self-healing a stale index.
+
+    Keeps the pack open and reads only the ranges the index points at, so a
+    cycle costs its own records rather than the whole pack.  Use as a
+    context manager.
+    """
+
+    def __init__(self, session_dir: Path) -> None:
+        self._session_dir = session_dir
+        pack_path, _ = _store_paths(session_dir)
+        try:
+            self._fh: BinaryIO | None = pack_path.open("rb")
+            self.size = os.fstat(self._fh.fileno()).st_size
+        except FileNotFoundError:
+            self._fh = None
+            self.size = 0
+        self._index = _load_index(session_dir)
+        self._rebuilt = False
+
+    def __enter__(self) -> "_Reader":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    def _read(self, h: str, loc: tuple[int, int] | None) -> bytes | None:
+        """The stored line at *loc*, or None unless it is there under *h*."""
+        if loc is None or self._fh is None:
+            return None
+        off, length = loc
+        if off < _HASH_LEN + 1 or length < 0 or off + length > self.size:
+            return None
+        self._fh.seek(off - _HASH_LEN - 1)
+        data = self._fh.read(_HASH_LEN + 1 + length)
+        if len(data) != _HASH_LEN + 1 + length or data[:_HASH_LEN] != h.encode("ascii"):
+            return None
+        return data[_HASH_LEN + 1:]
+
+    def get(self, h: str) -> str | None:
+        data = self._read(h, self._index.get(h))
+        if data is None:
+            if self._rebuilt or self._fh is None:
+                return None
+            logger.warning("Rebuilding record index for %s", self._session_dir)
+            self._index = _scan_pack(self._fh)
+            self._rebuilt = True
+            try:
+                _write_index(self._session_dir, self._index)
+            except OSError as exc:
+                logger.warning("Failed to rewrite record index: %s", exc)
+            data = self._read(h, self._index.get(h))
+            if data is None:
+                return None
+        return data.decode("utf-8")
+
+
+def _read_refs(session_dir: Path, cycle: int) -> list[Any] | None:
+    path = _refs_path(session_dir, cycle)
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+    except (json.JSONDecodeError, OSError) as exc:
+        logger.warning("Failed to read record refs at %s: %s", path, exc)
+        return None
+    refs = data.get("records") if isinstance(data, dict) else None
+    return refs if isinstance(refs, list) else None
+
+
+def _put_lines(
+    session_dir: Path,
+    entries: Iterable[tuple[str, str | None]],
+) -> tuple[list[Any], int]:
+    """Store ``(line, message_id)`` entries; return ``(refs, bytes_appended)``.
+
+    *entries* is consumed lazily and new lines go straight to the pack
+    through a buffered handle, so nothing but the refs and the index lines
+    accumulates.
+    """
+    store = ensure_dir(session_dir / STORE_DIR)
+    pack_path, idx_path = store / _PACK_NAME, store / _INDEX_NAME
+    index = _load_index(session_dir)
+
+    refs: list[Any] = []
+    new_index: list[str] = []
+    try:
+        offset = pack_path.stat().st_size
+    except FileNotFoundError:
+        offset = 0
+    start_offset = offset
+    pad = b""
+    if offset:
+        with pack_path.open("rb") as fh:
+            fh.seek(offset - 1)
+            if fh.read(1) != b"\n":  # torn append from a crash
+                pad = b"\n"
+
+    pack = None
+    try:
+        for line, msg_id in entries:
+            h = _hash(line)
+            refs.append([h, msg_id] if msg_id is not None else h)
+            if h in index:
+                continue
+            if pack is None:
+                pack = pack_path.open("ab")
+                pack.write(pad)
+                offset += len(pad)
+            data = line.encode("utf-8")
+            start = offset + _HASH_LEN + 1
+            index[h] = (start, len(data))
+            new_index.append(f"{h} {start} {len(data)}\n")
+            pack.write(h.encode("ascii") + b" " + data + b"\n")
+            offset = start + len(data) + 1
+    finally:
+        if pack is not None:
+            pack.close()
+
+    if new_index:
+        with idx_path.open("a", encoding="ascii") as fh:
+            fh.write("".join(new_index))
+    return refs, offset - start_offset
+
+
+def _tally(
+    entries: Iterable[tuple[str, str | None]],
+    stats: dict[str, int],
+) -> Iterator[tuple[str, str | None]]:
+    """Pass *entries* through, adding the size of the JSONL they stand for to *stats*.
+
+    The id-blanked line is two characters (``""``) short of the original
+    record line by the encoded id, so no second serialization is needed.
+    """
+    chars = size = 0
+    for line, msg_id in entries:
+        n_chars, n_bytes = len(line) + 1, len(line.encode("utf-8")) + 1
+        if msg_id is not None:
+            quoted = json.dumps(msg_id, ensure_ascii=False)
+            n_chars += len(quoted) - 2
+            n_bytes += len(quoted.encode("utf-8")) - 2
+        chars += n_chars
+        size += n_bytes
+        yield line, msg_id
+    stats["chars"] = stats.get("chars", 0) + chars
+    stats["bytes"] = stats.get("bytes", 0) + size
+
+
+def _write_refs(session_dir: Path, cycle: int, refs: list[Any]) -> int:
+    path = _refs_path(session_dir, cycle)
+    text = json.dumps({"version": _REFS_VERSION, "records": refs}, separators=(",", ":")) + "\n"
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(text, encoding="utf-8")
+    tmp.replace(path)
+    return len(text)
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def write_cycle(
+    session_dir: Path,
+    cycle: int,
+    records: Iterable[dict[str, Any]],
+    stats: dict[str, int] | None = None,
+) -> int:
+    """Store *records* as cycle *cycle*, writing only records not yet stored.
+
+    *records* may be a generator; it is consumed once, record by record.
+    If *stats* is given, the ``chars`` and ``bytes`` of the cycle's JSONL
+    (as :func:`read_cycle_jsonl` would return it) are added to it.
+
+    Returns:
+        Number of bytes written (new record lines plus the refs file).
+    """
+    entries: Iterable[tuple[str, str | None]] = (_split_id(r) for r in records)
+    if stats is not None:
+        entries = _tally(entries, stats)
+    refs, written = _put_lines(session_dir, entries)
+    return written + _write_refs(session_dir, cycle, refs)
+
+
+def list_cycles(session_dir: Path) -> list[int]:
+    """Return archived cycle ids in *session_dir* (stored or legacy), sorted."""
+    cycles: set[int] = set()
+    try:
+        for path in session_dir.iterdir():
+            m = _CYCLE_RE.fullmatch(path.name)
+            if m:
+                cycles.add(int(m.group(1)))
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+    return sorted(cycles)
+
+
+def cycle_refs(session_dir: Path, cycle: int) -> list[str] | None:
+    """Record hashes of *cycle* in order, or None if it has no refs file.
+
+    Results are cached per refs file (validated by mtime and size), since
+    recall reads every cycle's refs on each query.
+    """
+    path = _refs_path(session_dir, cycle)
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    key = (st.st_mtime_ns, st.st_size)
+    cached = _REFS_CACHE.get(path)
+    if cached is not None and cached[0] == key:
+        _REFS_CACHE.move_to_end(path)
+        return cached[1]
+    refs = _read_refs(session_dir, cycle)
+    if refs is None:
+        return None
+    hashes = [ref[0] if isinstance(ref, list) else ref for ref in refs]
+    _REFS_CACHE[path] = (key, hashes)
+    while len(_REFS_CACHE) > _REFS_CACHE_MAX:
+        _REFS_CACHE.popitem(last=False)
+    return hashes
+
+
+def read_cycle_lines(session_dir: Path, cycle: int) -> list[str] | None:
+    """Return the JSONL lines of *cycle*, or None if it is not archived.
+
+    Falls back to a legacy ``cycle_{n}.jsonl`` file when no refs exist.
+    Unresolvable references are logged and skipped.
+    """
+    refs = _read_refs(session_dir, cycle)
+    if refs is None:
+        legacy = session_dir / f"cycle_{cycle}.jsonl"
+        try:
+            return legacy.read_text(encoding="utf-8").splitlines()
+        except FileNotFoundError:
+            return None
+
+    lines: list[str] = []
+    missing = 0
+    with _Reader(session_dir) as reader:
+        for ref in refs:
+            h, msg_id = (ref[0], ref[1]) if isinstance(ref, list) else (ref, None)
+            line = reader.get(h)
+            if line is None:
+                missing += 1
+                continue
+            lines.append(_join_id(line, msg_id) if msg_id is not None else line)
+    if missing:
+        logger.warning(
+            "%d record(s) of cycle %d missing from store in %s", missing, cycle, session_dir,
+        )
+    return lines
+
+
+def read_cycle_jsonl(session_dir: Path, cycle: int) -> str | None:
+    """Reconstruct the ``cycle_{n}.jsonl`` text of *cycle*."""
+    lines = read_cycle_lines(session_dir, cycle)
+    if lines is None:
+        return None
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def materialize_cycle(session_dir: Path, cycle: int, dest: Path | None = None) -> Path | None:
+    """Write ``cycle_{n}.jsonl`` for *cycle* (to *dest* or the session dir)."""
+    text = read_cycle_jsonl(session_dir, cycle)
+    if text is None:
+        return None
+    path = dest or session_dir / f"cycle_{cycle}.jsonl"
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+def gc_store(session_dir: Path) -> int:
+    """Drop stored records no longer referenced by any cycle.
+
+    Returns:
+        Number of bytes reclaimed.
+    """
+    pack_path, _ = _store_paths(session_dir)
+    if not pack_path.exists():
+        return 0
+    live: set[str] = set()
+    for cycle in list_cycles(session_dir):
+        for ref in _read_refs(session_dir, cycle) or ():
+            live.add(ref[0] if isinstance(ref, list) else ref)
+
+    tmp = pack_path.with_suffix(".tmp")
+    index: dict[str, tuple[int, int]] = {}
+    offset = 0
+    with _Reader(session_dir) as reader:
+        if all(h in live for h in reader._index):
+            return 0
+        before = reader.size
+        with tmp.open("wb") as out:
+            for h in list(reader._index):
+                if h not in live:
+                    continue
+                line = reader.get(h)
+                if line is None:
+                    continue
+                data = line.encode("utf-8")
+                index[h] = (offset + _HASH_LEN + 1, len(data))
+                chunk = h.encode("ascii") + b" " + data + b"\n"
+                out.write(chunk)
+                offset += len(chunk)
+
+    # Drop the index before swapping the pack: a crash in between leaves no
+    # index, which the next reader or writer rebuilds from the pack.
+    _store_paths(session_dir)[1].unlink(missing_ok=True)
+    tmp.replace(pack_path)
+    _write_index(session_dir, index)
+    return before - offset
+
+
+def migrate_session(session_dir: Path, *, keep_jsonl: bool = False) -> tuple[int, int]:
+    """Move legacy ``cycle_{n}.jsonl`` files of one session into the store.
+
+    Each cycle is verified to reconstruct byte-for-byte before its JSONL file
+    is removed; cycles that do not round-trip are left untouched.
+
+    Returns:
+        ``(bytes_before, bytes_after)`` for the migrated cycles.
+    """
+    before = after = 0
+    for cycle in list_cycles(session_dir):
+        legacy = session_dir / f"cycle_{cycle}.jsonl"
+        if _refs_path(session_dir, cycle).exists() or not legacy.exists():
+            continue
+        text = legacy.read_text(encoding="utf-8")
+        entries: list[tuple[str, str | None]] = []
+        for line in text.splitlines():
+            try:
+                line_record = json.loads(line)
+            except json.JSONDecodeError:
+                entries.append((line, None))
+                continue
+            canonical, msg_id = _split_id(line_record)
+            if msg_id is None or _join_id(canonical, msg_id) != line:
+                canonical, msg_id = line, None
+            entries.append((canonical, msg_id))
+
+        refs, written = _put_lines(session_dir, entries)
+        written += _write_refs(session_dir, cycle, refs)
+        if read_cycle_jsonl(session_dir, cycle) != text:
+            logger.warning("Cycle %d of %s does not round-trip; keeping JSONL", cycle, session_dir)
+            _refs_path(session_dir, cycle).unlink()
+            continue
+        before += len(text.encode("utf-8"))
+        after += written
+        if not keep_jsonl:
+            legacy.unlink()
+    return before, after
+
+
+def migrate_archive_dir(archive_dir: Path, *, keep_jsonl: bool = False) -> tuple[int, int]:
+    """Run :func:`migrate_session` over every session in *archive_dir*."""
+    before = after = 0
+    for session_dir in sorted(p for p in archive_dir.iterdir() if p.is_dir()):
+        b, a = migrate_session(session_dir, keep_jsonl=keep_jsonl)
+        if b:
+            logger.info("Migrated %s: %d -> %d bytes", session_dir.name, b, a)
+        before += b
+        after += a
+    return before, after
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m hermes_vcc.store", description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_migrate = sub.add_parser("migrate", help="convert legacy cycle_N.jsonl archives into the store")
+    p_migrate.add_argument("archive_dir", type=Path)
+    p_migrate.add_argument("--keep-jsonl", action="store_true", help="do not delete migrated .jsonl files")
+
+    p_export = sub.add_parser("export", help="print the reconstructed cycle_N.jsonl of a cycle")
+    p_export.add_argument("session_dir", type=Path)
+    p_export.add_argument("cycle", type=int)
+
+    args = parser.parse_args(argv)
+    if args.command == "migrate":
+        logging.basicConfig(level=logging.INFO, format="%(message)s")
+        before, after = migrate_archive_dir(args.archive_dir.expanduser(), keep_jsonl=args.keep_jsonl)
+        print(f"migrated {before} bytes of JSONL into {after} bytes")
+        return 0
+
+    text = read_cycle_jsonl(args.session_dir.expanduser(), args.cycle)
+    if text is None:
+        print(f"cycle {args.cycle} not found in {args.session_dir}", file=sys.stderr)
+        return 1
+    sys.stdout.write(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
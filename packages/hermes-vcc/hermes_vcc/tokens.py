@@ -0,0 +1,92 @@
+"""Pluggable token counting.
+
+Tokenizers are ``str -> int`` counters looked up by name:
+
+``tiktoken``
+    Exact BPE counts from tiktoken (``cl100k_base``; ``tiktoken:<encoding>``
+    selects another).  Optional dependency: the vocabulary is loaded once
+    per process and cached on disk by tiktoken itself.
+``vcc``
+    VCC's ``_tokenize``: letter runs, digit runs and single punctuation
+    characters, whitespace not counted.  No dependencies; close to BPE
+    counts for English text and code.
+``chars``
+    :func:`hermes_vcc.utils.estimate_tokens` (``len // 4``).
+``auto``
+    ``tiktoken`` when it is installed and its vocabulary loads, else ``vcc``.
+
+Other counters can be added with :func:`register_tokenizer`.  An unknown or
+failing tokenizer falls back to ``vcc`` with a warning, so a bad config
+never breaks compaction.
+"""
+
+from __future__ import annotations
+
+import functools
+import logging
+from typing import Callable
+
+from hermes_vcc.utils import estimate_tokens, import_vcc
+
+logger = logging.getLogger(__name__)
+
+Tokenizer = Callable[[str], int]
+
+DEFAULT_ENCODING = "cl100k_base"
+
+
+def _tiktoken(encoding: str = DEFAULT_ENCODING) -> Tokenizer:
+    import tiktoken
+
+    encode = tiktoken.get_encoding(encoding).encode_ordinary
+    return lambda text: len(encode(text))
+
+
+def _vcc() -> Tokenizer:
+    tok_re = import_vcc()._TOK_RE
+
+    def count(text: str) -> int:
+        return sum(1 for t in tok_re.findall(text) if not t.isspace())
+
+    return count
+
+
+def _auto() -> Tokenizer:
+    try:
+        return _tiktoken()
+    except Exception as exc:  # noqa: BLE001 — ImportError, or no vocabulary offline
+        logger.debug("tiktoken unavailable, counting tokens with VCC's tokenizer: %s", exc)
+        return _vcc()
+
+
+_FACTORIES: dict[str, Callable[..., Tokenizer]] = {
+    "auto": _auto,
+    "tiktoken": _tiktoken,
+    "vcc": _vcc,
+    "chars": lambda: estimate_tokens,
+}
+
+
+def register_tokenizer(name: str, factory: Callable[[], Tokenizer]) -> None:
+    """Make ``factory()`` available as tokenizer *name* (replacing any)."""
+    _FACTORIES[name] = factory
+    get_tokenizer.cache_clear()
+
+
+@functools.lru_cache(maxsize=None)
+def get_tokenizer(name: str = "auto") -> Tokenizer:
+    """Return the token counter called *name* (created once per process)."""
+    base, _, arg = name.partition(":")
+    factory = _FACTORIES.get(base)
+    try:
+        if factory is None:
+            raise ValueError("no such tokenizer")
+        return factory(arg) if arg else factory()
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("Tokenizer %r unavailable (%s); using VCC's tokenizer", name, exc)
+        return _vcc()
+
+
+def count_tokens(text: str, tokenizer: str = "auto") -> int:
+    """Number of tokens in *text* according to *tokenizer*."""
+    return get_tokenizer(tokenizer)(text)
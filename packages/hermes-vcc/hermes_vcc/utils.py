@@ -2,11 +2,18 @@
 
 from __future__ import annotations
 
+import contextlib
 import importlib.util
 import logging
 import sys
 import types
 from pathlib import Path
+from typing import Iterator
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover — non-POSIX
+    fcntl = None  # type: ignore[assignment]
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +39,25 @@ def ensure_dir(path: Path) -> Path:
     return path
 
 
+@contextlib.contextmanager
+def file_lock(path: Path) -> Iterator[None]:
+    """Hold an exclusive advisory lock on *path* (created if missing).
+
+    Serialises read-modify-write of files shared between processes.  Where
+    ``fcntl`` is unavailable the lock is a no-op; callers still write
+    atomically, so the worst case is a lost update.
+    """
+    ensure_dir(path.parent)
+    with path.open("a") as fh:
+        if fcntl is not None:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+
 def vendor_vcc_path() -> Path:
     """Return the absolute path to vendor/VCC.py shipped with this package."""
     return _PROJECT_ROOT / "vendor" / "VCC.py"
@@ -15,88 +15,27 @@ try:
 except ImportError:
     _MemoryProviderBase = object  # type: ignore[assignment,misc]
 
-import json as _json
-
-from hermes_vcc.archive import archive_before_compression
-from hermes_vcc.compaction import (
-    build_brief_transcript,
-    build_outstanding_context,
-    format_compaction,
-    merge_compactions,
+from hermes_vcc.archive import (
+    archive_before_compression,
+    read_compaction_state,
+    write_compaction_state,
 )
+from hermes_vcc.archiver import EXIT_FLUSH_TIMEOUT, BackgroundArchiver, get_archiver
+from hermes_vcc.compaction import Compaction
 from hermes_vcc.config import VCCConfig, load_config
-from hermes_vcc.extract import extract_file_ops, extract_goals, extract_preferences
-from hermes_vcc.filter_noise import filter_noise
 from hermes_vcc.recall import recall_search
+from hermes_vcc.signals import SignalExtractor
 
 logger = logging.getLogger(__name__)
 
 
-# ---------------------------------------------------------------------------
-# Internal: OpenAI messages -> NormalizedBlock dicts (kind-keyed)
-# ---------------------------------------------------------------------------
-
-def _to_normalized_blocks(messages: list[dict]) -> list[dict]:
-    """Convert Hermes OpenAI-format messages to NormalizedBlock dicts.
-
-    NormalizedBlock keys used by filter_noise / extract:
-        kind:  user | assistant | tool_call | tool_result | thinking
-        text:  str   (user / assistant)
-        name:  str   (tool_call / tool_result)
-        args:  dict  (tool_call)
-        isError: bool (tool_result)
-    """
-    blocks: list[dict] = []
-    for msg in messages:
-        role = msg.get("role", "")
-        content = msg.get("content") or ""
-
-        if role == "user":
-            blocks.append({"kind": "user", "text": content})
-
-        elif role == "assistant":
-            # Emit any text content first
-            if content:
-                blocks.append({"kind": "assistant", "text": content})
-            # Emit tool calls as tool_call blocks
-            for tc in msg.get("tool_calls") or []:
-                fn = tc.get("function", {})
-                name = fn.get("name", "unknown")
-                try:
-                    args = _json.loads(fn.get("arguments") or "{}")
-                    if not isinstance(args, dict):
-                        args = {}
-                except Exception:  # noqa: BLE001
-                    args = {}
-                blocks.append({
-                    "kind": "tool_call",
-                    "name": name,
-                    "id": tc.get("id", ""),
-                    "args": args,
-                })
-
-        elif role == "tool":
-            blocks.append({
-                "kind": "tool_result",
-                "name": "",  # name not available in OpenAI tool role
-                "tool_call_id": msg.get("tool_call_id", ""),
-                "text": content,
-                "isError": bool(msg.get("is_error", False)),
-            })
-
-        elif role == "system":
-            # system messages are not processed by filter_noise/extract
-            pass
-
-    return blocks
-
-
 VCC_RECALL_SCHEMA = {
     "name": "vcc_recall",
     "description": (
         "Search conversation history across compaction boundaries. "
         "Uses hybrid search (BM25 + vector + reranking) when qmd is available, "
-        "falling back to regex matching. Supports natural language queries."
+        "otherwise built-in BM25 keyword ranking, falling back to regex "
+        "matching. Supports natural language queries."
     ),
     "parameters": {
         "type": "object",
@@ -109,6 +48,11 @@ VCC_RECALL_SCHEMA = {
                 "type": "string",
                 "description": "Session ID to search (default: current session).",
             },
+            "all_sessions": {
+                "type": "boolean",
+                "default": False,
+                "description": "Search every archived session, e.g. to find what a previous session decided.",
+            },
             "max_results": {
                 "type": "integer",
                 "default": 20,
@@ -155,8 +99,15 @@ class VCCMemoryProvider(_MemoryProviderBase):
             self._archive_dir = Path.home() / ".hermes" / "vcc_archives"
             self._hermes_home = Path.home() / ".hermes"
         self._config: VCCConfig = load_config()
+        self._archiver: BackgroundArchiver | None = (
+            get_archiver(self._archive_dir, self._config)
+            if self._config.async_archive
+            else None
+        )
         self._compression_cycle: int = 0
-        self._last_compaction: str | None = None
+        self._compaction = Compaction()
+        self._signals = SignalExtractor()
+        self._load_compaction()
         logger.debug(
             "VCCMemoryProvider initialised (session=%s, archive_dir=%s)",
             session_id,
@@ -181,6 +132,20 @@ class VCCMemoryProvider(_MemoryProviderBase):
             },
         ]
 
+    def get_status(self) -> dict[str, Any]:
+        """Provider state plus background archiver queue depth and latencies."""
+        base = getattr(super(), "get_status", None)
+        status: dict[str, Any] = dict(base() or {}) if callable(base) else {}
+        status.update({
+            "provider": self.name,
+            "session_id": getattr(self, "_session_id", None),
+            "compression_cycle": getattr(self, "_compression_cycle", 0),
+        })
+        archiver = getattr(self, "_archiver", None)
+        if archiver is not None:
+            status["archiver"] = archiver.stats()
+        return status
+
     def save_config(self, values: dict[str, Any], hermes_home: str | Path) -> None:
         dest = Path(hermes_home) / "vcc.json"
         dest.parent.mkdir(parents=True, exist_ok=True)
@@ -211,7 +176,7 @@ class VCCMemoryProvider(_MemoryProviderBase):
             query = args.get("query", "")
             if not query:
                 return json.dumps({"error": "query or expand is required"})
-            session_id = args.get("session_id") or self._session_id
+            session_id = None if args.get("all_sessions") else (args.get("session_id") or self._session_id)
             max_results = args.get("max_results", 20)
             matches = recall_search(query, session_id, self._archive_dir, max_results)
             return json.dumps({"results": matches})
@@ -224,48 +189,33 @@ class VCCMemoryProvider(_MemoryProviderBase):
     def on_pre_compress(self, messages: list[dict[str, Any]]) -> str | None:
         """Archive messages then build a structured compaction summary."""
         try:
-            # 1. Lossless archive — must not raise
-            try:
-                archive_before_compression(
-                    messages,
-                    self._session_id,
-                    self._archive_dir,
-                    self._compression_cycle,
-                )
-            except Exception as exc:  # noqa: BLE001
-                logger.warning("archive_before_compression raised unexpectedly: %s", exc)
-
-            # 2. Convert to NormalizedBlock dicts
-            blocks = _to_normalized_blocks(messages)
-
-            # 3. Filter noise
-            filtered = filter_noise(blocks)
-
-            # 4. Extract signals
-            goals = extract_goals(filtered)
-            prefs = extract_preferences(filtered)
-            file_ops = extract_file_ops(filtered)
-
-            # 5. Build outstanding context
-            outstanding = build_outstanding_context(filtered)
-
-            # 6. Build brief transcript
-            brief = build_brief_transcript(filtered)
-
-            # 7. Format compaction string
-            fresh = format_compaction(goals, file_ops, outstanding, prefs, brief)
-
-            # 8. Merge with previous compaction
-            if self._last_compaction:
-                result = merge_compactions(self._last_compaction, fresh)
-            else:
-                result = fresh
-
-            # 9. Store result
-            self._last_compaction = result
+            # 1. Lossless archive — must not raise; queued when async
+            self._archive(messages, self._compression_cycle)
+
+            # 2. Extract goals, preferences, file ops, outstanding context and
+            #    the brief transcript in one pass over the noise-filtered
+            #    messages; only messages new since the last cycle are analysed
+            signals = self._signals.extract(messages)
+
+            # 3. Merge into the running compaction and render it, within the
+            #    configured token budget if there is one
+            self._compaction.update(
+                signals.goals,
+                signals.file_ops,
+                signals.outstanding,
+                signals.preferences,
+                signals.brief,
+            )
+            result = self._compaction.render(
+                max_tokens=self._config.summary_max_tokens or None,
+                tokenizer=self._config.tokenizer,
+            )
+
+            # 4. Persist so a restarted session resumes from here
             self._compression_cycle += 1
+            self._save_compaction()
 
-            # 10. Return for Hermes to use as compression summary
+            # 5. Return for Hermes to use as compression summary
             return result
 
         except Exception as exc:  # noqa: BLE001
@@ -273,16 +223,45 @@ class VCCMemoryProvider(_MemoryProviderBase):
             return None
 
     def on_session_end(self, messages: list[dict[str, Any]]) -> None:
-        """Final lossless archive flush at session close."""
+        """Final lossless archive flush at session close (bounded like the exit flush)."""
+        self._archive(messages, self._compression_cycle + 1)
+        if self._archiver is not None and not self._archiver.flush(EXIT_FLUSH_TIMEOUT):
+            logger.warning("Archive queue not drained within %.0fs at session end", EXIT_FLUSH_TIMEOUT)
+
+    def _load_compaction(self) -> None:
+        """Resume the compaction and cycle counter saved for this session."""
+        state = read_compaction_state(self._archive_dir / self._session_id)
+        if not state:
+            return
+        try:
+            self._compaction = Compaction.from_dict(state.get("compaction", {}))
+            self._compression_cycle = int(state.get("cycle", 0))
+        except (TypeError, ValueError, AttributeError) as exc:
+            logger.warning("Ignoring unreadable compaction state for %s: %s", self._session_id, exc)
+            self._compaction = Compaction()
+
+    def _save_compaction(self) -> None:
+        write_compaction_state(
+            self._archive_dir / self._session_id,
+            {"cycle": self._compression_cycle, "compaction": self._compaction.to_dict()},
+        )
+
+    def _archive(self, messages: list[dict[str, Any]], cycle: int) -> None:
+        """Archive *messages* as *cycle*, via the background archiver if enabled."""
+        if self._archiver is not None:
+            self._archiver.submit(messages, self._session_id, cycle)
+            return
         try:
             archive_before_compression(
                 messages,
                 self._session_id,
                 self._archive_dir,
-                self._compression_cycle + 1,
+                cycle,
+                incremental=self._config.incremental_compile,
+                dedup=self._config.dedup_store,
             )
         except Exception as exc:  # noqa: BLE001
-            logger.warning("on_session_end archive failed: %s", exc)
+            logger.warning("archive_before_compression raised unexpectedly: %s", exc)
 
 
 # ------------------------------------------------------------------
@@ -1,5 +1,6 @@
 """Tests for the format adapter: Hermes OpenAI -> VCC Anthropic JSONL."""
 
+import copy
 import json
 import sys
 import tempfile
@@ -8,9 +9,12 @@ from pathlib import Path
 import pytest
 
 from hermes_vcc.adapter import (
+    Converter,
     convert_conversation,
     convert_message,
+    iter_records,
     records_to_jsonl,
+    write_jsonl,
     _extract_thinking,
     _is_compression_summary,
     _is_error_content,
@@ -65,6 +69,20 @@ class TestExtractThinking:
         assert blocks == []
         assert remaining == "Just text."
 
+    def test_scratchpads_extracted_before_think(self):
+        content = (
+            "<think>a<REASONING_SCRATCHPAD>b</REASONING_SCRATCHPAD>c</think>"
+            " mid <REASONING_SCRATCHPAD>d</REASONING_SCRATCHPAD> end"
+        )
+        blocks, remaining = _extract_thinking(content)
+        assert [b["thinking"] for b in blocks] == ["b", "d", "ac"]
+        assert remaining == "mid  end"
+
+    def test_unclosed_tag_kept(self):
+        blocks, remaining = _extract_thinking("<think>never closed")
+        assert blocks == []
+        assert remaining == "<think>never closed"
+
 
 class TestParseArguments:
     def test_valid_json(self):
@@ -374,6 +392,111 @@ class TestConvertConversation:
                             assert b["tool_use_id"], "tool_result must have tool_use_id"
 
 
+# ---------------------------------------------------------------------------
+# Deterministic message ids
+# ---------------------------------------------------------------------------
+
+
+class TestSyntheticIds:
+    def test_conversion_is_byte_reproducible(self, tool_heavy_session, thinking_session):
+        session = tool_heavy_session + thinking_session
+        assert records_to_jsonl(convert_conversation(session)) == records_to_jsonl(
+            convert_conversation(copy.deepcopy(session))
+        )
+
+    def test_id_format(self, basic_conversation):
+        ids = [
+            r["message"]["id"] for r in convert_conversation(basic_conversation)
+            if r["type"] == "assistant"
+        ]
+        assert all(len(i) == 28 and i.startswith("msg_") for i in ids)
+
+    def test_ids_follow_content(self):
+        a = convert_conversation([{"role": "assistant", "content": "one"}])
+        b = convert_conversation([{"role": "assistant", "content": "two"}])
+        assert a[0]["message"]["id"] != b[0]["message"]["id"]
+
+    def test_repeated_messages_not_merged_by_vcc(self, vcc_py_path):
+        from hermes_vcc.utils import import_vcc
+
+        msgs = [{"role": "assistant", "content": "Working."}] * 2
+        records = convert_conversation(msgs)
+        assert records[0]["message"]["id"] != records[1]["message"]["id"]
+        assert len(import_vcc().merge_chunks(records)) == 2
+
+    def test_missing_tool_call_id_is_stable(self):
+        msg = {
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [{"type": "function", "function": {"name": "Read", "arguments": "{}"}}],
+        }
+        first = convert_conversation([msg])
+        assert first == convert_conversation([msg])
+        assert first[0]["message"]["content"][0]["id"].startswith("msg_")
+
+
+# ---------------------------------------------------------------------------
+# Converter (memoized across cycles)
+# ---------------------------------------------------------------------------
+
+
+class TestConverter:
+    def test_matches_convert_conversation(self, tool_heavy_session, thinking_session):
+        for session in (tool_heavy_session, thinking_session):
+            assert Converter().convert(session) == convert_conversation(session)
+
+    def test_shifted_repeats_get_fresh_ids(self):
+        msgs = [
+            {"role": "assistant", "content": "Done."},
+            {"role": "user", "content": "again"},
+            {"role": "assistant", "content": "Done."},
+        ]
+        converter = Converter()
+        converter.convert(msgs)
+        # Dropping the first "Done." makes the second one the first occurrence.
+        assert converter.convert(msgs[1:]) == convert_conversation(msgs[1:])
+
+    def test_next_cycle_converts_only_new_messages(self, tool_heavy_session):
+        converter = Converter()
+        half = len(tool_heavy_session) // 2
+        first = converter.convert(tool_heavy_session[:half])
+        # The archiver hands over fresh copies of each message every cycle.
+        second = converter.convert([dict(m) for m in tool_heavy_session])
+        assert converter.hits == half
+        assert converter.misses == len(tool_heavy_session)
+        assert second[: len(first)] == first
+        assert all(a is b for a, b in zip(first, second))
+
+    def test_changed_message_reconverted(self):
+        converter = Converter()
+        converter.convert([{"role": "user", "content": "old"}])
+        [rec] = converter.convert([{"role": "user", "content": "new"}])
+        assert rec["message"]["content"] == "new"
+        assert converter.hits == 0
+
+    def test_repeated_message_keeps_distinct_ids(self):
+        msg = {"role": "assistant", "content": "Done."}
+        converter = Converter()
+        records = converter.convert([msg, dict(msg)])
+        again = converter.convert([msg, dict(msg)])
+        assert records[0]["message"]["id"] != records[1]["message"]["id"]
+        assert again == records
+
+    def test_unkeyable_message_still_converted(self):
+        converter = Converter()
+        msg = {"role": "tool", "tool_call_id": "c1", "content": "ok", "is_error": []}
+        assert converter.convert([msg]) == convert_conversation([msg])
+        assert converter.convert([msg]) == convert_conversation([msg])
+        assert converter.hits == 0
+
+    def test_forgets_dropped_messages(self):
+        converter = Converter()
+        converter.convert([{"role": "user", "content": "a"}, {"role": "user", "content": "b"}])
+        converter.convert([{"role": "user", "content": "b"}])
+        converter.convert([{"role": "user", "content": "a"}])
+        assert converter.hits == 1
+
+
 # ---------------------------------------------------------------------------
 # records_to_jsonl tests
 # ---------------------------------------------------------------------------
@@ -394,6 +517,26 @@ class TestRecordsToJsonl:
     def test_empty(self):
         assert records_to_jsonl([]) == ""
 
+    def test_write_jsonl_streams_same_bytes(self, tool_heavy_session, tmp_path):
+        records = convert_conversation(tool_heavy_session)
+        records.append({"type": "user", "message": {"content": "ünïcode ☃"}})
+        stats: dict = {}
+        path = tmp_path / "out.jsonl"
+        with path.open("wb") as fh:
+            written = write_jsonl(iter(records), fh, stats)
+        expected = records_to_jsonl(records)
+        assert path.read_text(encoding="utf-8") == expected
+        assert stats == {"chars": len(expected), "bytes": written}
+        assert written == len(expected.encode("utf-8"))
+
+    def test_iter_records_is_lazy(self, tool_heavy_session):
+        stream = iter_records(tool_heavy_session)
+        first = next(stream)
+        rest = list(stream)
+        expected = convert_conversation(tool_heavy_session)
+        assert len([first] + rest) == len(expected)
+        assert first == expected[0]
+
 
 # ---------------------------------------------------------------------------
 # VCC roundtrip test — validates adapter output against VCC's parser
@@ -9,11 +9,14 @@ from hermes_vcc.archive import (
     archive_before_compression,
     get_archive_manifest,
     prune_archives,
+    read_compaction_state,
+    write_compaction_state,
 )
+from hermes_vcc.store import list_cycles, read_cycle_jsonl
 
 
 class TestArchiveCreatesFiles:
-    """archive_before_compression produces .jsonl, .txt, .min.txt."""
+    """archive_before_compression produces record refs, .txt, .min.txt."""
 
     def test_archive_creates_files(self, basic_conversation, archive_dir, vcc_py_path):
         session_id = "test-session"
@@ -24,7 +27,7 @@ class TestArchiveCreatesFiles:
             compression_cycle=1,
         )
 
-        assert (session_dir / "cycle_1.jsonl").exists()
+        assert (session_dir / "cycle_1.refs.json").exists()
         assert (session_dir / "cycle_1.txt").exists()
         assert (session_dir / "cycle_1.min.txt").exists()
 
@@ -102,9 +105,89 @@ class TestArchiveMultipleCycles:
         assert manifest["cycles"][0]["id"] == 1
         assert manifest["cycles"][1]["id"] == 2
 
-        # Both JSONL files should exist
+        # Both cycles should be reconstructable
+        assert read_cycle_jsonl(session_dir, 1) is not None
+        assert read_cycle_jsonl(session_dir, 2) is not None
+
+
+class TestArchiveIncremental:
+    """Incremental compile produces the same views as a full compile."""
+
+    def test_incremental_matches_full(self, tool_heavy_session, archive_dir, vcc_py_path):
+        half = len(tool_heavy_session) // 2
+        for cycle, messages in ((1, tool_heavy_session[:half]), (2, tool_heavy_session)):
+            inc_dir = archive_before_compression(messages, "inc", archive_dir, cycle)
+            full_dir = archive_before_compression(
+                messages, "full", archive_dir, cycle, incremental=False,
+            )
+            for suffix in (".txt", ".min.txt"):
+                name = f"cycle_{cycle}{suffix}"
+                assert (inc_dir / name).read_text() == (full_dir / name).read_text()
+
+    def test_reuses_converted_messages(self, tool_heavy_session, archive_dir, vcc_py_path):
+        from hermes_vcc.archive import _converter
+
+        half = len(tool_heavy_session) // 2
+        archive_before_compression(tool_heavy_session[:half], "conv", archive_dir, 1)
+        archive_before_compression(
+            [dict(m) for m in tool_heavy_session], "conv", archive_dir, 2,
+        )
+        converter = _converter(archive_dir / "conv")
+        assert converter.hits == half
+        assert converter.misses == len(tool_heavy_session)
+
+
+class TestArchiveDedup:
+    """Records shared between cycles are stored once."""
+
+    def test_cycles_share_records(self, tool_heavy_session, archive_dir, vcc_py_path):
+        from hermes_vcc.adapter import convert_conversation, records_to_jsonl
+
+        session_dir = None
+        for cycle in range(1, 6):
+            session_dir = archive_before_compression(
+                tool_heavy_session, "dedup", archive_dir, cycle,
+            )
+        full = len(records_to_jsonl(convert_conversation(tool_heavy_session)))
+        stored = (session_dir / "store" / "records.jsonl").stat().st_size
+        assert stored < 2 * full
+        assert list_cycles(session_dir) == [1, 2, 3, 4, 5]
+
+    def test_dedup_off_writes_jsonl(self, basic_conversation, archive_dir, vcc_py_path):
+        session_dir = archive_before_compression(
+            basic_conversation, "legacy", archive_dir, 1, dedup=False,
+        )
         assert (session_dir / "cycle_1.jsonl").exists()
-        assert (session_dir / "cycle_2.jsonl").exists()
+        assert not (session_dir / "cycle_1.refs.json").exists()
+
+
+class TestArchiveStreaming:
+    """The cycle JSONL is written and measured without building its text."""
+
+    @pytest.mark.parametrize("dedup", [True, False])
+    def test_manifest_sizes_match_jsonl(self, tool_heavy_session, archive_dir, vcc_py_path, dedup):
+        from hermes_vcc.utils import estimate_tokens
+
+        session_dir = archive_before_compression(
+            tool_heavy_session, "stream", archive_dir, 1, dedup=dedup,
+        )
+        jsonl = read_cycle_jsonl(session_dir, 1)
+        [cycle] = get_archive_manifest(session_dir)["cycles"]
+        assert cycle["tokens_estimate"] == estimate_tokens(jsonl)
+        assert cycle["bytes"] == len(jsonl.encode("utf-8"))
+
+    def test_compiles_streamed_records(self, tool_heavy_session, archive_dir, vcc_py_path):
+        timings: dict = {}
+        stored = archive_before_compression(
+            tool_heavy_session, "a", archive_dir, 1, timings=timings,
+        )
+        plain = archive_before_compression(
+            tool_heavy_session, "b", archive_dir, 1, dedup=False,
+        )
+        assert {"convert", "store", "compile"} <= set(timings)
+        for name in ("cycle_1.txt", "cycle_1.min.txt"):
+            assert (stored / name).read_text() == (plain / name).read_text()
+            assert (stored / name).stat().st_size > 0
 
 
 class TestArchivePrune:
@@ -140,11 +223,11 @@ class TestArchivePrune:
         assert 12 in remaining_ids
 
         # Files for pruned cycles should be deleted
-        assert not (session_dir / "cycle_1.jsonl").exists()
-        assert not (session_dir / "cycle_2.jsonl").exists()
-        # Files for kept cycles should still exist
-        assert (session_dir / "cycle_3.jsonl").exists()
-        assert (session_dir / "cycle_12.jsonl").exists()
+        assert not (session_dir / "cycle_1.refs.json").exists()
+        assert not (session_dir / "cycle_2.refs.json").exists()
+        # Kept cycles should still be reconstructable
+        assert read_cycle_jsonl(session_dir, 3) is not None
+        assert read_cycle_jsonl(session_dir, 12) is not None
 
 
 class TestArchiveEmptyMessages:
@@ -160,8 +243,8 @@ class TestArchiveEmptyMessages:
 
         # Should still return a valid session_dir
         assert session_dir.is_dir()
-        # JSONL should exist (empty records)
-        assert (session_dir / "cycle_1.jsonl").exists()
+        # The cycle should exist (empty records)
+        assert read_cycle_jsonl(session_dir, 1) == ""
 
 
 class TestArchiveReturnsSessionDir:
@@ -201,3 +284,27 @@ class TestGetArchiveManifest:
         empty_dir.mkdir()
         manifest = get_archive_manifest(empty_dir)
         assert manifest == {}
+
+
+class TestCompactionState:
+    """Compaction state is saved next to the manifest."""
+
+    def test_round_trip(self, tmp_path):
+        session_dir = tmp_path / "s1"
+        write_compaction_state(session_dir, {"cycle": 2, "compaction": {"goals": ["x"]}})
+        assert (session_dir / "compaction.json").exists()
+        assert read_compaction_state(session_dir) == {"cycle": 2, "compaction": {"goals": ["x"]}}
+
+    def test_missing(self, tmp_path):
+        assert read_compaction_state(tmp_path) == {}
+
+    def test_corrupt(self, tmp_path):
+        (tmp_path / "compaction.json").write_text("{not json")
+        assert read_compaction_state(tmp_path) == {}
+
+    def test_not_pruned(self, basic_conversation, archive_dir, vcc_py_path):
+        for cycle in range(1, 4):
+            session_dir = archive_before_compression(basic_conversation, "s1", archive_dir, cycle)
+        write_compaction_state(session_dir, {"cycle": 3})
+        prune_archives(session_dir, retain=1)
+        assert read_compaction_state(session_dir) == {"cycle": 3}
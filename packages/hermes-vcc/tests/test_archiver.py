@@ -0,0 +1,201 @@
+"""Tests for hermes_vcc.archiver — background archiving."""
+
+import json
+import threading
+
+from hermes_vcc import archiver as archiver_mod
+from hermes_vcc.archive import get_archive_manifest
+from hermes_vcc.archiver import BackgroundArchiver
+from hermes_vcc.config import VCCConfig
+from hermes_vcc.hooks import _install_archive
+from hermes_vcc.store import read_cycle_jsonl
+
+
+def _archiver(archive_dir, **kwargs):
+    return BackgroundArchiver(archive_dir, VCCConfig(archive_dir=archive_dir), **kwargs)
+
+
+class TestSubmit:
+    def test_submit_then_flush_archives(self, basic_conversation, archive_dir, vcc_py_path):
+        bg = _archiver(archive_dir)
+        assert bg.submit(basic_conversation, "s1", 1)
+        assert bg.flush(timeout=30)
+
+        session_dir = archive_dir / "s1"
+        assert (session_dir / "cycle_1.min.txt").exists()
+        assert read_cycle_jsonl(session_dir, 1)
+        assert not list((session_dir / "journal").iterdir())
+        bg.close()
+
+    def test_cycles_archived_in_order(self, tool_heavy_session, archive_dir, vcc_py_path):
+        bg = _archiver(archive_dir, max_queue=1)
+        for cycle in range(1, 5):
+            bg.submit(tool_heavy_session[: cycle * 3], "ordered", cycle)
+        bg.close(timeout=30)
+        ids = [c["id"] for c in get_archive_manifest(archive_dir / "ordered")["cycles"]]
+        assert ids == [1, 2, 3, 4]
+
+    def test_snapshot_isolated_from_caller(self, archive_dir, vcc_py_path):
+        bg = _archiver(archive_dir)
+        gate = threading.Event()
+        real_archive = bg._archive
+        bg._archive = lambda job: (gate.wait(10), real_archive(job))  # type: ignore[method-assign]
+
+        messages = [{"role": "user", "content": "original"}]
+        bg.submit(messages, "snap", 1)
+        messages[0]["content"] = "replaced"
+        messages.append({"role": "user", "content": "appended"})
+        gate.set()
+        bg.close(timeout=30)
+
+        text = read_cycle_jsonl(archive_dir / "snap", 1)
+        assert "original" in text
+        assert "replaced" not in text and "appended" not in text
+
+    def test_retain_prunes(self, basic_conversation, archive_dir, vcc_py_path):
+        bg = _archiver(archive_dir)
+        for cycle in range(1, 5):
+            bg.submit(basic_conversation, "pruned", cycle, retain=2)
+        bg.close(timeout=30)
+        ids = [c["id"] for c in get_archive_manifest(archive_dir / "pruned")["cycles"]]
+        assert ids == [3, 4]
+
+
+class TestStats:
+    def test_queue_depth_and_stage_latency(self, basic_conversation, archive_dir, vcc_py_path):
+        bg = _archiver(archive_dir)
+        gate = threading.Event()
+        real_archive = bg._archive
+        bg._archive = lambda job: (gate.wait(10), real_archive(job))  # type: ignore[method-assign]
+
+        bg.submit(basic_conversation, "stats", 1)
+        bg.submit(basic_conversation, "stats", 2)
+        assert bg.stats()["queue_depth"] == 2
+        gate.set()
+        bg.close(timeout=30)
+
+        stats = bg.stats()
+        assert stats["queue_depth"] == 0
+        assert stats["submitted"] == stats["completed"] == 2
+        for stage in ("snapshot", "journal", "convert", "store", "compile", "manifest"):
+            assert stats["stages"][stage]["count"] == 2
+            assert stats["stages"][stage]["max_ms"] >= stats["stages"][stage]["avg_ms"] >= 0
+
+
+class TestJournalRecovery:
+    def _journal(self, archive_dir, session_id, cycle, messages, pid=1):
+        path = archive_dir / session_id / "journal" / f"cycle_{cycle}.{pid}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({"session_id": session_id, "cycle": cycle, "messages": messages}))
+        return path
+
+    def test_replays_journal_of_dead_process(self, basic_conversation, archive_dir, monkeypatch, vcc_py_path):
+        monkeypatch.setattr(archiver_mod, "_pid_alive", lambda pid: False)
+        journal = self._journal(archive_dir, "crashed", 3, basic_conversation)
+
+        bg = _archiver(archive_dir)
+        assert bg.recover() == 1
+        bg.close(timeout=30)
+
+        assert [c["id"] for c in get_archive_manifest(archive_dir / "crashed")["cycles"]] == [3]
+        assert not journal.exists()
+        assert bg.stats()["recovered"] == 1
+
+    def test_skips_live_process_journal(self, basic_conversation, archive_dir, monkeypatch):
+        monkeypatch.setattr(archiver_mod, "_pid_alive", lambda pid: True)
+        journal = self._journal(archive_dir, "live", 1, basic_conversation)
+        assert _archiver(archive_dir).recover() == 0
+        assert journal.exists()
+
+    def test_running_cycle_journaled(self, basic_conversation, archive_dir, monkeypatch, vcc_py_path):
+        dead = _archiver(archive_dir)
+        dead._archive = lambda job: None  # type: ignore[method-assign]  # dies while archiving
+        assert dead.submit(basic_conversation, "running", 1)
+        assert dead.submit(basic_conversation, "running", 2)
+        dead.flush(timeout=30)
+        assert len(list((archive_dir / "running" / "journal").glob("cycle_*.json"))) == 2
+
+        monkeypatch.setattr(archiver_mod, "_pid_alive", lambda pid: False)
+        bg = _archiver(archive_dir)
+        assert bg.recover() == 2
+        bg.close(timeout=30)
+        assert [c["id"] for c in get_archive_manifest(archive_dir / "running")["cycles"]] == [1, 2]
+        assert not list((archive_dir / "running" / "journal").iterdir())
+
+    def test_journal_written_by_worker(self, basic_conversation, archive_dir, monkeypatch, vcc_py_path):
+        bg = _archiver(archive_dir)
+        writers = []
+        real_write = bg._write_journal
+
+        def write(session_dir, job):
+            writers.append(threading.current_thread().name)
+            return real_write(session_dir, job)
+
+        monkeypatch.setattr(bg, "_write_journal", write)
+        assert bg.submit(basic_conversation, "worker", 1)
+        bg.close(timeout=30)
+        assert writers == ["hermes-vcc-archiver"]
+
+    def test_unjournaled_cycle_still_archived(self, basic_conversation, archive_dir, monkeypatch, vcc_py_path):
+        bg = _archiver(archive_dir)
+
+        def fail(session_dir, job):
+            raise OSError("disk full")
+
+        monkeypatch.setattr(bg, "_write_journal", fail)
+        assert bg.submit(basic_conversation, "nojournal", 1)
+        bg.close(timeout=30)
+        assert [c["id"] for c in get_archive_manifest(archive_dir / "nojournal")["cycles"]] == [1]
+
+    def test_already_archived_cycle_not_duplicated(self, basic_conversation, archive_dir, monkeypatch, vcc_py_path):
+        monkeypatch.setattr(archiver_mod, "_pid_alive", lambda pid: False)
+        bg = _archiver(archive_dir)
+        bg.submit(basic_conversation, "done", 1)
+        bg.flush(timeout=30)
+        journal = self._journal(archive_dir, "done", 1, basic_conversation, pid=2)
+
+        bg.recover()
+        bg.close(timeout=30)
+
+        assert len(get_archive_manifest(archive_dir / "done")["cycles"]) == 1
+        assert not journal.exists()
+
+
+class TestGetArchiver:
+    def test_exit_flush_is_bounded(self, archive_dir, monkeypatch):
+        registered = []
+        monkeypatch.setattr(archiver_mod, "_ARCHIVERS", {})
+        monkeypatch.setattr(archiver_mod.atexit, "register", lambda *args: registered.append(args))
+        bg = archiver_mod.get_archiver(archive_dir)
+        assert registered == [(bg.flush, archiver_mod.EXIT_FLUSH_TIMEOUT)]
+
+    def test_recover_runs_outside_registry_lock(self, archive_dir, monkeypatch):
+        held = []
+        monkeypatch.setattr(archiver_mod, "_ARCHIVERS", {})
+        monkeypatch.setattr(archiver_mod.atexit, "register", lambda *args: None)
+        monkeypatch.setattr(
+            archiver_mod.BackgroundArchiver, "recover",
+            lambda self: held.append(archiver_mod._ARCHIVERS_LOCK.locked()) or 0,
+        )
+        bg = archiver_mod.get_archiver(archive_dir)
+        assert archiver_mod.get_archiver(archive_dir) is bg
+        assert held == [False]
+
+
+class TestHookIntegration:
+    def test_hook_queues_archive(self, basic_conversation, tmp_path, vcc_py_path):
+        config = VCCConfig(archive_dir=tmp_path / "archives")
+
+        class Agent:
+            session_id = "hooked"
+
+            def _compress_context(self, messages, system_message):
+                return messages[:1]
+
+        agent = Agent()
+        assert _install_archive(agent, config)
+        assert agent._compress_context(basic_conversation, "sys") == basic_conversation[:1]
+
+        bg = agent._compress_context._vcc_archiver
+        assert bg.flush(timeout=30)
+        assert (config.archive_dir / "hooked" / "cycle_1.min.txt").exists()
@@ -0,0 +1,70 @@
+"""Tests for hermes_vcc.classify — shared tool-result error classifier."""
+
+import pytest
+
+from hermes_vcc.classify import (
+    ERROR_INDICATORS,
+    HEAD_CHARS,
+    _classify_head,
+    head_contains,
+    is_error_result,
+    looks_like_error,
+)
+
+
+class TestLooksLikeError:
+    @pytest.mark.parametrize("indicator", ERROR_INDICATORS)
+    def test_every_indicator_detected(self, indicator):
+        assert looks_like_error(f"some output\n{indicator} details")
+
+    @pytest.mark.parametrize("text", [
+        "", "hello world", "0 errors, 0 failed", "ERROR in caps", "exception handled",
+    ])
+    def test_clean_output(self, text):
+        assert not looks_like_error(text)
+
+    def test_only_head_inspected(self):
+        assert not looks_like_error("x" * HEAD_CHARS + "Traceback")
+        assert looks_like_error("x" * (HEAD_CHARS - 9) + "Traceback")
+
+    def test_non_string_content(self):
+        assert looks_like_error([{"type": "text", "text": "Error: nope"}])
+        assert not looks_like_error(None)
+
+    def test_cached_per_head(self):
+        _classify_head.cache_clear()
+        text = "Traceback (most recent call last)"
+        looks_like_error(text)
+        looks_like_error(text)
+        assert _classify_head.cache_info().hits == 1
+
+
+class TestHeadContains:
+    WORDS = ("error", "failed")
+
+    def test_case_sensitive_by_default(self):
+        assert head_contains("it failed", self.WORDS)
+        assert not head_contains("ERROR: disk full", self.WORDS)
+
+    def test_ignore_case(self):
+        assert head_contains("ERROR: disk full", self.WORDS, ignore_case=True)
+        assert head_contains("Failed to connect", self.WORDS, ignore_case=True)
+        assert not head_contains("all good", self.WORDS, ignore_case=True)
+
+    def test_only_head_inspected(self):
+        assert not head_contains("x" * HEAD_CHARS + "error", self.WORDS)
+
+    def test_empty_and_non_string(self):
+        assert not head_contains(None, self.WORDS)
+        assert head_contains([{"text": "error"}], self.WORDS)
+
+
+class TestIsErrorResult:
+    def test_explicit_flag_wins(self):
+        assert is_error_result({"content": "fine", "is_error": True})
+        assert not is_error_result({"content": "Traceback", "is_error": False})
+
+    def test_heuristic_without_flag(self):
+        assert is_error_result({"content": "Permission denied"})
+        assert is_error_result({"content": "Permission denied", "is_error": None})
+        assert not is_error_result({"content": "ok"})
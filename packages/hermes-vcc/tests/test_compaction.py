@@ -1,7 +1,11 @@
 """Tests for hermes_vcc/compaction.py"""
 
+import json
+
 import pytest
 from hermes_vcc.compaction import (
+    BRIEF_MAX_LINES,
+    Compaction,
     build_brief_transcript,
     build_outstanding_context,
     cap_brief,
@@ -9,6 +13,7 @@ from hermes_vcc.compaction import (
     merge_compactions,
     SEPARATOR,
 )
+from hermes_vcc.tokens import count_tokens
 
 
 # ---------------------------------------------------------------------------
@@ -222,3 +227,117 @@ def test_merge_compactions_no_duplicate_files():
     fresh = format_compaction([], fo, [], [], "")
     merged = merge_compactions(prev, fresh)
     assert merged.count("- x.py (modified)") == 1
+
+
+# ---------------------------------------------------------------------------
+# Compaction
+# ---------------------------------------------------------------------------
+
+FO = {"modified_files": ["x.py"], "created_files": ["y.py"], "read_files": ["z.md"]}
+
+
+def test_compaction_first_update_matches_format():
+    brief = "\n".join(f"U: msg {i}" for i in range(200))
+    c = Compaction()
+    c.update(["Fix bug"], FO, ["Note that x"], ["prefer tabs"], brief)
+    assert c.render() == format_compaction(["Fix bug"], FO, ["Note that x"], ["prefer tabs"], brief)
+
+
+def test_compaction_matches_merge_compactions():
+    cycles = [
+        (["Fix bug"], FO, ["Note that old"], ["prefer tabs"], "U: first\nA: ok"),
+        (["Fix bug", "Add tests"], {"read_files": ["z.md", "w.md"]}, ["Note that new"], [], "U: second"),
+    ]
+    c = Compaction()
+    merged = ""
+    for signals in cycles:
+        c.update(*signals)
+        fresh = format_compaction(*signals)
+        merged = merge_compactions(merged, fresh) if merged else fresh
+    assert c.render() == merged
+
+
+def test_compaction_sections_keep_first_seen_order():
+    c = Compaction()
+    c.update(["b", "a"], {}, [], ["p1"], "")
+    c.update(["a", "c"], {}, [], ["p2", "p1"], "")
+    assert list(c.goals) == ["b", "a", "c"]
+    assert list(c.preferences) == ["p1", "p2"]
+
+
+def test_compaction_outstanding_replaced():
+    c = Compaction()
+    c.update([], {}, ["Note that old context"], [], "")
+    c.update([], {}, [], [], "")
+    assert "Outstanding Context" not in c.render()
+
+
+def test_compaction_brief_tail_bounded():
+    c = Compaction()
+    for cycle in range(5):
+        c.update([], {}, [], [], "\n".join(f"U: {cycle}.{i}" for i in range(50)))
+    assert len(c.brief) == BRIEF_MAX_LINES
+    assert c.brief[-1] == "U: 4.49"
+    assert c.omitted == 250 - BRIEF_MAX_LINES
+    assert c.render().startswith(f"...({250 - BRIEF_MAX_LINES} earlier lines omitted)\n\nU: ")
+
+
+def test_compaction_dict_round_trip():
+    c = Compaction()
+    c.update(["Fix bug"], FO, ["Note that x"], ["prefer tabs"], "\n".join("x" * 200))
+    restored = Compaction.from_dict(json.loads(json.dumps(c.to_dict())))
+    assert restored == c
+    assert restored.render() == c.render()
+    restored.update([], {}, [], [], "U: more")
+    assert restored.brief.maxlen == BRIEF_MAX_LINES
+    assert restored.brief[-1] == "U: more"
+
+
+def test_compaction_empty():
+    assert Compaction().render() == ""
+    assert Compaction.from_dict({}) == Compaction()
+
+
+# ---------------------------------------------------------------------------
+# Compaction.render(max_tokens=...)
+# ---------------------------------------------------------------------------
+
+def _big_compaction():
+    c = Compaction()
+    c.update(
+        [f"Goal number {i} for the session" for i in range(8)],
+        {"read_files": [f"src/module_{i}.py" for i in range(30)]},
+        [f"Note that detail {i} matters" for i in range(8)],
+        [f"prefer option {i}" for i in range(10)],
+        "\n".join(f"U: message {i} with some words" for i in range(150)),
+    )
+    return c
+
+
+@pytest.mark.parametrize("budget", [0, 5, 40, 150, 400, 1000])
+@pytest.mark.parametrize("tokenizer", ["vcc", "chars"])
+def test_render_budget_respected(budget, tokenizer):
+    text = _big_compaction().render(max_tokens=budget, tokenizer=tokenizer)
+    assert count_tokens(text, tokenizer) <= budget
+
+
+def test_render_budget_fills_by_priority():
+    text = _big_compaction().render(max_tokens=150, tokenizer="vcc")
+    assert "[Session Goal]" in text
+    assert "[User Preferences]" in text
+    assert "[Files And Changes]" not in text
+    assert SEPARATOR not in text
+
+
+def test_render_budget_keeps_newest_brief_lines():
+    text = _big_compaction().render(max_tokens=1000, tokenizer="vcc")
+    brief = text.split(SEPARATOR)[-1]
+    assert brief.endswith("U: message 149 with some words")
+    assert "U: message 0 " not in brief
+    assert brief.startswith("...(")
+    assert count_tokens(text, "vcc") > 900
+
+
+def test_render_budget_large_enough_is_unchanged():
+    c = _big_compaction()
+    assert c.render(max_tokens=10**6, tokenizer="vcc") == c.render()
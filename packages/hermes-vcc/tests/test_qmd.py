@@ -16,11 +16,20 @@ from hermes_vcc import qmd
 # Fixtures
 # ---------------------------------------------------------------------------
 
+_real_worker = qmd._worker
+
+
 @pytest.fixture(autouse=True)
-def _reset_qmd_cache():
-    """Reset the qmd binary cache between tests."""
+def _reset_qmd_cache(monkeypatch):
+    """Reset the qmd caches between tests; CLI path unless a test opts in."""
     qmd._QMD_BIN = None
+    monkeypatch.setattr(qmd, "_worker", lambda: None)
+    monkeypatch.setattr(qmd, "_KNOWN_COLLECTIONS", set())
+    monkeypatch.setattr(qmd, "_SCOPED_UPDATE", None)
+    monkeypatch.setattr(qmd, "_WORKER_FAILURES", 0)
+    monkeypatch.setattr(qmd, "_REGISTRY_CACHE", {})
     yield
+    qmd.close_worker()
     qmd._QMD_BIN = None
 
 
@@ -317,10 +326,34 @@ class TestEnsureCollection:
             mock_run.return_value = MagicMock(returncode=0)
             assert qmd.ensure_collection(tmp_path, "s1")
 
-        # Should have called show, then update
+        # Should have called show, then a scoped update
         calls = [c[0][0] for c in mock_run.call_args_list]
         assert calls[0] == ["collection", "show", "vcc-s1"]
-        assert calls[1] == ["update"]
+        assert calls[1] == ["update", "-c", "vcc-s1"]
+
+    def test_known_collection_skips_show(self, tmp_path: Path) -> None:
+        with patch.object(qmd, "is_available", return_value=True), \
+             patch.object(qmd, "_run") as mock_run:
+            mock_run.return_value = MagicMock(returncode=0)
+            qmd.ensure_collection(tmp_path, "s1")
+            qmd.ensure_collection(tmp_path, "s1")
+
+        calls = [c[0][0] for c in mock_run.call_args_list]
+        assert calls.count(["collection", "show", "vcc-s1"]) == 1
+        assert calls[-1] == ["update", "-c", "vcc-s1"]
+
+    def test_unscoped_update_fallback(self, tmp_path: Path) -> None:
+        def run(args, timeout=30):
+            return MagicMock(returncode=2 if args[:2] == ["update", "-c"] else 0, stderr="")
+
+        with patch.object(qmd, "is_available", return_value=True), \
+             patch.object(qmd, "_run", side_effect=run) as mock_run:
+            assert qmd.ensure_collection(tmp_path, "s1")
+            assert qmd.ensure_collection(tmp_path, "s1")
+
+        calls = [c[0][0] for c in mock_run.call_args_list]
+        assert calls.count(["update", "-c", "vcc-s1"]) == 1
+        assert calls[-1] == ["update"]
 
     def test_creates_new_collection(self, tmp_path: Path) -> None:
         show_fail = MagicMock(returncode=1)
@@ -473,3 +506,171 @@ class TestListVccCollections:
         with patch.object(qmd, "is_available", return_value=True), \
              patch.object(Path, "home", return_value=tmp_path):
             assert qmd.list_vcc_collections() == []
+
+
+# ---------------------------------------------------------------------------
+# Collection registry cache
+# ---------------------------------------------------------------------------
+
+class TestRegistry:
+    @pytest.fixture
+    def config(self, tmp_path: Path, monkeypatch):
+        import yaml
+
+        config_path = tmp_path / ".config" / "qmd" / "index.yml"
+        config_path.parent.mkdir(parents=True)
+        config_path.write_text(yaml.dump({"collections": {"vault": {"path": "/vault"}}}))
+        monkeypatch.setattr(Path, "home", lambda: tmp_path)
+        monkeypatch.setattr(qmd, "is_available", lambda: True)
+        return config_path
+
+    def test_parsed_once_until_changed(self, config: Path) -> None:
+        import yaml
+
+        with patch.object(yaml, "load", wraps=yaml.load) as mock_load:
+            assert qmd.list_vcc_collections() == []
+            assert qmd.list_vcc_collections() == []
+            assert mock_load.call_count == 1
+
+            config.write_text(yaml.dump({"collections": {"vcc-new": {"path": "/a"}}}))
+            assert qmd.list_vcc_collections() == ["vcc-new"]
+            assert mock_load.call_count == 2
+
+    def test_patches_written_atomically(self, config: Path) -> None:
+        import yaml
+
+        qmd._patch_collection_pattern("vcc-a", "/a")
+        qmd._patch_collection_pattern("vcc-b", "/b")
+
+        data = yaml.safe_load(config.read_text())
+        assert list(data["collections"]) == ["vault", "vcc-a", "vcc-b"]
+        assert data["collections"]["vcc-b"]["path"] == "/b"
+        assert [p.name for p in config.parent.iterdir() if p.suffix == ".tmp"] == []
+        assert sorted(qmd.list_vcc_collections()) == ["vcc-a", "vcc-b"]
+
+    def test_unchanged_patch_skips_rewrite(self, config: Path) -> None:
+        qmd._patch_collection_pattern("vcc-a", "/a")
+        before = config.stat().st_mtime_ns
+        with patch.object(Path, "replace") as mock_replace:
+            qmd._patch_collection_pattern("vcc-a", "/a")
+        mock_replace.assert_not_called()
+        assert config.stat().st_mtime_ns == before
+
+    def test_registered_collection_skips_show(self, config: Path, tmp_path: Path) -> None:
+        qmd._patch_collection_pattern("vcc-s1", str(tmp_path.resolve()))
+        with patch.object(qmd, "_run") as mock_run:
+            mock_run.return_value = MagicMock(returncode=0)
+            assert qmd.ensure_collection(tmp_path, "s1")
+        assert [c[0][0] for c in mock_run.call_args_list] == [["update", "-c", "vcc-s1"]]
+
+
+# ---------------------------------------------------------------------------
+# Persistent worker (fake ``qmd mcp`` server)
+# ---------------------------------------------------------------------------
+
+_FAKE_QMD = """\
+import json, os, sys
+
+log = os.environ["FAKE_QMD_LOG"]
+tools = os.environ.get("FAKE_QMD_TOOLS", "query,get").split(",")
+with open(log, "a") as fh:
+    fh.write(" ".join(sys.argv[1:]) + "\\n")
+if sys.argv[1:] != ["mcp"]:
+    print("[]")
+    sys.exit(0)
+
+schemas = {
+    "query": {"query": {}, "limit": {}, "collection": {}},
+    "search": {"query": {}, "limit": {}, "collection": {}},
+    "get": {"file": {}, "lineNumbers": {}},
+}
+for line in sys.stdin:
+    msg = json.loads(line)
+    if "id" not in msg:
+        continue
+    method, params = msg["method"], msg.get("params", {})
+    if method == "initialize":
+        result = {"protocolVersion": "2024-11-05", "capabilities": {"tools": {}}}
+    elif method == "tools/list":
+        result = {"tools": [
+            {"name": t, "inputSchema": {"properties": schemas[t]}} for t in tools
+        ]}
+    else:
+        args = params["arguments"]
+        if params["name"] == "get":
+            result = {"content": [{"type": "text", "text": "doc " + args["file"]}]}
+        else:
+            hit = {"docid": "#1", "file": "qmd://" + args["collection"] + "/cycle_1.txt",
+                   "score": 0.5, "snippet": args["query"], "title": "", "context": ""}
+            result = {"content": [{"type": "text", "text": "1 result"}],
+                      "structuredContent": {"results": [hit]}}
+    print(json.dumps({"jsonrpc": "2.0", "id": msg["id"], "result": result}), flush=True)
+"""
+
+
+@pytest.fixture
+def fake_qmd(tmp_path: Path, monkeypatch):
+    """Install a fake qmd binary and route through the real worker."""
+    import sys
+
+    script = tmp_path / "qmd"
+    script.write_text(f"#!{sys.executable}\n" + _FAKE_QMD)
+    script.chmod(0o755)
+    log = tmp_path / "qmd.log"
+    monkeypatch.setenv("FAKE_QMD_LOG", str(log))
+    monkeypatch.setattr(qmd, "_QMD_BIN", str(script))
+    monkeypatch.setattr(qmd, "_worker", _real_worker)
+    monkeypatch.setenv("HERMES_VCC_QMD_MCP", "1")
+
+    def calls() -> list[str]:
+        return log.read_text().splitlines() if log.exists() else []
+
+    return calls
+
+
+class TestWorker:
+    def test_cli_by_default(self, fake_qmd, monkeypatch) -> None:
+        monkeypatch.delenv("HERMES_VCC_QMD_MCP")
+        qmd.search("x", session_id="s1")
+        assert qmd.get_document("#abc") == "[]\n"  # the fake CLI's output
+        assert fake_qmd() == ["query x --json -n 20 -c vcc-s1", "get #abc --line-numbers"]
+
+    def test_search_reuses_one_worker(self, fake_qmd) -> None:
+        first = qmd.search("nginx", session_id="s1")
+        second = qmd.search("proxy", session_id="s1")
+
+        assert first[0]["snippet"] == "nginx"
+        assert first[0]["file"] == "qmd://vcc-s1/cycle_1.txt"
+        assert second[0]["snippet"] == "proxy"
+        assert fake_qmd() == ["mcp"]
+
+    def test_get_document_via_worker(self, fake_qmd) -> None:
+        assert qmd.get_document("#abc") == "doc #abc"
+        assert fake_qmd() == ["mcp"]
+
+    def test_restarts_dead_worker(self, fake_qmd) -> None:
+        qmd.search("a", session_id="s1")
+        qmd._WORKER._proc.kill()
+        qmd._WORKER._proc.wait()
+        assert qmd.search("b", session_id="s1")[0]["snippet"] == "b"
+        assert fake_qmd() == ["mcp", "mcp"]
+
+    def test_missing_tool_falls_back_to_cli(self, fake_qmd, monkeypatch) -> None:
+        monkeypatch.setenv("FAKE_QMD_TOOLS", "get")
+        assert qmd.search("x", session_id="s1") == []
+        assert fake_qmd()[-1].startswith("query x --json")
+
+    def test_all_collections_use_cli(self, fake_qmd) -> None:
+        with patch.object(qmd, "list_vcc_collections", return_value=["vcc-a", "vcc-b"]):
+            qmd.search("x")
+        assert fake_qmd() == ["query x --json -n 20 -c vcc-a -c vcc-b"]
+
+    def test_start_failure_falls_back_to_cli(self, fake_qmd, monkeypatch) -> None:
+        def broken(binary):
+            raise OSError("no mcp")
+
+        monkeypatch.setattr(qmd, "_QmdWorker", broken)
+        for _ in range(qmd._MAX_WORKER_FAILURES + 1):
+            assert qmd.search("x", session_id="s1") == []
+        assert qmd._WORKER_FAILURES == qmd._MAX_WORKER_FAILURES
+        assert len(fake_qmd()) == qmd._MAX_WORKER_FAILURES + 1
@@ -0,0 +1,176 @@
+"""Tests for hermes_vcc.recall_global — cross-session recall."""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from hermes_vcc import recall_global
+from hermes_vcc.archive import archive_before_compression
+from hermes_vcc.recall import recall_search
+from hermes_vcc.recall_global import GLOBAL_INDEX, refresh, search_all, update_session
+from hermes_vcc.recall_index import update_index
+from hermes_vcc.store import gc_store, write_cycle
+
+
+def _user(text: str) -> dict:
+    return {"type": "user", "message": {"content": text}}
+
+
+def _archive(archive_dir: Path, session_id: str, *cycles: list[dict]) -> Path:
+    session_dir = archive_dir / session_id
+    session_dir.mkdir(parents=True, exist_ok=True)
+    for n, records in enumerate(cycles, start=1):
+        write_cycle(session_dir, n, records)
+        update_index(session_dir)
+        update_session(archive_dir, session_dir)
+    return session_dir
+
+
+def _global(archive_dir: Path) -> dict:
+    return json.loads((archive_dir / GLOBAL_INDEX).read_text())
+
+
+# ---------------------------------------------------------------------------
+# Global index maintenance
+# ---------------------------------------------------------------------------
+
+
+class TestGlobalIndex:
+    def test_updated_per_cycle(self, tmp_path):
+        _archive(tmp_path, "a", [_user("alpha")], [_user("alpha"), _user("beta alpha")])
+        data = _global(tmp_path)
+        assert data["sessions"]["a"]["n_docs"] == 2
+        assert data["terms"]["alpha"] == {"a": 2}
+        assert data["terms"]["beta"] == {"a": 1}
+
+    def test_written_at_archive_time(self, basic_conversation, archive_dir, vcc_py_path):
+        archive_before_compression(basic_conversation, "s1", archive_dir, 1)
+        assert "s1" in _global(archive_dir)["sessions"]
+
+    def test_rebuilt_session_replaced(self, tmp_path):
+        session_dir = _archive(tmp_path, "a", [_user("old")], [_user("new")])
+        (session_dir / "cycle_1.refs.json").unlink()
+        gc_store(session_dir)
+        data = refresh(tmp_path)
+        assert "old" not in data["terms"]
+        assert data["terms"]["new"] == {"a": 1}
+        assert data["sessions"]["a"]["n_docs"] == 1
+
+    def test_refresh_adds_and_drops_sessions(self, tmp_path):
+        session_dir = tmp_path / "late"
+        session_dir.mkdir()
+        write_cycle(session_dir, 1, [_user("unindexed")])
+        _archive(tmp_path, "gone", [_user("bye")])
+        for path in (tmp_path / "gone").rglob("*"):
+            if path.is_file():
+                path.unlink()
+
+        data = refresh(tmp_path)
+        assert set(data["sessions"]) == {"late"}
+        assert "bye" not in data["terms"]
+
+
+# ---------------------------------------------------------------------------
+# search_all
+# ---------------------------------------------------------------------------
+
+
+class TestSearchAll:
+    def test_finds_across_sessions(self, tmp_path):
+        _archive(tmp_path, "a", [_user("we decided to use postgres"), _user("lunch")])
+        _archive(tmp_path, "b", [_user("postgres migration done")])
+        _archive(tmp_path, "c", [_user("unrelated")])
+        results = search_all("postgres", tmp_path, jobs=1)
+        assert sorted(r["session_id"] for r in results) == ["a", "b"]
+        assert all("postgres" in r["preview"] for r in results)
+
+    def test_scores_use_archive_wide_statistics(self, tmp_path):
+        # "deploy" is common in a, rare overall; per-session idf would differ.
+        _archive(tmp_path, "a", [_user(f"deploy step {i}") for i in range(5)])
+        _archive(tmp_path, "b", [_user("deploy once")] + [_user(f"x{i}") for i in range(20)])
+        results = search_all("deploy", tmp_path, max_results=10, jobs=1)
+        score = {r["session_id"]: r["score"] for r in results}
+        per_session_a = recall_search("deploy", "a", tmp_path)[0]["score"]
+        assert score["a"] > 0.5 * score["b"]
+        assert per_session_a < 0.1 * score["b"]
+
+    def test_top_k_merged(self, tmp_path):
+        for n in range(5):
+            _archive(tmp_path, f"s{n}", [_user(f"needle {'pad ' * n}")])
+        results = search_all("needle", tmp_path, max_results=3, jobs=1)
+        assert [r["session_id"] for r in results] == ["s0", "s1", "s2"]
+
+    def test_regex_query_scans_sessions(self, tmp_path):
+        _archive(tmp_path, "a", [_user("error code 42")])
+        _archive(tmp_path, "b", [_user("error code 7")])
+        results = search_all(r"code \d{2}", tmp_path, jobs=1)
+        assert [r["session_id"] for r in results] == ["a"]
+
+    def test_query_does_not_refresh(self, tmp_path, monkeypatch):
+        _archive(tmp_path, "a", [_user("needle")])
+        monkeypatch.setattr(recall_global, "refresh", None)
+        [result] = search_all("needle", tmp_path)
+        assert result["session_id"] == "a"
+
+    def test_global_index_built_when_missing(self, tmp_path):
+        session_dir = tmp_path / "a"
+        session_dir.mkdir()
+        write_cycle(session_dir, 1, [_user("needle")])
+        [result] = search_all("needle", tmp_path)
+        assert result["session_id"] == "a"
+        assert "a" in _global(tmp_path)["sessions"]
+
+    def test_deleted_session_skipped(self, tmp_path):
+        _archive(tmp_path, "a", [_user("needle")])
+        _archive(tmp_path, "b", [_user("needle")])
+        for path in sorted((tmp_path / "b").rglob("*"), reverse=True):
+            path.rmdir() if path.is_dir() else path.unlink()
+        (tmp_path / "b").rmdir()
+        assert [r["session_id"] for r in search_all("needle", tmp_path)] == ["a"]
+
+    def test_small_search_stays_serial(self, tmp_path, monkeypatch):
+        for n in range(4):
+            _archive(tmp_path, f"s{n}", [_user(f"shared term {n}")])
+        monkeypatch.setattr(recall_global, "_pool", None)
+        assert len(search_all("shared term", tmp_path, jobs=8)) == 4
+
+    def test_legacy_sessions_scanned(self, tmp_path):
+        legacy = tmp_path / "legacy"
+        legacy.mkdir()
+        (legacy / "cycle_1.jsonl").write_text('{"role": "user", "content": "legacy needle"}\n')
+        [result] = search_all("needle", tmp_path, jobs=1)
+        assert result["session_id"] == "legacy"
+
+    def test_process_pool_matches_serial(self, tmp_path, monkeypatch):
+        for n in range(4):
+            _archive(tmp_path, f"s{n}", [_user(f"shared term {n}"), _user("other")])
+        serial = search_all("shared term", tmp_path, jobs=1)
+        monkeypatch.setattr(recall_global, "_MIN_PARALLEL", 2)
+        assert search_all("shared term", tmp_path, jobs=2) == serial
+
+    def test_process_pool_shut_down_after_search(self, tmp_path, monkeypatch):
+        for n in range(4):
+            _archive(tmp_path, f"s{n}", [_user(f"shared term {n}")])
+        pools = []
+        real_pool = recall_global._pool
+
+        def make_pool(workers):
+            pools.append((workers, real_pool(workers)))
+            return pools[-1][1]
+
+        monkeypatch.setattr(recall_global, "_pool", make_pool)
+        monkeypatch.setattr(recall_global, "_MIN_PARALLEL", 2)
+        assert search_all("shared term", tmp_path, jobs=8)
+        [(workers, pool)] = pools
+        assert workers == 4
+        with pytest.raises(RuntimeError):  # shut down
+            pool.submit(int)
+
+    def test_missing_archive_dir(self, tmp_path):
+        assert search_all("x", tmp_path / "nope") == []
+
+    def test_recall_search_without_session(self, tmp_path):
+        _archive(tmp_path, "a", [_user("needle")])
+        [result] = recall_search("needle", None, tmp_path)
+        assert result["session_id"] == "a"
@@ -0,0 +1,236 @@
+"""Tests for hermes_vcc.recall_index — persistent token index for recall."""
+
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from hermes_vcc import recall_index
+from hermes_vcc.archive import archive_before_compression
+from hermes_vcc.recall import recall_search
+from hermes_vcc.recall_index import (
+    query_requirement,
+    query_terms,
+    rank,
+    shortlist,
+    tokenize,
+    update_index,
+    words_requirement,
+)
+from hermes_vcc.store import gc_store, write_cycle
+
+
+def _user(text: str) -> dict:
+    return {"type": "user", "message": {"content": text}}
+
+
+def _assistant(text: str, *tools: str) -> dict:
+    content = [{"type": "text", "text": text}] if text else []
+    content += [{"type": "tool_use", "name": t, "id": f"tc_{t}", "input": {}} for t in tools]
+    return {"type": "assistant", "message": {"content": content}}
+
+
+def _session(tmp_path: Path, *cycles: list[dict]) -> Path:
+    session_dir = tmp_path / "archives" / "s"
+    session_dir.mkdir(parents=True)
+    for n, records in enumerate(cycles, start=1):
+        write_cycle(session_dir, n, records)
+    return session_dir
+
+
+# ---------------------------------------------------------------------------
+# Query analysis
+# ---------------------------------------------------------------------------
+
+
+class TestQueryRequirement:
+    def test_plain_literal(self):
+        assert query_requirement("Foo") == ("lit", "foo")
+
+    def test_literal_split_into_word_runs(self):
+        assert query_requirement("path/to") == ("and", [("lit", "path"), ("lit", "to")])
+
+    def test_alternation(self):
+        assert query_requirement("alpha|beta") == ("or", [("lit", "alpha"), ("lit", "beta")])
+
+    @pytest.mark.parametrize("pattern", [".*", "[ab]", "x*", "ünï", "a|.*"])
+    def test_unconstrained(self, pattern):
+        assert query_requirement(pattern) is None
+
+    def test_optional_suffix_dropped(self):
+        assert query_requirement("foo?") == ("lit", "fo")
+
+    def test_repeat_keeps_required_body(self):
+        assert query_requirement("(ab)+c") == ("and", [("lit", "ab"), ("lit", "c")])
+
+    def test_words(self):
+        assert words_requirement(["Foo", "bar"]) == ("or", [("lit", "foo"), ("lit", "bar")])
+        assert words_requirement(["foo", "??"]) is None
+
+    def test_tokenize_folds_long_tokens(self):
+        assert tokenize("Hello hello " + "x" * 100) == {"hello", recall_index._LONG}
+
+
+# ---------------------------------------------------------------------------
+# Index maintenance and shortlists
+# ---------------------------------------------------------------------------
+
+
+class TestShortlist:
+    def test_shortlist_narrows_candidates(self, tmp_path):
+        session_dir = _session(tmp_path, [_user(f"note {i}") for i in range(50)] + [_user("needle")])
+        docs = shortlist(session_dir, query_requirement("needle"))
+        assert len(docs) == 1
+        [(_, record)] = list(recall_index.read_records(session_dir, docs))
+        assert record["message"]["content"] == "needle"
+
+    def test_substring_of_token_is_found(self, tmp_path):
+        session_dir = _session(tmp_path, [_user("haystack"), _user("other")])
+        assert len(shortlist(session_dir, query_requirement("ysta"))) == 1
+
+    def test_incremental_segments(self, tmp_path):
+        session_dir = _session(tmp_path, [_user("first")])
+        assert update_index(session_dir) == 1
+        write_cycle(session_dir, 2, [_user("first"), _user("second")])
+        assert update_index(session_dir) == 1
+        assert update_index(session_dir) == 0
+        assert len(shortlist(session_dir, None)) == 2
+
+    def test_segments_are_merged(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(recall_index, "_MAX_SEGMENTS", 2)
+        session_dir = _session(tmp_path)
+        records = []
+        for n in range(1, 6):
+            records.append(_user(f"word{n}"))
+            write_cycle(session_dir, n, records)
+            update_index(session_dir)
+        assert len(list((session_dir / "recall_index").glob("seg_*.bin"))) <= 2
+        assert len(shortlist(session_dir, query_requirement("word3"))) == 1
+
+    def test_concurrent_updates_index_once(self, tmp_path, monkeypatch):
+        session_dir = _session(tmp_path, [_user("alpha"), _user("beta")])
+        real_write = recall_index._write_segment
+
+        def slow_write(*args):  # widen the read-meta -> write-meta window
+            time.sleep(0.05)
+            real_write(*args)
+
+        monkeypatch.setattr(recall_index, "_write_segment", slow_write)
+        added = []
+        threads = [threading.Thread(target=lambda: added.append(update_index(session_dir))) for _ in range(4)]
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join()
+        assert sorted(added) == [0, 0, 0, 2]
+        assert recall_index.index_state(session_dir)["n_docs"] == 2
+        assert not list((session_dir / "recall_index").glob("*.tmp"))
+
+    def test_rebuilt_after_gc(self, tmp_path):
+        session_dir = _session(tmp_path, [_user("old")], [_user("new")])
+        update_index(session_dir)
+        (session_dir / "cycle_1.refs.json").unlink()
+        gc_store(session_dir)
+        docs = shortlist(session_dir, query_requirement("new"))
+        [(_, record)] = list(recall_index.read_records(session_dir, docs))
+        assert record["message"]["content"] == "new"
+
+    def test_legacy_session_has_no_shortlist(self, tmp_path):
+        assert shortlist(tmp_path, None) is None
+
+
+# ---------------------------------------------------------------------------
+# recall_search over indexed archives
+# ---------------------------------------------------------------------------
+
+
+class TestIndexedRecall:
+    def test_index_written_at_archive_time(self, basic_conversation, archive_dir, vcc_py_path):
+        session_dir = archive_before_compression(basic_conversation, "idx", archive_dir, 1)
+        assert (session_dir / "recall_index" / "meta.json").exists()
+
+    def test_regex_results_per_cycle_occurrence(self, tmp_path):
+        records = [_user("alpha"), _user("needle here")]
+        session_dir = _session(tmp_path, records, records + [_user("needle again")])
+        results = recall_search("need(le)", "s", session_dir.parent, max_results=10)
+        assert [(r["cycle"], r["line"]) for r in results] == [(2, 2), (2, 3), (1, 2)]
+
+    def test_mixed_legacy_and_stored_cycles(self, tmp_path):
+        session_dir = _session(tmp_path, [_user("stored needle")])
+        (session_dir / "cycle_2.jsonl").write_text('{"role": "user", "content": "legacy needle"}\n')
+        results = recall_search("needle", "s", session_dir.parent)
+        assert sorted(r["preview"] for r in results) == ["legacy needle", "stored needle"]
+
+
+# ---------------------------------------------------------------------------
+# BM25F ranking
+# ---------------------------------------------------------------------------
+
+
+class TestRank:
+    def test_query_terms(self):
+        assert query_terms("Deploy the deploy SCRIPT!") == ["deploy", "the", "script"]
+
+    def test_rare_dense_term_ranks_first(self, tmp_path):
+        filler = [_user(f"routine update number {i}") for i in range(20)]
+        session_dir = _session(tmp_path, filler + [
+            _user("update the kernel"),
+            _user("kernel kernel panic in the kernel"),
+        ])
+        docs = [doc for _, doc in rank(session_dir, ["kernel", "update"])]
+        texts = [r["message"]["content"] for _, r in recall_index.read_records(session_dir, docs)]
+        assert texts[:2] == ["kernel kernel panic in the kernel", "update the kernel"]
+        assert len(texts) == 22
+
+    def test_scores_descend(self, tmp_path):
+        session_dir = _session(tmp_path, [_user("a " * n + "b") for n in range(1, 30)])
+        scores = [score for score, _ in rank(session_dir, ["a", "b"])]
+        assert scores == sorted(scores, reverse=True)
+
+    def test_legacy_session_has_no_ranking(self, tmp_path):
+        assert rank(tmp_path, ["x"]) is None
+
+
+class TestBM25Recall:
+    def test_default_backend_ranks_records(self, tmp_path):
+        session_dir = _session(tmp_path, [
+            _user("the build is green"),
+            _user("the flaky build failed again, build logs attached"),
+            _user("lunch?"),
+        ])
+        results = recall_search("build failed", "s", session_dir.parent)
+        assert [r["line"] for r in results] == [2, 1]
+        assert results[0]["score"] > results[1]["score"]
+
+    def test_each_record_reported_at_latest_cycle(self, tmp_path):
+        records = [_user("alpha"), _user("needle here")]
+        session_dir = _session(tmp_path, records, records + [_user("needle again")])
+        results = recall_search("needle", "s", session_dir.parent, max_results=10)
+        assert sorted((r["cycle"], r["line"]) for r in results) == [(2, 2), (2, 3)]
+
+    def test_tool_name_field(self, tmp_path):
+        session_dir = _session(tmp_path, [
+            _user("please read the file"),
+            _assistant("", "read_file"),
+        ])
+        [result] = recall_search("read_file", "s", session_dir.parent)
+        assert result["role"] == "assistant"
+        assert result["preview"] == "tool_use: read_file"
+
+    def test_top_k(self, tmp_path):
+        session_dir = _session(tmp_path, [_user(f"match {i}") for i in range(50)])
+        assert len(recall_search("match", "s", session_dir.parent, max_results=5)) == 5
+
+    def test_partial_word_falls_back_to_regex(self, tmp_path):
+        session_dir = _session(tmp_path, [_user("haystack"), _user("other")])
+        [result] = recall_search("ysta", "s", session_dir.parent)
+        assert result["preview"] == "haystack"
+        assert result["score"] == 1.0
+
+    def test_old_index_version_rebuilt(self, tmp_path):
+        session_dir = _session(tmp_path, [_user("needle")])
+        update_index(session_dir)
+        meta = session_dir / "recall_index" / "meta.json"
+        meta.write_text(meta.read_text().replace('"version":2', '"version":1'))
+        assert len(recall_search("needle", "s", session_dir.parent)) == 1
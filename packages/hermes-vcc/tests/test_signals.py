@@ -0,0 +1,164 @@
+"""Tests for hermes_vcc.signals"""
+
+import json
+
+import pytest
+from hermes_vcc.compaction import (
+    build_brief_transcript,
+    build_outstanding_context,
+    format_compaction,
+)
+from hermes_vcc.extract import extract_file_ops, extract_goals, extract_preferences
+from hermes_vcc.filter_noise import filter_noise
+from hermes_vcc.signals import SignalExtractor, extract_signals, to_normalized_blocks
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def user(text):
+    return {"role": "user", "content": text}
+
+def assistant(text, *calls):
+    msg = {"role": "assistant", "content": text}
+    if calls:
+        msg["tool_calls"] = [
+            {"id": f"c{i}", "type": "function",
+             "function": {"name": name, "arguments": json.dumps(args)}}
+            for i, (name, args) in enumerate(calls)
+        ]
+    return msg
+
+def tool(text, is_error=False):
+    return {"role": "tool", "tool_call_id": "c0", "content": text, "is_error": is_error}
+
+
+def separate_passes(messages):
+    """The unfused pipeline the extractor replaces."""
+    blocks = filter_noise(to_normalized_blocks(messages))
+    file_ops = extract_file_ops(blocks)
+    return format_compaction(
+        extract_goals(blocks),
+        {k: sorted(v) for k, v in file_ops.items()},
+        build_outstanding_context(blocks),
+        extract_preferences(blocks),
+        build_brief_transcript(blocks),
+    )
+
+
+def fused(signals):
+    signals.file_ops = {k: sorted(v) for k, v in signals.file_ops.items()}
+    return signals.format()
+
+
+CONVERSATION = [
+    {"role": "system", "content": "You are helpful."},
+    user("Implement the config loader for the CLI\nI prefer tabs over spaces"),
+    assistant("Note that the loader is currently blocked on the schema.",
+              ("read_file", {"path": "cli/config.py"}),
+              ("memory", {"action": "add"})),
+    tool("def load(): ..."),
+    user("<system-reminder>injected</system-reminder>"),
+    user("Continue from where you left off."),
+    assistant("", ("patch", {"path": "cli/config.py", "old": "a", "new": "b"})),
+    tool("Error: patch failed", is_error=True),
+    user("Actually, switch to the YAML parser instead\nalways keep comments"),
+    assistant("Done.", ("create_file", {"path": "cli/yaml.py"})),
+    tool("ok"),
+]
+
+
+# ---------------------------------------------------------------------------
+# extract_signals
+# ---------------------------------------------------------------------------
+
+def test_matches_separate_passes():
+    assert fused(extract_signals(CONVERSATION)) == separate_passes(CONVERSATION)
+
+
+@pytest.mark.parametrize("fixture", [
+    "basic_conversation", "tool_heavy_session", "thinking_session",
+    "compressed_session", "multi_tool_message",
+])
+def test_matches_separate_passes_on_fixtures(fixture, request):
+    messages = request.getfixturevalue(fixture)
+    assert fused(extract_signals(messages)) == separate_passes(messages)
+
+
+def test_signals():
+    signals = extract_signals(CONVERSATION)
+    assert signals.goals == [
+        "Implement the config loader for the CLI",
+        "I prefer tabs over spaces",
+        "[Scope change]",
+        "Actually, switch to the YAML parser instead",
+        "always keep comments",
+    ]
+    assert signals.preferences == ["I prefer tabs over spaces", "always keep comments"]
+    assert signals.file_ops == {
+        "read_files": ["cli/config.py"],
+        "modified_files": ["cli/config.py"],
+        "created_files": ["cli/yaml.py"],
+    }
+    assert signals.outstanding == ["Note that the loader is currently blocked on the schema."]
+
+
+def test_noise_dropped_from_brief():
+    brief = extract_signals(CONVERSATION).brief
+    assert "injected" not in brief
+    assert "Continue from" not in brief
+    assert "memory(" not in brief
+    assert "patch(path=" in brief and "(#2)" in brief
+    assert "  -> ERR: Error: patch failed (#2)" in brief
+
+
+def test_file_ops_in_first_seen_order():
+    messages = [assistant("", *(("read_file", {"path": p}) for p in "cab"))]
+    assert extract_signals(messages).file_ops["read_files"] == ["c", "a", "b"]
+
+
+def test_empty():
+    assert extract_signals([]).format() == ""
+
+
+# ---------------------------------------------------------------------------
+# SignalExtractor
+# ---------------------------------------------------------------------------
+
+def test_extractor_matches_extract_signals():
+    extractor = SignalExtractor()
+    for n in (3, 7, len(CONVERSATION)):
+        assert extractor.extract(CONVERSATION[:n]) == extract_signals(CONVERSATION[:n])
+
+
+def test_extractor_only_analyses_new_messages():
+    extractor = SignalExtractor()
+    extractor.extract(CONVERSATION[:6])
+    assert (extractor.hits, extractor.misses) == (0, 6)
+
+    extractor.extract([dict(m) for m in CONVERSATION])
+    assert (extractor.hits, extractor.misses) == (6, 11)
+
+
+def test_extractor_forgets_dropped_messages():
+    extractor = SignalExtractor()
+    extractor.extract(CONVERSATION)
+    extractor.extract(CONVERSATION[-2:])
+    misses = extractor.misses
+    extractor.extract(CONVERSATION[:2])
+    assert extractor.misses == misses + 2
+
+
+def test_extractor_changed_message_reanalysed():
+    extractor = SignalExtractor()
+    extractor.extract([user("fix the build please")])
+    signals = extractor.extract([user("I always prefer short names")])
+    assert signals.preferences == ["I always prefer short names"]
+
+
+def test_extractor_unhashable_content():
+    extractor = SignalExtractor()
+    messages = [tool([{"type": "text", "text": "ok"}])] * 2
+    assert extractor.extract(messages) == extract_signals(messages)
+    assert (extractor.hits, extractor.misses) == (0, 2)
@@ -0,0 +1,181 @@
+"""Tests for hermes_vcc.store — content-addressed record store."""
+
+import json
+from pathlib import Path
+
+from hermes_vcc.adapter import convert_conversation, records_to_jsonl
+from hermes_vcc.store import (
+    gc_store,
+    list_cycles,
+    main,
+    materialize_cycle,
+    migrate_archive_dir,
+    migrate_session,
+    read_cycle_jsonl,
+    write_cycle,
+)
+
+
+def _pack(session_dir):
+    return session_dir / "store" / "records.jsonl"
+
+
+# ---------------------------------------------------------------------------
+# write / read round-trip
+# ---------------------------------------------------------------------------
+
+
+class TestRoundTrip:
+    def test_reconstructs_byte_identical(self, tool_heavy_session, tmp_path):
+        records = convert_conversation(tool_heavy_session)
+        write_cycle(tmp_path, 1, records)
+        assert read_cycle_jsonl(tmp_path, 1) == records_to_jsonl(records)
+
+    def test_unicode_and_empty(self, tmp_path):
+        records = [{"type": "user", "message": {"content": "ünïcode ☃"}}]
+        write_cycle(tmp_path, 1, records)
+        write_cycle(tmp_path, 2, [])
+        assert read_cycle_jsonl(tmp_path, 1) == records_to_jsonl(records)
+        assert read_cycle_jsonl(tmp_path, 2) == ""
+        assert read_cycle_jsonl(tmp_path, 3) is None
+
+    def test_streamed_records_and_stats(self, tool_heavy_session, tmp_path):
+        records = convert_conversation(tool_heavy_session)
+        records.append({"type": "assistant", "message": {"id": "ïd", "content": []}})
+        stats: dict = {}
+        write_cycle(tmp_path, 1, (r for r in records), stats=stats)
+        expected = records_to_jsonl(records)
+        assert read_cycle_jsonl(tmp_path, 1) == expected
+        assert stats == {"chars": len(expected), "bytes": len(expected.encode("utf-8"))}
+
+    def test_materialize_cycle(self, basic_conversation, tmp_path):
+        records = convert_conversation(basic_conversation)
+        write_cycle(tmp_path, 1, records)
+        path = materialize_cycle(tmp_path, 1)
+        assert path == tmp_path / "cycle_1.jsonl"
+        assert path.read_text(encoding="utf-8") == records_to_jsonl(records)
+
+
+# ---------------------------------------------------------------------------
+# Deduplication
+# ---------------------------------------------------------------------------
+
+
+class TestDedup:
+    def test_repeated_cycles_store_records_once(self, tool_heavy_session, tmp_path):
+        write_cycle(tmp_path, 1, convert_conversation(tool_heavy_session))
+        size = _pack(tmp_path).stat().st_size
+        written = write_cycle(tmp_path, 2, convert_conversation(tool_heavy_session))
+        assert _pack(tmp_path).stat().st_size == size
+        assert written < size
+
+    def test_grown_conversation_appends_tail_only(self, tool_heavy_session, tmp_path):
+        half = len(tool_heavy_session) // 2
+        write_cycle(tmp_path, 1, convert_conversation(tool_heavy_session[:half]))
+        size = _pack(tmp_path).stat().st_size
+        records = convert_conversation(tool_heavy_session)
+        write_cycle(tmp_path, 2, records)
+        tail = records_to_jsonl(convert_conversation(tool_heavy_session[half:]))
+        assert _pack(tmp_path).stat().st_size - size < len(tail.encode()) * 2
+        assert read_cycle_jsonl(tmp_path, 2) == records_to_jsonl(records)
+
+
+# ---------------------------------------------------------------------------
+# Garbage collection and recovery
+# ---------------------------------------------------------------------------
+
+
+class TestMaintenance:
+    def test_gc_drops_unreferenced(self, tmp_path):
+        write_cycle(tmp_path, 1, [{"type": "user", "message": {"content": "old"}}])
+        write_cycle(tmp_path, 2, [{"type": "user", "message": {"content": "new"}}])
+        (tmp_path / "cycle_1.refs.json").unlink()
+        assert gc_store(tmp_path) > 0
+        assert b"old" not in _pack(tmp_path).read_bytes()
+        assert "new" in read_cycle_jsonl(tmp_path, 2)
+        assert gc_store(tmp_path) == 0
+
+    def test_stale_index_is_rebuilt(self, tmp_path):
+        records = [{"type": "user", "message": {"content": f"m{i}"}} for i in range(3)]
+        write_cycle(tmp_path, 1, records)
+        (tmp_path / "store" / "records.idx").write_text("garbage\n")
+        assert read_cycle_jsonl(tmp_path, 1) == records_to_jsonl(records)
+
+    def test_pack_never_read_whole(self, tmp_path, monkeypatch):
+        write_cycle(tmp_path, 1, [{"type": "user", "message": {"content": "old"}}])
+        records = [{"type": "user", "message": {"content": f"m{i}"}} for i in range(3)]
+        write_cycle(tmp_path, 2, records)
+        (tmp_path / "cycle_1.refs.json").unlink()
+
+        def read_bytes(self):
+            raise AssertionError(f"read whole {self}")
+
+        monkeypatch.setattr(Path, "read_bytes", read_bytes)
+        assert read_cycle_jsonl(tmp_path, 2) == records_to_jsonl(records)
+        assert gc_store(tmp_path) > 0
+        (tmp_path / "store" / "records.idx").unlink()
+        assert read_cycle_jsonl(tmp_path, 2) == records_to_jsonl(records)
+
+    def test_shifted_index_is_rebuilt(self, tmp_path):
+        records = [{"type": "user", "message": {"content": f"m{i}"}} for i in range(3)]
+        write_cycle(tmp_path, 1, records)
+        idx = tmp_path / "store" / "records.idx"
+        lines = idx.read_text().splitlines()
+        idx.write_text("".join(f"{h} {int(off) - 1} {n}\n" for h, off, n in map(str.split, lines)))
+        assert read_cycle_jsonl(tmp_path, 1) == records_to_jsonl(records)
+
+    def test_torn_append_is_skipped(self, tmp_path):
+        write_cycle(tmp_path, 1, [{"type": "user", "message": {"content": "a"}}])
+        with _pack(tmp_path).open("ab") as fh:
+            fh.write(b"0123456789abcdef0123456789abcdef {\"trunc")
+        records = [{"type": "user", "message": {"content": "b"}}]
+        write_cycle(tmp_path, 2, records)
+        (tmp_path / "store" / "records.idx").unlink()
+        assert read_cycle_jsonl(tmp_path, 2) == records_to_jsonl(records)
+
+
+# ---------------------------------------------------------------------------
+# Migration of legacy cycle_N.jsonl archives
+# ---------------------------------------------------------------------------
+
+
+class TestMigration:
+    def test_migrates_and_round_trips(self, tool_heavy_session, tmp_path):
+        session_dir = tmp_path / "s1"
+        session_dir.mkdir()
+        texts = {}
+        for cycle in (1, 2, 3):
+            texts[cycle] = records_to_jsonl(convert_conversation(tool_heavy_session))
+            (session_dir / f"cycle_{cycle}.jsonl").write_text(texts[cycle], encoding="utf-8")
+
+        before, after = migrate_archive_dir(tmp_path)
+
+        assert before == sum(len(t.encode()) for t in texts.values())
+        assert after < before
+        assert not list(session_dir.glob("*.jsonl"))
+        assert list_cycles(session_dir) == [1, 2, 3]
+        for cycle, text in texts.items():
+            assert read_cycle_jsonl(session_dir, cycle) == text
+
+    def test_non_canonical_lines_kept_verbatim(self, tmp_path):
+        # ensure_ascii output and odd spacing are not what the store writes.
+        text = json.dumps({"type": "assistant", "message": {"id": "x", "content": "ü"}}) + "\n"
+        text += '{"role":  "user", "content": "spaced"}\n'
+        (tmp_path / "cycle_1.jsonl").write_text(text, encoding="utf-8")
+        migrate_session(tmp_path)
+        assert read_cycle_jsonl(tmp_path, 1) == text
+
+    def test_keep_jsonl(self, tmp_path):
+        (tmp_path / "cycle_1.jsonl").write_text('{"role": "user", "content": "hi"}\n')
+        migrate_session(tmp_path, keep_jsonl=True)
+        assert (tmp_path / "cycle_1.jsonl").exists()
+        assert (tmp_path / "cycle_1.refs.json").exists()
+
+
+class TestCli:
+    def test_export(self, tmp_path, capsys):
+        records = [{"type": "user", "message": {"content": "hi"}}]
+        write_cycle(tmp_path, 4, records)
+        assert main(["export", str(tmp_path), "4"]) == 0
+        assert capsys.readouterr().out == records_to_jsonl(records)
+        assert main(["export", str(tmp_path), "5"]) == 1
@@ -0,0 +1,66 @@
+"""Tests for hermes_vcc.tokens — pluggable token counting."""
+
+import pytest
+
+from hermes_vcc import tokens
+from hermes_vcc.tokens import count_tokens, get_tokenizer, register_tokenizer
+
+
+@pytest.fixture(autouse=True)
+def _restore_registry():
+    saved = dict(tokens._FACTORIES)
+    yield
+    tokens._FACTORIES.clear()
+    tokens._FACTORIES.update(saved)
+    get_tokenizer.cache_clear()
+
+
+class TestBuiltinTokenizers:
+    def test_vcc_counts_words_digits_and_punctuation(self):
+        assert count_tokens("fix parser.py line 42!", "vcc") == 7
+        assert count_tokens("   \n\t ", "vcc") == 0
+
+    def test_chars(self):
+        assert count_tokens("x" * 41, "chars") == 10
+
+    def test_auto_counts(self):
+        assert count_tokens("hello world", "auto") > 0
+        assert count_tokens("", "auto") == 0
+
+    def test_tiktoken(self):
+        pytest.importorskip("tiktoken")
+        assert count_tokens("hello world", "tiktoken") == 2
+
+    def test_created_once(self):
+        assert get_tokenizer("vcc") is get_tokenizer("vcc")
+
+
+class TestFallback:
+    def test_unknown_name_uses_vcc(self, caplog):
+        assert count_tokens("a b c", "nope") == 3
+        assert "nope" in caplog.text
+
+    def test_failing_factory_uses_vcc(self):
+        def broken():
+            raise ImportError("not installed")
+
+        register_tokenizer("broken", broken)
+        assert count_tokens("a b c", "broken") == 3
+
+    def test_auto_without_tiktoken(self, monkeypatch):
+        def missing(encoding=tokens.DEFAULT_ENCODING):
+            raise ImportError("no tiktoken")
+
+        monkeypatch.setattr(tokens, "_tiktoken", missing)
+        assert count_tokens("a b c", "auto") == 3
+
+
+class TestRegister:
+    def test_custom_tokenizer(self):
+        get_tokenizer("words")
+        register_tokenizer("words", lambda: lambda text: len(text.split()))
+        assert count_tokens("one two three", "words") == 3
+
+    def test_argument_passed_to_factory(self):
+        register_tokenizer("scaled", lambda factor="1": lambda text: len(text) * int(factor))
+        assert count_tokens("ab", "scaled:3") == 6
@@ -0,0 +1,643 @@
+"""Tests for the vendored VCC compiler — golden output and lowering helpers."""
+
+import base64
+import gc
+import hashlib
+import json
+import re
+import shutil
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from hermes_vcc.adapter import convert_conversation, records_to_jsonl
+from hermes_vcc.utils import import_vcc
+
+GOLDEN_DIR = Path(__file__).parent / "fixtures" / "golden"
+
+CONVERSATION_FIXTURES = [
+    "basic_conversation",
+    "tool_heavy_session",
+    "thinking_session",
+    "compressed_session",
+    "multi_tool_message",
+]
+
+
+def _golden_files(name: str) -> dict[str, bytes]:
+    return {p.name: p.read_bytes() for p in sorted((GOLDEN_DIR / name).glob("*.txt"))}
+
+
+def _compiled_files(out_dir: Path) -> dict[str, bytes]:
+    return {p.name: p.read_bytes() for p in sorted(out_dir.glob("*.txt"))}
+
+
+# ---------------------------------------------------------------------------
+# Golden output — .txt / .min.txt / .view.txt must stay byte-identical
+# ---------------------------------------------------------------------------
+
+
+class TestGoldenOutput:
+    @pytest.mark.parametrize("name", CONVERSATION_FIXTURES)
+    def test_conversation_fixture(self, name, fixtures_dir, tmp_path, vcc_py_path):
+        messages = json.loads((fixtures_dir / f"{name}.json").read_text())
+        jsonl_path = tmp_path / f"{name}.jsonl"
+        jsonl_path.write_text(records_to_jsonl(convert_conversation(messages)))
+
+        import_vcc().compile_pass(str(jsonl_path), str(tmp_path / "out"), quiet=True)
+
+        assert _compiled_files(tmp_path / "out") == _golden_files(name)
+
+    def test_mixed_session_with_grep(self, fixtures_dir, tmp_path, vcc_py_path):
+        jsonl_path = tmp_path / "mixed_session.jsonl"
+        shutil.copy(fixtures_dir / "mixed_session.jsonl", jsonl_path)
+
+        import_vcc().compile_pass(
+            str(jsonl_path), str(tmp_path / "out"),
+            grep_pattern=re.compile("foo|error"), quiet=True,
+        )
+
+        assert _compiled_files(tmp_path / "out") == _golden_files("mixed_session")
+
+
+# ---------------------------------------------------------------------------
+# lower_brief section index
+# ---------------------------------------------------------------------------
+
+
+class TestSectionIndex:
+    def test_sec_nodes_groups_by_section(self, vcc_py_path):
+        vcc = import_vcc()
+        ir = [
+            vcc._Node("meta_header", ["[user]", ""], _sec=0),
+            vcc._Node("user", ["hi"], searchable=True, _sec=0, _blk=0),
+            vcc._Node("meta", ["", vcc.SEP]),
+            vcc._Node("meta_header", ["[assistant]", ""], _sec=1),
+        ]
+        nodes = vcc._sec_nodes(ir)
+        assert [o["type"] for o in nodes[0]] == ["meta_header", "user"]
+        assert [o["type"] for o in nodes[1]] == ["meta_header"]
+
+    def test_next_secs_skips_unsectioned_nodes(self, vcc_py_path):
+        vcc = import_vcc()
+        ir = [
+            vcc._Node("meta_header", ["[user]", ""], _sec=0),
+            vcc._Node("meta", ["", vcc.SEP]),
+            vcc._Node("meta_header", ["[assistant]", ""], _sec=1),
+            vcc._Node("meta", [""]),
+        ]
+        assert vcc._next_secs(ir) == [0, 1, 1, None]
+
+    def test_merge_secs_follows_previous_visible(self, vcc_py_path):
+        vcc = import_vcc()
+        roles = {0: "user", 1: "assistant", 2: "tool", 3: "assistant", 4: "assistant"}
+        # Tool section 2 is invisible, so 3 merges into 1 and 4 into 3.
+        assert vcc._merge_secs(roles, {0, 1, 3, 4}) == {3, 4}
+        assert vcc._merge_secs(roles, {0, 3}) == set()
+
+
+# ---------------------------------------------------------------------------
+# lower_view / grep match index
+# ---------------------------------------------------------------------------
+
+
+class TestGrepHits:
+    def test_node_hits_memoized_per_pattern(self, vcc_py_path):
+        vcc = import_vcc()
+        o = vcc._Node("tool_result", ["alpha", "beta", "alphabet"], searchable=True)
+        pattern = re.compile("alpha")
+        assert vcc._node_hits(o, pattern) == [0, 2]
+        o["content"] = ["changed"]  # cached result is reused for the same pattern
+        assert vcc._node_hits(o, pattern) == [0, 2]
+        assert vcc._node_hits(o, re.compile("chan")) == [0]
+
+    def test_node_hits_skips_unsearchable(self, vcc_py_path):
+        vcc = import_vcc()
+        o = vcc._Node("meta", ["alpha"])
+        assert vcc._node_hits(o, re.compile("alpha")) == []
+
+    def test_match_lines_with_precomputed_hits(self, vcc_py_path):
+        vcc = import_vcc()
+        lines = ["a", "b", "ab"]
+        pattern = re.compile("a")
+        assert vcc.match_lines(lines, pattern, "f.txt", 10, hits=[0, 2]) == \
+            vcc.match_lines(lines, pattern, "f.txt", 10)
+
+    def test_separator_hidden_without_earlier_match(self, vcc_py_path):
+        vcc = import_vcc()
+        chain = [
+            {"type": "user", "message": {"content": "nothing here"}},
+            {"type": "user", "message": {"content": "needle"}},
+            {"type": "user", "message": {"content": "needle again"}},
+        ]
+        ir = vcc.parse(chain, ".")
+        vcc.assign_lines(ir)
+        vcc.lower_view(ir, "t.txt", re.compile("needle"))
+        view = vcc.emit(ir, "content_view")
+        assert view.count(vcc.SEP) == 1
+        assert "nothing here" not in "\n".join(view)
+
+
+# ---------------------------------------------------------------------------
+# IR nodes
+# ---------------------------------------------------------------------------
+
+
+class TestNode:
+    def test_dict_style_access(self, vcc_py_path):
+        vcc = import_vcc()
+        o = vcc._Node("tool_result", ["a"], searchable=True, _sec=1)
+        assert o["type"] == "tool_result" and o.get("_sec") == 1
+        assert o.get("start_line") is None and o.get("start_line", 0) == 0
+        assert "content" in o and "content_view" not in o and "other" not in o
+        with pytest.raises(KeyError):
+            o["content_brief"]
+        o["start_line"] = 3
+        assert o.start_line == 3
+
+    def test_lowered_lines_share_content(self, tool_heavy_session, vcc_py_path):
+        vcc = import_vcc()
+        [chain] = vcc.split_chains(vcc.merge_chunks(convert_conversation(tool_heavy_session)))
+        ir = vcc.parse(chain, ".")
+        vcc.assign_lines(ir)
+        vcc.lower_brief(ir, 128, "t.txt")
+        vcc.lower_view(ir, "t.txt", re.compile("."))
+        headers = [o for o in ir if o.type == "meta_header"]
+        assert all(o.content_brief is o.content for o in headers if o.content_brief)
+        assert any(o.content_view is o.content for o in headers)
+        separators = [o for o in ir if vcc.SEP in o.content]
+        assert all(o.content is separators[0].content for o in separators)
+
+    def test_library_compile_leaves_gc_alone(self, fixtures_dir, tmp_path, monkeypatch, vcc_py_path):
+        vcc = import_vcc()
+        jsonl_path = tmp_path / "mixed_session.jsonl"
+        shutil.copy(fixtures_dir / "mixed_session.jsonl", jsonl_path)
+        monkeypatch.setattr(vcc.gc, "disable", lambda: pytest.fail("library call disabled gc"))
+        vcc.compile_pass(str(jsonl_path), str(tmp_path / "out"), quiet=True)
+        vcc.compile_records(vcc.lex(str(jsonl_path)), "mixed", str(tmp_path))
+
+    @pytest.mark.parametrize("enabled", [True, False])
+    def test_main_pauses_and_restores_gc(self, enabled, fixtures_dir, tmp_path, monkeypatch, capsys, vcc_py_path):
+        vcc = import_vcc()
+        jsonl_path = tmp_path / "mixed_session.jsonl"
+        shutil.copy(fixtures_dir / "mixed_session.jsonl", jsonl_path)
+        during = []
+        real_compile = vcc._compile_file
+        monkeypatch.setattr(vcc, "_compile_file", lambda *a: (during.append(gc.isenabled()), real_compile(*a))[1])
+        was = gc.isenabled()
+        (gc.enable if enabled else gc.disable)()
+        try:
+            _run_main(vcc, monkeypatch, capsys, str(jsonl_path), "-o", str(tmp_path / "out"))
+            assert gc.isenabled() is enabled
+        finally:
+            (gc.enable if was else gc.disable)()
+        assert during == [False]
+
+
+# ---------------------------------------------------------------------------
+# Truncation and word counts
+# ---------------------------------------------------------------------------
+
+
+def _trunc_by_tokenizing(vcc, text, limit, ref=""):
+    """The original _trunc: tokenize everything, then count to the limit."""
+    tokens = vcc._tokenize(text)
+    counted = [i for i, t in enumerate(tokens) if t.strip()]
+    if len(counted) <= limit:
+        return text
+    return "".join(tokens[:counted[limit]]) + (f"...(truncated from {ref})" if ref else "...(truncated)")
+
+
+class TestTruncation:
+    @pytest.mark.parametrize("text", [
+        "one two three", "  lead\n\ttrail  ", "a,b;c(d)", "x1y22 z333", "é中 ok\x1c\x85end",
+        "word " * 300,
+    ])
+    @pytest.mark.parametrize("limit", [1, 2, 3, 128])
+    def test_matches_full_tokenization(self, text, limit, vcc_py_path):
+        vcc = import_vcc()
+        assert vcc._trunc(text, limit, "f.txt:1") == _trunc_by_tokenizing(vcc, text, limit, "f.txt:1")
+
+    def test_stops_at_cut(self, monkeypatch, vcc_py_path):
+        vcc = import_vcc()
+        monkeypatch.setattr(vcc, "_tokenize", None)  # no longer used
+        assert vcc._trunc("a b c d", 2) == "a b ...(truncated)"
+        assert vcc._trunc("a b", 2) == "a b"
+        assert vcc._trunc("a b", 0) == "a b"
+
+    def test_word_count_matches_tokenizer(self, vcc_py_path):
+        vcc = import_vcc()
+        text = "def f(x):\n    return x + 1  # ok"
+        assert vcc._count_words(text) == sum(1 for t in vcc._tokenize(text) if t.strip())
+
+    def test_quiet_compile_skips_word_counts(self, fixtures_dir, tmp_path, monkeypatch, capsys, vcc_py_path):
+        vcc = import_vcc()
+        jsonl_path = tmp_path / "in.jsonl"
+        jsonl_path.write_text(records_to_jsonl(convert_conversation(
+            json.loads((fixtures_dir / "basic_conversation.json").read_text()))))
+        monkeypatch.setattr(vcc, "_count_words", lambda text: pytest.fail("counted words"))
+        vcc.compile_pass(str(jsonl_path), str(tmp_path / "out"), quiet=True)
+        assert capsys.readouterr().out == ""
+
+
+# ---------------------------------------------------------------------------
+# _yaml_dump — tool input rendering
+# ---------------------------------------------------------------------------
+
+
+class TestYamlDump:
+    @pytest.mark.parametrize("data", [
+        {"path": "src/app.py", "limit": 20, "force": True, "mode": None, "ratio": 0.5},
+        {"command": "ls -la | grep foo", "timeout": 120},
+        {"old": "def f():\n    return 1\n", "new": "x\ny", "body": "\n  indented\n"},
+        {"text": "a\n\x1cb\n", "trailing": "line  \nnext"},
+        {"yes": "yes", "num": "123", "null": "~", "date": "2024-01-01", "empty": ""},
+        {"quote": "it's", "colon": "key: value", "hash": "a #b", "dash": "- x", "tab": "\tx"},
+        {"nested": {"a": [1, "two", None], "b": {}}, "items": [], "unicode": "é中 \u2028"},
+        {"k" * 122: 1, "k" * 123: 2, "a: b": 3, "": 4},
+        {"big": 1e20, "inf": float("inf"), "long": "w " * 3000},
+        {"rows": [{"a": 1}, {"b": [2]}], "multi": ["x\ny"]},
+    ])
+    def test_matches_yaml_dump(self, data, vcc_py_path):
+        vcc = import_vcc()
+        assert vcc._render_yaml(data) == vcc._yaml_dump_slow(data)
+
+    def test_shared_objects_fall_back(self, vcc_py_path):
+        vcc = import_vcc()
+        shared = ["a"]
+        data = {"x": shared, "y": shared}
+        assert "&id001" in vcc._render_yaml(data)
+        assert vcc._render_yaml(data) == vcc._yaml_dump_slow(data)
+
+    def test_memo(self, monkeypatch, vcc_py_path):
+        vcc = import_vcc()
+        monkeypatch.setattr(vcc, "_YAML_MEMO", {})
+        first = vcc._yaml_dump({"path": "a.py"})
+        monkeypatch.setattr(vcc, "_render_yaml", lambda data: pytest.fail("rendered again"))
+        assert vcc._yaml_dump({"path": "a.py"}) == first == "path: a.py"
+
+    def test_memo_eviction_thread_safe(self, monkeypatch, vcc_py_path):
+        vcc = import_vcc()
+        monkeypatch.setattr(vcc, "_YAML_MEMO", {})
+        monkeypatch.setattr(vcc, "_YAML_MEMO_MAX", 4)
+        monkeypatch.setattr(vcc, "_render_yaml", lambda data: "x")
+
+        def yielding_next(it):  # let another thread in between picking and evicting
+            key = next(it)
+            time.sleep(0.0005)
+            return key
+
+        monkeypatch.setattr(vcc, "next", yielding_next, raising=False)
+        errors = []
+
+        def work(t):
+            try:
+                for i in range(50):
+                    vcc._yaml_dump({"t": t, "i": i})
+            except Exception as exc:  # noqa: BLE001
+                errors.append(exc)
+
+        threads = [threading.Thread(target=work, args=(t,)) for t in range(8)]
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join()
+        assert errors == []
+        assert len(vcc._YAML_MEMO) <= 4
+
+
+# ---------------------------------------------------------------------------
+# Streaming lexer
+# ---------------------------------------------------------------------------
+
+
+def _chunk(mid, text):
+    return {"type": "assistant", "message": {"id": mid, "content": [{"type": "text", "text": text}]}}
+
+
+BOUNDARY = {"type": "system", "subtype": "compact_boundary"}
+
+
+class TestStreaming:
+    def test_merge_holds_only_open_message(self, vcc_py_path):
+        vcc = import_vcc()
+        records = [_chunk("m1", "a"), {"type": "progress"}, _chunk("m1", "b"),
+                   {"type": "user", "message": {"content": "next"}}, _chunk("m2", "c")]
+        merged = vcc.iter_merged(iter(records))
+        head = next(merged)  # needs the user record to know m1 is complete
+        assert [b["text"] for b in head["message"]["content"]] == ["a", "b"]
+        assert next(merged)["type"] == "progress"
+        assert next(merged)["type"] == "user"
+        assert list(merged) == [records[-1]]
+        assert len(records[0]["message"]["content"]) == 1  # caller's record untouched
+
+    def test_chains_yielded_at_next_chain(self, vcc_py_path):
+        vcc = import_vcc()
+        read = []
+
+        def records():
+            for r in [{"type": "user", "message": {"content": "one"}}, BOUNDARY, BOUNDARY,
+                      {"type": "user", "message": {"content": "two"}}, {"type": "progress"}]:
+                read.append(r)
+                yield r
+
+        chains = vcc._chains(records())
+        first, more = next(chains)
+        assert more and len(read) == 4
+        assert first[0]["message"]["content"] == "one"
+        assert [(len(c), more) for c, more in chains] == [(1, False)]
+
+    def test_stems(self, vcc_py_path):
+        vcc = import_vcc()
+        user = {"type": "user", "message": {"content": "x"}}
+        assert [s for s, _ in vcc._stemmed_chains("b", [user, BOUNDARY])] == ["b"]
+        assert [s for s, _ in vcc._stemmed_chains("b", [user, BOUNDARY, user])] == ["b_1", "b_2"]
+        assert list(vcc._stemmed_chains("b", [BOUNDARY])) == []
+
+    def test_compile_pass_writes_each_chain_before_reading_next(self, tmp_path, monkeypatch, vcc_py_path):
+        vcc = import_vcc()
+        jsonl_path = tmp_path / "s.jsonl"
+        records = [{"type": "user", "message": {"content": "one"}}, BOUNDARY,
+                   {"type": "user", "message": {"content": "two"}}, BOUNDARY,
+                   {"type": "user", "message": {"content": "three"}}]
+        jsonl_path.write_text("\n".join(json.dumps(r) for r in records))
+        out = tmp_path / "out"
+        lex = vcc.iter_lex
+
+        def checked_lex(path):
+            for r in lex(path):
+                if r.get("message") == {"content": "three"}:
+                    assert (out / "s_1.txt").exists() and (out / "s_1.min.txt").exists()
+                yield r
+
+        monkeypatch.setattr(vcc, "iter_lex", checked_lex)
+        results = vcc.compile_pass(str(jsonl_path), str(out), quiet=True, keep_ir=False)
+        assert [(Path(fp).name, ir) for fp, ir in results] == \
+            [("s_1.txt", None), ("s_2.txt", None), ("s_3.txt", None)]
+        assert "three" in (out / "s_3.txt").read_text()
+
+    def test_no_chains(self, tmp_path, capsys, vcc_py_path):
+        vcc = import_vcc()
+        jsonl_path = tmp_path / "empty.jsonl"
+        jsonl_path.write_text(json.dumps(BOUNDARY) + "\n")
+        assert vcc.compile_pass(str(jsonl_path), str(tmp_path)) == []
+        assert capsys.readouterr().out == "No conversation chains found.\n"
+
+
+# ---------------------------------------------------------------------------
+# compile_records — in-memory compile
+# ---------------------------------------------------------------------------
+
+
+class TestCompileRecords:
+    def test_matches_compile_pass(self, fixtures_dir, tmp_path, vcc_py_path):
+        vcc = import_vcc()
+        jsonl_path = tmp_path / "mixed_session.jsonl"
+        shutil.copy(fixtures_dir / "mixed_session.jsonl", jsonl_path)
+        vcc.compile_pass(str(jsonl_path), str(tmp_path / "out"), quiet=True)
+
+        compiled = vcc.compile_records(vcc.lex(str(jsonl_path)), "mixed_session")
+
+        assert len(compiled) > 1
+        for stem, full, brief in compiled:
+            assert full == (tmp_path / "out" / f"{stem}.txt").read_text()
+            assert brief == (tmp_path / "out" / f"{stem}.min.txt").read_text()
+
+    def test_want_flags(self, tool_heavy_session, vcc_py_path):
+        vcc = import_vcc()
+        records = convert_conversation(tool_heavy_session)
+        [(stem, full, brief)] = vcc.compile_records(records, "cycle_1", want_full=False)
+        assert stem == "cycle_1"
+        assert full is None
+        assert "cycle_1.txt:" in brief
+
+    def test_does_not_mutate_records(self, vcc_py_path):
+        vcc = import_vcc()
+        records = [
+            {"type": "assistant", "message": {"id": "m1", "content": [{"type": "text", "text": "a"}]}},
+            {"type": "assistant", "message": {"id": "m1", "content": [{"type": "text", "text": "b"}]}},
+        ]
+        snapshot = json.dumps(records)
+        [(_, full, _)] = vcc.compile_records(records)
+        assert json.dumps(records) == snapshot
+        assert "a" in full and "b" in full
+
+    def test_media_not_written_without_output_dir(self, tmp_path, monkeypatch, vcc_py_path):
+        vcc = import_vcc()
+        monkeypatch.chdir(tmp_path)
+        records = [{"type": "user", "message": {"content": [
+            {"type": "text", "text": "look"},
+            {"type": "image", "source": {"type": "base64", "media_type": "image/png", "data": "aGk="}},
+        ]}}]
+        [(_, full, _)] = vcc.compile_records(records, "s")
+        assert f"[image: img_{hashlib.sha256(b'aGk=').hexdigest()[:16]}.png]" in full
+        assert list(tmp_path.iterdir()) == []
+
+
+# ---------------------------------------------------------------------------
+# Media extraction
+# ---------------------------------------------------------------------------
+
+
+def _image_records(*payloads: str) -> list[dict]:
+    return [{"type": "user", "message": {"content": [
+        {"type": "text", "text": f"shot {i}"},
+        {"type": "image", "source": {"type": "base64", "media_type": "image/png", "data": data}},
+    ]}} for i, data in enumerate(payloads)]
+
+
+class TestMedia:
+    def test_same_content_written_once(self, tmp_path, monkeypatch, vcc_py_path):
+        vcc = import_vcc()
+        a, b = base64.b64encode(b"png a").decode(), base64.b64encode(b"png b").decode()
+        [(_, full, _)] = vcc.compile_records(_image_records(a, b, a), "s", str(tmp_path))
+        names = sorted(p.name for p in tmp_path.iterdir())
+        assert len(names) == 2 and all(n.startswith("img_") for n in names)
+        assert {(tmp_path / n).read_bytes() for n in names} == {b"png a", b"png b"}
+        assert full.count(f"[image: {vcc._media_name(a, 'img', 'png')}]") == 2
+
+        monkeypatch.setattr(vcc, "_write_base64", lambda data, path: pytest.fail("rewritten"))
+        assert vcc.compile_records(_image_records(a, b), "t", str(tmp_path))
+
+    @pytest.mark.parametrize("data", [
+        base64.b64encode(bytes(range(256)) * 7).decode(),
+        base64.b64encode(b"x" * 1000).decode() + "=",  # stray padding is skipped
+        base64.encodebytes(bytes(range(256)) * 3).decode(),  # line breaks
+    ])
+    def test_chunked_decode(self, data, tmp_path, monkeypatch, vcc_py_path):
+        vcc = import_vcc()
+        monkeypatch.setattr(vcc, "_B64_CHUNK", 64)
+        vcc._write_base64(data, str(tmp_path / "out.bin"))
+        assert (tmp_path / "out.bin").read_bytes() == base64.b64decode(data)
+
+    def test_bad_payload_leaves_no_file(self, tmp_path, vcc_py_path):
+        vcc = import_vcc()
+        with pytest.raises(ValueError):
+            vcc._write_base64("abc", str(tmp_path / "out.bin"))
+        assert list(tmp_path.iterdir()) == []
+
+    def test_reference_only(self, tmp_path, vcc_py_path):
+        vcc = import_vcc()
+        records = _image_records(base64.b64encode(b"png").decode())
+        referenced = vcc.compile_records(records, "s", str(tmp_path), extract_media=False)
+        assert list(tmp_path.iterdir()) == []
+        assert referenced == vcc.compile_records(records, "s", str(tmp_path))
+        assert len(list(tmp_path.iterdir())) == 1
+
+    def test_incremental_reuses_cache_with_media(self, tmp_path, monkeypatch, vcc_py_path):
+        vcc = import_vcc()
+        records = _image_records(*(base64.b64encode(bytes([i])).decode() for i in range(4)))
+        cache: dict = {}
+        vcc.compile_records(records[:2], "cycle_1", str(tmp_path), cache=cache)
+        parsed = []
+        parse = vcc.parse
+        monkeypatch.setattr(vcc, "parse", lambda recs, *a: parsed.append(len(recs)) or parse(recs, *a))
+
+        got = vcc.compile_records(records, "cycle_2", str(tmp_path), cache=cache)
+
+        assert parsed == [2]  # names do not depend on the stem, so the prefix is kept
+        assert got == vcc.compile_records(records, "cycle_2")
+        assert len(list(tmp_path.iterdir())) == 4
+
+
+# ---------------------------------------------------------------------------
+# compile_records(cache=...) — incremental compile
+# ---------------------------------------------------------------------------
+
+
+def _tool_records(n_calls: int) -> list[dict]:
+    records = [{"type": "user", "message": {"content": "start"}}]
+    for i in range(n_calls):
+        records.append({"type": "assistant", "message": {"id": f"m{i}", "content": [
+            {"type": "text", "text": f"step {i}"},
+            {"type": "tool_use", "name": "Read", "id": f"toolu_{i:06d}", "input": {"file_path": f"/f{i}"}},
+        ]}})
+        records.append({"type": "user", "message": {"content": [
+            {"type": "tool_result", "tool_use_id": f"toolu_{i:06d}", "content": f"body {i}"},
+        ]}})
+    return records
+
+
+class TestIncrementalCompile:
+    def test_growing_prefix_matches_full_compile(self, fixtures_dir, vcc_py_path):
+        vcc = import_vcc()
+        records = [json.loads(l) for l in (fixtures_dir / "mixed_session.jsonl").read_text().splitlines()]
+        cache: dict = {}
+        for cut in (10, 11, 40, 55, len(records)):
+            got = vcc.compile_records(records[:cut], f"cycle_{cut}", cache=cache)
+            assert got == vcc.compile_records(records[:cut], f"cycle_{cut}")
+
+    def test_only_tail_is_parsed(self, monkeypatch, vcc_py_path):
+        vcc = import_vcc()
+        records = _tool_records(20)
+        cache: dict = {}
+        vcc.compile_records(records[:21], "cycle_1", cache=cache)
+
+        parsed = []
+        real_parse = vcc.parse
+
+        def counting_parse(chain, *args, **kwargs):
+            parsed.append(len(chain))
+            return real_parse(chain, *args, **kwargs)
+
+        monkeypatch.setattr(vcc, "parse", counting_parse)
+        got = vcc.compile_records(records, "cycle_2", cache=cache)
+
+        assert parsed == [len(records) - 21]
+        assert got == vcc.compile_records(records, "cycle_2")
+
+    def test_tool_result_in_tail_patches_prefix_summary(self, vcc_py_path):
+        vcc = import_vcc()
+        records = _tool_records(3)
+        cache: dict = {}
+        # Cut between the last tool_use and its tool_result.
+        vcc.compile_records(records[:-1], "cycle_1", cache=cache)
+        [(_, _, brief)] = vcc.compile_records(records, "cycle_2", cache=cache)
+        assert brief == vcc.compile_records(records, "cycle_2")[0][2]
+        assert '* Read "/f2" (cycle_2.txt:' in brief
+
+    def test_changed_prefix_recompiles(self, vcc_py_path):
+        vcc = import_vcc()
+        records = _tool_records(5)
+        cache: dict = {}
+        vcc.compile_records(records, "cycle_1", cache=cache)
+        edited = [{"type": "user", "message": {"content": "different start"}}] + records[1:]
+        assert vcc.compile_records(edited, "cycle_2", cache=cache) == \
+            vcc.compile_records(edited, "cycle_2")
+
+    def test_new_chain_after_boundary(self, vcc_py_path):
+        vcc = import_vcc()
+        records = _tool_records(2)
+        cache: dict = {}
+        vcc.compile_records(records, "cycle_1", cache=cache)
+        grown = records + [
+            {"type": "system", "subtype": "compact_boundary"},
+            {"type": "user", "isCompactSummary": True, "message": {"content": "summary"}},
+            {"type": "user", "message": {"content": "next"}},
+        ]
+        got = vcc.compile_records(grown, "cycle_2", cache=cache)
+        assert [stem for stem, _, _ in got] == ["cycle_2_1", "cycle_2_2"]
+        assert got == vcc.compile_records(grown, "cycle_2")
+
+
+# ---------------------------------------------------------------------------
+# main — multi-file compile
+# ---------------------------------------------------------------------------
+
+
+def _write_sessions(fixtures_dir, in_dir: Path) -> None:
+    in_dir.mkdir()
+    for i, name in enumerate(f.stem for f in fixtures_dir.glob("*.json")):
+        conversation = json.loads((fixtures_dir / f"{name}.json").read_text())
+        (in_dir / f"{i}_{name}.jsonl").write_text(records_to_jsonl(convert_conversation(conversation)))
+    shutil.copy(fixtures_dir / "mixed_session.jsonl", in_dir)
+
+
+def _run_main(vcc, monkeypatch, capsys, *argv):
+    monkeypatch.setattr("sys.argv", ["VCC.py", *argv])
+    vcc.main()
+    return capsys.readouterr()
+
+
+class TestMain:
+    @pytest.mark.parametrize("grep", [[], ["--grep", "error|read_file"]])
+    def test_jobs_match_sequential(self, grep, fixtures_dir, tmp_path, monkeypatch, capsys, vcc_py_path):
+        vcc = import_vcc()
+        _write_sessions(fixtures_dir, tmp_path / "in")
+        monkeypatch.chdir(tmp_path)
+        seq = _run_main(vcc, monkeypatch, capsys, "in/*.jsonl", "-o", "out", *grep)
+        seq_files = _compiled_files(tmp_path / "out")
+        shutil.rmtree(tmp_path / "out")
+
+        par = _run_main(vcc, monkeypatch, capsys, "in/*.jsonl", "-o", "out", "-j", "3", *grep)
+
+        assert par.out == seq.out and seq.out
+        assert _compiled_files(tmp_path / "out") == seq_files
+
+    def test_grep_search_matches_grep_hits(self, fixtures_dir, tmp_path, capsys, vcc_py_path):
+        vcc = import_vcc()
+        jsonl_path = tmp_path / "mixed_session.jsonl"
+        shutil.copy(fixtures_dir / "mixed_session.jsonl", jsonl_path)
+        pattern = re.compile("error")
+        results = vcc.compile_pass(str(jsonl_path), str(tmp_path / "out"), grep_pattern=pattern, quiet=True)
+
+        vcc.grep_search(results, pattern)
+
+        blocks = [b for fp, ir in reversed(results) for b in vcc.grep_hits(fp, ir, pattern)]
+        assert blocks
+        assert capsys.readouterr().out == "\n\n".join("\n".join(b) for b in blocks) + "\n"
+
+    def test_shared_output_names_compile_sequentially(self, fixtures_dir, tmp_path, monkeypatch, capsys, vcc_py_path):
+        vcc = import_vcc()
+        for sub in ("a", "b"):
+            (tmp_path / sub).mkdir()
+            shutil.copy(fixtures_dir / "mixed_session.jsonl", tmp_path / sub)
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr(vcc.concurrent.futures, "ProcessPoolExecutor",
+                            lambda *a: pytest.fail("used a process pool"))
+
+        got = _run_main(vcc, monkeypatch, capsys, "a/*.jsonl", "b/*.jsonl", "-o", "out", "-j", "2")
+
+        assert "compiling sequentially" in got.err